@@ -8,9 +8,32 @@ https://docs.djangoproject.com/en/4.0/howto/deployment/asgi/
 """
 
 import os
+import re
 
 from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# imported after setup, it uses the models
+from quizzes.live import live_events  # noqa: E402
+from core.streams import ThreadedWsgiToAsgi  # noqa: E402
+
+LIVE_EVENTS_PATH = '/api/live/'
+# responses streamed from blocking iterators, served off the event loop
+STREAMED_PATHS = re.compile(
+    r'^/api/assignments/(assignments/[^/]+/(download|download_submissions)|submissions/[^/]+/download)/$'
+)
+streamed_application = ThreadedWsgiToAsgi(get_wsgi_application())
+
+
+async def application(scope, receive, send):
+    # Django 4.0 cannot stream a response asynchronously, so the live event
+    # stream is served by its own ASGI app instead of a view
+    if scope['type'] == 'http' and scope['path'] == LIVE_EVENTS_PATH and scope['method'] == 'GET':
+        return await live_events(scope, receive, send)
+    if scope['type'] == 'http' and STREAMED_PATHS.match(scope['path']):
+        return await streamed_application(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -45,10 +45,12 @@ INSTALLED_APPS = [
     'user',
     'notices',
     'quizzes',
+    'benchmarks',
     
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',  # first, so its wall time covers the whole stack
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -59,6 +61,19 @@ MIDDLEWARE = [
     
 ]
 
+# WSGI (uwsgi, the default) or ASGI (uvicorn) deployment, picked by
+# scripts/run.sh. Under ASGI the quiz, notice, submission and profile reads
+# are served by async views (see core/asyncviews.py) whose views run on
+# ASYNC_READ_THREADS threads per worker. REQUEST_METRICS is a sync-only
+# middleware: with it on, Django runs those views synchronously again.
+APP_SERVER = os.environ.get('APP_SERVER', 'wsgi')
+ASYNC_READ_VIEWS = APP_SERVER == 'asgi'
+ASYNC_READ_THREADS = int(os.environ.get('ASYNC_READ_THREADS', '16'))
+
+# Per-endpoint query count and latency histograms, served on /api/metrics/
+# (see core/middleware.py)
+REQUEST_METRICS = os.environ.get('REQUEST_METRICS', '0') == '1'
+
 ROOT_URLCONF = 'app.urls'
 
 TEMPLATES = [
@@ -94,6 +109,68 @@ DATABASES = {
 }
 
 
+# Cache
+# Any Django cache backend can be plugged in through the environment, e.g.
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache CACHE_LOCATION=redis://redis:6379/0
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'kojo-default'),
+    }
+}
+
+# Compiled student-facing quiz papers (see quizzes/paper.py)
+QUIZ_PAPER_CACHE = 'default'
+QUIZ_PAPER_TIMEOUT = 60 * 60
+
+# When enabled, submit_attempt only queues the attempt and the
+# `manage.py grade_attempts` worker scores it
+QUIZ_ASYNC_GRADING = os.environ.get('QUIZ_ASYNC_GRADING', '0') == '1'
+
+# When enabled, answers of live attempts are buffered in the cache and written
+# by `manage.py flush_answer_buffers` and on submit (see quizzes/buffer.py).
+# Needs a cache shared by all workers, not the locmem default.
+QUIZ_ANSWER_BUFFER = os.environ.get('QUIZ_ANSWER_BUFFER', '0') == '1'
+QUIZ_ANSWER_BUFFER_CACHE = 'default'
+QUIZ_ANSWER_BUFFER_TIMEOUT = 60 * 60 * 12
+
+# Per-quiz item statistics (see quizzes/analytics.py)
+QUIZ_ANALYTICS_CACHE = 'default'
+QUIZ_ANALYTICS_TIMEOUT = 60 * 60 * 24
+
+# Ranked leaderboards per quiz and per section (see quizzes/leaderboard.py)
+QUIZ_LEADERBOARD_CACHE = 'default'
+QUIZ_LEADERBOARD_TIMEOUT = 60 * 60 * 24 * 7
+
+# Per-section notice feeds (see notices/feed.py)
+NOTICE_FEED_CACHE = 'default'
+NOTICE_FEED_TIMEOUT = 60 * 60 * 24
+
+# Live event stream at /api/live/ (see core/events.py and quizzes/live.py).
+# Streams in other processes only see events through the cache, so it must be
+# shared by all workers in production.
+LIVE_EVENTS_CACHE = 'default'
+LIVE_EVENTS_TIMEOUT = 60 * 60
+LIVE_POLL_SECONDS = 5
+LIVE_HEARTBEAT_SECONDS = 15
+LIVE_STREAM_MAX_SECONDS = 60 * 5
+QUIZ_SCHEDULE_CACHE = 'default'
+QUIZ_SCHEDULE_TIMEOUT = 60 * 60
+
+# Responses replayed for requests sent again with the same Idempotency-Key header
+IDEMPOTENCY_CACHE = 'default'
+IDEMPOTENCY_KEY_TIMEOUT = 60 * 60 * 24
+
+# Resolved auth tokens (see core/authentication.py). The per-process tier
+# cannot be cleared from other workers, so its timeout bounds how long a
+# revoked token keeps working there.
+AUTH_TOKEN_CACHE = 'default'
+AUTH_TOKEN_TIMEOUT = 60 * 15
+AUTH_TOKEN_LOCAL_TIMEOUT = int(os.environ.get('AUTH_TOKEN_LOCAL_TIMEOUT', '10'))
+AUTH_TOKEN_LOCAL_SIZE = 10000
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 
@@ -129,6 +206,40 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/4.0/howto/static-files/
 
 STATIC_URL = 'static/'
+
+# Uploaded files (assignment and submission PDFs, question images). They are
+# not served under MEDIA_URL: downloads go through the permission-checked
+# endpoints (see core/downloads.py).
+MEDIA_URL = 'media/'
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', BASE_DIR / 'media')
+# Set to an `internal` nginx location aliasing MEDIA_ROOT (e.g. /protected-media/)
+# to hand the transfer of permitted downloads over to nginx
+MEDIA_ACCEL_REDIRECT = os.environ.get('MEDIA_ACCEL_REDIRECT', '')
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# Uploads are stored once per content under MEDIA_ROOT/CONTENT_STORE_DIR and
+# mapped to their names in the database (see core/storage.py)
+DEFAULT_FILE_STORAGE = 'core.storage.ContentAddressedStorage'
+CONTENT_STORE_DIR = 'blobs'
+# Streamed ZIP archives of submissions (see core/archives.py): files read ahead
+# and blocks queued per file bound an archive's memory to about
+# ZIP_PREFETCH_FILES * ZIP_PREFETCH_CHUNKS * DOWNLOAD_CHUNK_SIZE. Under ASGI the
+# archives are built off the event loop by the WSGI handler (see app/asgi.py)
+ZIP_PREFETCH_FILES = 4
+ZIP_PREFETCH_CHUNKS = 8
+# PDFs are already compressed, a higher level costs CPU for little gain
+ZIP_COMPRESSLEVEL = 1
+# Resumable chunked uploads of submissions (see assignments/uploads.py). Part
+# files live under MEDIA_ROOT/UPLOAD_PARTS_DIR until they are finalized.
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_MAX_SIZE = 50 * 1024 * 1024
+UPLOAD_PARTS_DIR = 'partial_uploads'
+UPLOAD_SESSION_TIMEOUT = 60 * 60 * 24
+# Resized question images derived by `manage.py derive_question_images` (see
+# quizzes/images.py). They are public under MEDIA_URL: nginx serves
+# MEDIA_ROOT/QUESTION_IMAGE_VARIANTS_DIR, the paths hold the content hash.
+QUESTION_IMAGE_VARIANTS_DIR = 'question_images'
+QUESTION_IMAGE_WIDTHS = [320, 640, 1280]
+QUESTION_IMAGE_DEFAULT_WIDTH = 640
 AUTH_USER_MODEL='core.User'
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.0/ref/settings/#default-auto-field
@@ -138,12 +249,19 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',  # Use token authentication
+        'core.authentication.CachedTokenAuthentication',  # Use token authentication
         'rest_framework.authentication.SessionAuthentication',  # For browsable API
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.CreatedAtCursorPagination',
+    'PAGE_SIZE': 50,
+    'DEFAULT_RENDERER_CLASSES': [
+        # same output as rest_framework.renderers.JSONRenderer, encoded by orjson
+        os.environ.get('JSON_RENDERER', 'core.renderers.ORJSONRenderer'),
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 SPECTACULAR_SETTINGS = {
@@ -2,6 +2,7 @@ from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path
 from django.conf.urls.static import static
+from core.views import MetricsView
 from drf_spectacular.views import (
     SpectacularAPIView,
     SpectacularSwaggerView,
@@ -20,4 +21,5 @@ urlpatterns = [
     path('api/users/', include('user.urls')),
     path('api/notices/', include('notices.urls')),
     path('api/quizzes/', include('quizzes.urls')),
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),
 ]
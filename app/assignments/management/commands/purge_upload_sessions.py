@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from assignments.uploads import discard
+from core.models import UploadSession
+
+
+class Command(BaseCommand):
+    """Django command to delete abandoned upload sessions."""
+
+    help = 'Delete the chunked upload sessions older than UPLOAD_SESSION_TIMEOUT and their part files.'
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        cutoff = timezone.now() - timedelta(seconds=settings.UPLOAD_SESSION_TIMEOUT)
+        purged = 0
+        for session in UploadSession.objects.filter(created_at__lt=cutoff).iterator():
+            discard(session)
+            purged += 1
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} upload sessions'))
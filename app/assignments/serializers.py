@@ -1,10 +1,14 @@
 # serializers.py
+import os
+from django.conf import settings
 from rest_framework import serializers
 from core.models import Assignment, AssignmentSubmission, Teacher, Section, Subject
 
 # Updated AssignmentSerializer with date field customization
 from rest_framework import serializers
-from core.models import Assignment, Teacher, Section, Subject,Student,AssignmentSubmission
+from core.models import Assignment, Teacher, Section, Subject,Student,AssignmentSubmission,UploadSession
+from core.profiles import get_profile
+from .uploads import create_part_file, missing_chunks
 from drf_spectacular.utils import extend_schema_field, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
 
@@ -49,8 +53,7 @@ class AssignmentSerializer(serializers.ModelSerializer):
         ]
 
     def create(self, validated_data):
-        user = self.context['request'].user
-        teacher = Teacher.objects.get(user=user)
+        teacher = get_profile(self.context['request'])
         
         # Extract and remove section_code from validated_data
         section_code = validated_data.pop('section_code')
@@ -86,8 +89,7 @@ class AssignmentSubmissionSerializer(serializers.ModelSerializer):
         }
     
     def create(self,validated_data):
-        user = self.context['request'].user
-        student = Student.objects.get(user=user)
+        student = get_profile(self.context['request'])
         
         # Extract and remove assignment_id from validated_data
         assignment_id = validated_data.pop('assignment_id')
@@ -105,6 +107,59 @@ class AssignmentSubmissionSerializer(serializers.ModelSerializer):
         )
     
 
+class UploadSessionSerializer(serializers.ModelSerializer):
+    assignment_id = serializers.IntegerField(write_only=True)
+    missing_chunks = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = ['upload_code', 'assignment_id', 'filename', 'size', 'sha256', 'chunk_size', 'missing_chunks',
+                  'created_at']
+        read_only_fields = ['upload_code', 'chunk_size', 'created_at']
+
+    def get_missing_chunks(self, session):
+        return missing_chunks(session)
+
+    def validate_filename(self, filename):
+        # only the base name is kept, the storage path comes from get_submission_path
+        filename = os.path.basename(filename.replace('\\', '/'))
+        if not filename:
+            raise serializers.ValidationError("Filename is empty")
+        return filename
+
+    def validate_size(self, size):
+        if size > settings.UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f"Files can be at most {settings.UPLOAD_MAX_SIZE} bytes")
+        return size
+
+    def validate_sha256(self, sha256):
+        sha256 = sha256.lower()
+        if sha256 and (len(sha256) != 64 or any(char not in '0123456789abcdef' for char in sha256)):
+            raise serializers.ValidationError("Must be a hex SHA-256 digest")
+        return sha256
+
+    def validate(self, attrs):
+        student = get_profile(self.context['request'])
+        try:
+            assignment = Assignment.objects.get(pk=attrs['assignment_id'], section=student.section_id)
+        except Assignment.DoesNotExist:
+            raise serializers.ValidationError({"assignment_id": "Assignment not found"})
+        if AssignmentSubmission.objects.filter(student=student, assignment=assignment).exists():
+            raise serializers.ValidationError({"assignment_id": "This assignment has already been submitted"})
+        attrs['assignment'] = assignment
+        return attrs
+
+    def create(self, validated_data):
+        validated_data.pop('assignment_id')
+        session = UploadSession.objects.create(
+            student=get_profile(self.context['request']),
+            chunk_size=settings.UPLOAD_CHUNK_SIZE,
+            **validated_data
+        )
+        create_part_file(session)
+        return session
+
+
 """
 class Assignment(models.Model):
     name = models.CharField(max_length=100)
@@ -0,0 +1,146 @@
+"""
+Resumable, chunked uploads of submission PDFs.
+
+1. POST /api/assignments/uploads/ with assignment_id, filename, size and
+   optionally the sha256 of the whole file opens an UploadSession and
+   answers with its upload_code and the chunk_size to use.
+2. PUT /api/assignments/uploads/<upload_code>/ sends one chunk as the raw
+   body, with its byte offset in the Upload-Offset header and its sha256 in
+   Upload-Checksum. Offsets are multiples of chunk_size and every chunk but
+   the last is exactly chunk_size bytes. Chunks can come in any order, in
+   parallel, and be sent again.
+3. GET on the session lists the missing chunks, so an interrupted client
+   only sends those again.
+4. POST /api/assignments/uploads/<upload_code>/finalize/ checks the whole
+   file and creates the AssignmentSubmission.
+
+Chunks are streamed straight into a preallocated part file under
+MEDIA_ROOT/UPLOAD_PARTS_DIR while they are hashed. A chunk is only recorded
+once its checksum matched. Since chunks come in any order, the sha256 of the
+whole file can only be computed once they are all there: finalize reads the
+part file again for it.
+"""
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.db import IntegrityError, transaction
+
+from core.models import AssignmentSubmission, UploadChunk, UploadSession
+
+# size of the reads from the request body and the part file
+BLOCK_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    pass
+
+
+class SessionGone(UploadError):
+    pass
+
+
+def part_path(session):
+    return os.path.join(settings.MEDIA_ROOT, settings.UPLOAD_PARTS_DIR, f'{session.upload_code}.part')
+
+
+def chunk_count(session):
+    return max(1, -(-session.size // session.chunk_size))
+
+
+def missing_chunks(session):
+    received = set(session.chunks.values_list('index', flat=True))
+    return [index for index in range(chunk_count(session)) if index not in received]
+
+
+def create_part_file(session):
+    path = part_path(session)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as part:
+        part.truncate(session.size)
+
+
+def write_chunk(session, offset, checksum, length, stream):
+    """Stream one chunk of `length` bytes from `stream` into the part file at `offset`."""
+    if offset < 0 or offset % session.chunk_size or offset >= max(session.size, 1):
+        raise UploadError(f'Upload-Offset must be a multiple of {session.chunk_size} below {session.size}.')
+    expected = min(session.chunk_size, session.size - offset)
+    if length != expected:
+        raise UploadError(f'The chunk at offset {offset} must be {expected} bytes long.')
+
+    digest = hashlib.sha256()
+    written = 0
+    with open(part_path(session), 'r+b') as part:
+        part.seek(offset)
+        while written < length:
+            block = stream.read(min(BLOCK_SIZE, length - written))
+            if not block:
+                break
+            digest.update(block)
+            part.write(block)
+            written += len(block)
+    if written != length:
+        raise UploadError('The chunk ended early.')
+    if digest.hexdigest() != checksum.lower():
+        # the bytes stay in the part file until the chunk is sent again
+        raise UploadError('Upload-Checksum does not match the chunk.')
+    UploadChunk.objects.update_or_create(
+        session=session, index=offset // session.chunk_size, defaults={'sha256': digest.hexdigest()}
+    )
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as part:
+        for block in iter(lambda: part.read(BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def finalize(session):
+    """
+    Create the AssignmentSubmission from a complete upload and drop the session.
+
+    The session row is locked for the whole of it, so a concurrent finalize
+    of the same upload waits and then raises SessionGone.
+    """
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().filter(pk=session.pk).select_related(
+            'student', 'assignment'
+        ).first()
+        if session is None:
+            raise SessionGone('This upload has already been finalized.')
+        missing = missing_chunks(session)
+        if missing:
+            raise UploadError(f'Chunks {missing} have not been received.')
+        path = part_path(session)
+        if session.sha256 and file_sha256(path) != session.sha256.lower():
+            raise UploadError('The uploaded file does not match its sha256.')
+
+        submission = AssignmentSubmission(student=session.student, assignment=session.assignment)
+        with open(path, 'rb') as part:
+            submission.submission_pdf.save(session.filename, File(part), save=False)
+        try:
+            with transaction.atomic():
+                submission.save()
+        except IntegrityError:
+            duplicate = True
+        else:
+            duplicate = False
+            session.delete()
+
+    if duplicate:
+        # the stored file is committed with the session, its deletion can only follow
+        submission.submission_pdf.delete(save=False)
+        raise UploadError('This assignment has already been submitted.')
+    os.remove(path)
+    return submission
+
+
+def discard(session):
+    # the path is read before delete() clears the primary key
+    path = part_path(session)
+    session.delete()
+    if os.path.exists(path):
+        os.remove(path)
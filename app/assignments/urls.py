@@ -1,12 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import AssignmentViewSet, AssignmentSubmissionViewSet
+from .views import AssignmentViewSet, AssignmentSubmissionViewSet, UploadSessionViewSet
 
 router = DefaultRouter()
 
 # Add basename parameter to fix the error
 router.register('assignments', AssignmentViewSet, basename='assignment')
 router.register('submissions', AssignmentSubmissionViewSet, basename='assignment-submission')
+router.register('uploads', UploadSessionViewSet, basename='upload-session')
 
 app_name = 'assignments'
 
@@ -1,18 +1,33 @@
 # views.py
+import os
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from django.shortcuts import get_object_or_404
+from rest_framework.decorators import action
+from django.http import StreamingHttpResponse
+from core.archives import stream_zip
+from core.compiled import CompiledListMixin
+from core.downloads import content_disposition, download_response
 from core.permissions import IsTeacher, IsStudent
-from core.models import Assignment, AssignmentSubmission, Student, Teacher, Section
-from .serializers import AssignmentSerializer, AssignmentSubmissionSerializer
+from core.pagination import SubmittedAtCursorPagination
+from core.profiles import get_profile
+from rest_framework import mixins
+from core.models import Assignment, AssignmentSubmission, UploadSession
+from .serializers import AssignmentSerializer, AssignmentSubmissionSerializer, UploadSessionSerializer
+from . import uploads
+
+def submission_entry_name(submission):
+    student = submission.student
+    extension = os.path.splitext(submission.submission_pdf.name)[1]
+    name = f'{student.user_id} {student.first_name} {student.last_name}{extension}'
+    return name.replace('/', '_').replace('\\', '_')
 
 class AssignmentViewSet(viewsets.ModelViewSet):
     serializer_class = AssignmentSerializer
     
     def get_permissions(self):
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'download_submissions']:
             permission_classes = [IsAuthenticated, IsTeacher]
         else:
             permission_classes = [IsAuthenticated]
@@ -20,21 +35,46 @@ class AssignmentViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         user = self.request.user
+        profile = get_profile(self.request)
         
+        if profile is None:
+            return Assignment.objects.none()
         if user.role == 'teacher':
             # Teachers see assignments they created
-            teacher = get_object_or_404(Teacher, user=user)
-            return Assignment.objects.filter(teacher=teacher)
+            return Assignment.objects.filter(teacher=profile)
         elif user.role == 'student':
             # Students see assignments for their section
-            student = get_object_or_404(Student, user=user)
-            return Assignment.objects.filter(section=student.section)
+            return Assignment.objects.filter(section=profile.section_id)
         
         # Default empty queryset
         return Assignment.objects.none()
 
-class AssignmentSubmissionViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        # get_object() only finds the assignments the user can see
+        return download_response(request, self.get_object().assignment_pdf)
+
+    @action(detail=True, methods=['get'])
+    def download_submissions(self, request, pk=None):
+        # every submission PDF of the assignment, streamed as one ZIP with an entry per student
+        assignment = self.get_object()
+        submissions = list(
+            AssignmentSubmission.objects.filter(assignment=assignment).select_related('student').order_by('student_id')
+        )
+        # resolved here: the archive is built while the response is sent, away from the database
+        storage = AssignmentSubmission._meta.get_field('submission_pdf').storage
+        paths = storage.paths([submission.submission_pdf.name for submission in submissions])
+        entries = [
+            (submission_entry_name(submission), paths[submission.submission_pdf.name])
+            for submission in submissions
+        ]
+        response = StreamingHttpResponse(stream_zip(entries), content_type='application/zip')
+        response['Content-Disposition'] = content_disposition(f'{assignment.name}-submissions.zip')
+        return response
+
+class AssignmentSubmissionViewSet(CompiledListMixin, viewsets.ModelViewSet):
     serializer_class = AssignmentSubmissionSerializer
+    pagination_class = SubmittedAtCursorPagination
     
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update']:
@@ -47,16 +87,62 @@ class AssignmentSubmissionViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         user = self.request.user
+        profile = get_profile(self.request)
         
+        if profile is None:
+            return AssignmentSubmission.objects.none()
         if user.role == 'student':
             # Students see their own submissions
-            student = get_object_or_404(Student, user=user)
-            return AssignmentSubmission.objects.filter(student=student)
+            return AssignmentSubmission.objects.filter(student=profile)
         elif user.role == 'teacher':
             # Teachers see submissions for assignments they created
-            teacher = get_object_or_404(Teacher, user=user)
-            return AssignmentSubmission.objects.filter(assignment__teacher=teacher)
+            return AssignmentSubmission.objects.filter(assignment__teacher=profile)
         
         # Default empty queryset
         return AssignmentSubmission.objects.none()
 
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        # students download their own submissions, teachers those to their assignments
+        return download_response(request, self.get_object().submission_pdf)
+
+
+class UploadSessionViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """Resumable chunked uploads of submission PDFs (see assignments/uploads.py)."""
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated, IsStudent]
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(student=get_profile(self.request)).select_related('student__user')
+
+    def update(self, request, pk=None):
+        # the body is the raw chunk, read as a stream and never parsed
+        session = self.get_object()
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return Response({"error": "Upload-Offset and Content-Length are required"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        checksum = request.headers.get('Upload-Checksum', '')
+        if not checksum:
+            return Response({"error": "Upload-Checksum is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            uploads.write_chunk(session, offset, checksum, length, request.stream)
+        except uploads.UploadError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(session).data)
+
+    def destroy(self, request, pk=None):
+        uploads.discard(self.get_object())
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=['post'])
+    def finalize(self, request, pk=None):
+        try:
+            submission = uploads.finalize(self.get_object())
+        except uploads.SessionGone as error:
+            return Response({"error": str(error)}, status=status.HTTP_404_NOT_FOUND)
+        except uploads.UploadError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(AssignmentSubmissionSerializer(submission).data, status=status.HTTP_201_CREATED)
@@ -0,0 +1,9 @@
+"""
+Exam-day load benchmark.
+
+`manage.py run_benchmark` seeds a synthetic institution into a throwaway
+test database (seed.py), replays the exam flow of many students against the
+real DRF endpoints through the Django test client (runner.py) and writes
+latency percentiles, throughput and queries per request as JSON, so that
+runs on different commits can be compared with --compare.
+"""
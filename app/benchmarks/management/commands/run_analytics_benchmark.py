@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from benchmarks.seed import seed_activity, seed_answers, seed_institution
+from quizzes.analytics import compute_quiz_analytics
+from quizzes.grading import regrade_quiz
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the item statistics of a large quiz."""
+
+    help = (
+        'Seed one quiz with many graded attempts that answered every question into a throwaway test database '
+        'and report the time compute_quiz_analytics takes over them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--attempts', type=int, default=10000, help='Graded attempts to seed.')
+        parser.add_argument('--questions', type=int, default=100, help='Questions of the quiz.')
+        parser.add_argument('--options', type=int, default=4, help='Options per question.')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs, the best one is reported.')
+        parser.add_argument('--target', type=float, default=1.0, help='Seconds the best run is compared with.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if min(options['attempts'], options['questions'], options['options'], options['repeat']) < 1:
+            raise CommandError('--attempts, --questions, --options and --repeat must be positive')
+
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            sessions = seed_institution(options['attempts'], 1, options['questions'], options['options'], 0, 0)
+            seed_activity(sessions, pending=0)
+            answers = seed_answers()
+            (quiz_id, _), = sessions.values()
+            # scores that match the seeded answers
+            regrade_quiz(quiz_id)
+            # planner statistics, as a long-lived database would have them
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            self.stdout.write(f'{options["attempts"]} attempts x {options["questions"]} questions, {answers} answers')
+
+            seconds = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                compute_quiz_analytics(quiz_id)
+                seconds.append(time.perf_counter() - started)
+                self.stdout.write(f'  {seconds[-1]:.3f}s')
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        best = min(seconds)
+        if best < options['target']:
+            self.stdout.write(self.style.SUCCESS(f'best run {best:.3f}s, under the {options["target"]}s target'))
+        else:
+            self.stdout.write(self.style.WARNING(f'best run {best:.3f}s, over the {options["target"]}s target'))
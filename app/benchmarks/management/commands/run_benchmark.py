@@ -0,0 +1,141 @@
+import json
+import os
+import subprocess
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from benchmarks.runner import run_sessions, summarize
+from benchmarks.seed import seed_institution
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'results')
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the exam-day endpoints."""
+
+    help = (
+        'Seed a synthetic institution into a throwaway test database, replay the exam flow of many '
+        'students concurrently and report latency percentiles, throughput and queries per request.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=2000, help='Students to seed.')
+        parser.add_argument('--sessions', type=int, default=200,
+                            help='Students that take the exam during the run.')
+        parser.add_argument('--sections', type=int, default=20, help='Sections, each with its own quiz.')
+        parser.add_argument('--questions', type=int, default=20, help='Questions per quiz.')
+        parser.add_argument('--options', type=int, default=4, help='Options per question.')
+        parser.add_argument('--assignments', type=int, default=5, help='Assignments per section.')
+        parser.add_argument('--notices', type=int, default=10, help='Notices per section.')
+        parser.add_argument('--concurrency', type=int, default=16, help='Concurrent virtual students.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the data and the answers.')
+        parser.add_argument('--output', help='JSON file for the results (default: benchmarks/results/<commit>.json).')
+        parser.add_argument('--compare', help='Earlier results file to compare against.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if min(options['students'], options['sessions'], options['sections'], options['concurrency']) < 1:
+            raise CommandError('--students, --sessions, --sections and --concurrency must be positive')
+        concurrency = options['concurrency']
+        if concurrency > 1 and connection.vendor == 'sqlite':
+            # the SQLite test database cannot take concurrent writers
+            self.stdout.write(self.style.WARNING('SQLite does not support concurrent writers, running with 1 client'))
+            concurrency = 1
+        for alias, cache_settings in settings.CACHES.items():
+            if 'locmem' not in cache_settings['BACKEND']:
+                # the throwaway database reuses ids, so its cache keys collide with real ones
+                self.stdout.write(self.style.WARNING(
+                    f'cache "{alias}" is shared, point CACHE_BACKEND at a dedicated instance for benchmarks'
+                ))
+
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            started = time.perf_counter()
+            sections = seed_institution(
+                options['students'], options['sections'], options['questions'], options['options'],
+                options['assignments'], options['notices'], seed=options['seed'],
+            )
+            self.stdout.write(f'Seeded {options["students"]} students in {time.perf_counter() - started:.1f}s')
+
+            # interleave the sections so every quiz is hit during the whole run
+            sessions = []
+            queues = [[(student_id, quiz_id) for student_id in students] for quiz_id, students in sections.values()]
+            while len(sessions) < options['sessions'] and any(queues):
+                for section_queue in queues:
+                    if section_queue and len(sessions) < options['sessions']:
+                        sessions.append(section_queue.pop(0))
+
+            self.stdout.write(f'Running {len(sessions)} exam sessions with {concurrency} clients')
+            recorder, wall_seconds = run_sessions(sessions, concurrency, seed=options['seed'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        results = {
+            'commit': current_commit(),
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'database': connection.vendor,
+            'settings': {
+                'QUIZ_ASYNC_GRADING': settings.QUIZ_ASYNC_GRADING,
+                'QUIZ_ANSWER_BUFFER': settings.QUIZ_ANSWER_BUFFER,
+                'REQUEST_METRICS': settings.REQUEST_METRICS,
+            },
+            'parameters': {
+                name: options[name] for name in
+                ['students', 'sessions', 'sections', 'questions', 'options', 'assignments', 'notices', 'seed']
+            },
+            'concurrency': concurrency,
+            **summarize(recorder, wall_seconds),
+        }
+        self.report(results)
+
+        output = options['output'] or os.path.join(RESULTS_DIR, f'{results["commit"] or "results"}.json')
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w') as results_file:
+            json.dump(results, results_file, indent=2)
+        self.stdout.write(f'Results written to {output}')
+
+        if options['compare']:
+            with open(options['compare']) as baseline_file:
+                self.compare(json.load(baseline_file), results)
+
+    def report(self, results):
+        self.stdout.write(
+            f'{results["requests"]} requests in {results["wall_seconds"]}s, '
+            f'{results["throughput_rps"]} req/s, {results["errors"]} errors'
+        )
+        self.stdout.write(f'{"endpoint":<16}{"requests":>9}{"errors":>8}{"p50 ms":>9}{"p95 ms":>9}'
+                          f'{"p99 ms":>9}{"queries":>9}')
+        for label, stats in results['endpoints'].items():
+            self.stdout.write(
+                f'{label:<16}{stats["requests"]:>9}{stats["errors"]:>8}{stats["p50_ms"]:>9}'
+                f'{stats["p95_ms"]:>9}{stats["p99_ms"]:>9}{stats["queries_per_request"]:>9}'
+            )
+
+    def compare(self, baseline, results):
+        self.stdout.write(f'Compared with {baseline.get("commit")}:')
+        for label, stats in results['endpoints'].items():
+            before = baseline.get('endpoints', {}).get(label)
+            if before is None:
+                continue
+            change = (stats['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0
+            line = (f'{label:<16} p95 {before["p95_ms"]} -> {stats["p95_ms"]} ms ({change:+.0f}%), '
+                    f'queries {before["queries_per_request"]} -> {stats["queries_per_request"]}')
+            style = self.style.ERROR if change > 10 or stats['queries_per_request'] > before['queries_per_request'] \
+                else self.style.SUCCESS
+            self.stdout.write(style(line))
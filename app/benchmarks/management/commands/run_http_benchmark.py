@@ -0,0 +1,175 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.authtoken.models import Token
+
+from benchmarks.runner import run_http_load, summarize
+from benchmarks.seed import seed_institution
+from .run_benchmark import RESULTS_DIR, current_commit
+
+# how each deployment of scripts/run.sh is started, serving plain HTTP on the given port
+SERVERS = {
+    'wsgi': lambda port, workers: [
+        'uwsgi', '--http', f'127.0.0.1:{port}', '--workers', str(workers), '--master', '--enable-threads',
+        '--module', 'app.wsgi', '--disable-logging',
+    ],
+    'asgi': lambda port, workers: [
+        sys.executable, '-m', 'uvicorn', 'app.asgi:application', '--host', '127.0.0.1', '--port', str(port),
+        '--workers', str(workers), '--no-access-log',
+    ],
+}
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def wait_until_up(base_url, server, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise CommandError(f'server exited with code {server.returncode}')
+        try:
+            urllib.request.urlopen(base_url + '/api/schema/', timeout=5).close()
+            return
+        except urllib.error.HTTPError:
+            # any response means it is serving
+            return
+        except OSError:
+            time.sleep(0.5)
+    raise CommandError(f'server did not answer on {base_url} within {timeout}s')
+
+
+class Command(BaseCommand):
+    """Django command to compare the read throughput of the WSGI and ASGI deployments."""
+
+    help = (
+        'Seed a synthetic institution into a throwaway test database, serve it with uwsgi (WSGI) and '
+        'uvicorn (ASGI) in turn and load the read endpoints of both over HTTP at high concurrency.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', default='wsgi,asgi', help='Deployments to run, among wsgi and asgi.')
+        parser.add_argument('--students', type=int, default=2000, help='Students to seed.')
+        parser.add_argument('--clients', type=int, default=500, help='Students whose tokens are used.')
+        parser.add_argument('--sections', type=int, default=20, help='Sections, each with its own quiz.')
+        parser.add_argument('--questions', type=int, default=20, help='Questions per quiz.')
+        parser.add_argument('--notices', type=int, default=10, help='Notices per section.')
+        parser.add_argument('--workers', type=int, default=4, help='Server worker processes.')
+        parser.add_argument('--concurrency', type=int, default=200, help='Concurrent HTTP clients.')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds of load per server.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the data.')
+        parser.add_argument('--output', help='JSON file for the results (default: benchmarks/results/http-<commit>.json).')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        servers = options['servers'].split(',')
+        unknown = [server for server in servers if server not in SERVERS]
+        if unknown:
+            raise CommandError(f'unknown servers {", ".join(unknown)}')
+        if min(options['students'], options['clients'], options['concurrency'], options['workers']) < 1:
+            raise CommandError('--students, --clients, --concurrency and --workers must be positive')
+        if connection.vendor == 'sqlite':
+            # the servers run in other processes and cannot open the in-memory test database
+            raise CommandError('the HTTP benchmark needs PostgreSQL')
+
+        old_name = connection.settings_dict['NAME']
+        test_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        results = {
+            'commit': current_commit(),
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'parameters': {
+                name: options[name] for name in
+                ['students', 'clients', 'sections', 'questions', 'notices', 'workers', 'concurrency', 'duration',
+                 'seed']
+            },
+            'servers': {},
+        }
+        try:
+            sections = seed_institution(
+                options['students'], options['sections'], options['questions'], 4, 0, options['notices'],
+                seed=options['seed'],
+            )
+            clients = []
+            for quiz_id, students in sections.values():
+                for student_id in students:
+                    clients.append((student_id, [
+                        ('quiz_list', '/api/quizzes/quizzes/'),
+                        ('quiz_retrieve', f'/api/quizzes/quizzes/{quiz_id}/'),
+                        ('notice_list', '/api/notices/'),
+                        ('submission_list', '/api/quizzes/submitted-quizzes/'),
+                        ('profile', '/api/users/profile/'),
+                    ]))
+            clients = clients[:options['clients']]
+            tokens = [Token(key=Token.generate_key(), user_id=student_id) for student_id, _ in clients]
+            Token.objects.bulk_create(tokens)
+            clients = [(token.key, requests) for token, (_, requests) in zip(tokens, clients)]
+
+            for name in servers:
+                results['servers'][name] = self.run_server(name, test_name, clients, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        output = options['output'] or os.path.join(RESULTS_DIR, f'http-{results["commit"] or "results"}.json')
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w') as results_file:
+            json.dump(results, results_file, indent=2)
+        self.stdout.write(f'Results written to {output}')
+        if 'wsgi' in results['servers'] and 'asgi' in results['servers']:
+            self.compare(results['servers']['wsgi'], results['servers']['asgi'])
+
+    def run_server(self, name, test_name, clients, options):
+        port = free_port()
+        base_url = f'http://127.0.0.1:{port}'
+        env = {**os.environ, 'DB_NAME': test_name, 'APP_SERVER': name, 'REQUEST_METRICS': '0'}
+        self.stdout.write(f'Starting {name} on {base_url} with {options["workers"]} workers')
+        try:
+            server = subprocess.Popen(
+                SERVERS[name](port, options['workers']), cwd=settings.BASE_DIR, env=env,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+        except OSError as error:
+            raise CommandError(f'cannot start {name}: {error}')
+        try:
+            wait_until_up(base_url, server)
+            recorder, wall_seconds = run_http_load(base_url, clients, options['concurrency'], options['duration'])
+        finally:
+            server.terminate()
+            server.wait()
+
+        summary = summarize(recorder, wall_seconds)
+        for stats in summary['endpoints'].values():
+            # counted in the server, not visible to the HTTP clients
+            del stats['queries_per_request']
+        self.report(name, summary)
+        return summary
+
+    def report(self, name, summary):
+        self.stdout.write(
+            f'{name}: {summary["requests"]} requests in {summary["wall_seconds"]}s, '
+            f'{summary["throughput_rps"]} req/s, {summary["errors"]} errors'
+        )
+        self.stdout.write(f'{"endpoint":<16}{"requests":>9}{"errors":>8}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}')
+        for label, stats in summary['endpoints'].items():
+            self.stdout.write(
+                f'{label:<16}{stats["requests"]:>9}{stats["errors"]:>8}{stats["p50_ms"]:>9}'
+                f'{stats["p95_ms"]:>9}{stats["p99_ms"]:>9}'
+            )
+
+    def compare(self, wsgi, asgi):
+        self.stdout.write(f'throughput wsgi {wsgi["throughput_rps"]} -> asgi {asgi["throughput_rps"]} req/s')
+        for label, stats in asgi['endpoints'].items():
+            before = wsgi['endpoints'].get(label)
+            if before is not None:
+                self.stdout.write(f'{label:<16} p95 wsgi {before["p95_ms"]} -> asgi {stats["p95_ms"]} ms')
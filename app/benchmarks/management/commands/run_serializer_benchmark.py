@@ -0,0 +1,68 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from assignments.serializers import AssignmentSubmissionSerializer
+from benchmarks.seed import seed_activity, seed_institution
+from core.compiled import compile_serializer
+from core.models import AssignmentSubmission, QuizAttempt
+from core.renderers import ORJSONRenderer
+from quizzes.serializers import QuizAttemptSerializer
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the serialization of the hot list endpoints."""
+
+    help = (
+        'Seed quiz attempts and assignment submissions into a throwaway test database and report the rows '
+        'per second rendered to JSON by the DRF serializers and by their compiled form.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Attempts and submissions to seed.')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per variant, the best one is reported.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if min(options['rows'], options['repeat']) < 1:
+            raise CommandError('--rows and --repeat must be positive')
+
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            # one section with one assignment: a quiz attempt and a submission per student
+            seed_activity(seed_institution(options['rows'], 1, 1, 2, 1, 0))
+            context = {'request': APIRequestFactory().get('/')}
+            for label, serializer_class, queryset in [
+                ('quiz attempts', QuizAttemptSerializer, QuizAttempt.objects.order_by('-started_at')),
+                ('submissions', AssignmentSubmissionSerializer, AssignmentSubmission.objects.order_by('-submitted_at')),
+            ]:
+                compiled = compile_serializer(serializer_class)
+                variants = [
+                    ('serializer + json', lambda: JSONRenderer().render(
+                        serializer_class(queryset, many=True, context=context).data)),
+                    ('compiled + json', lambda: JSONRenderer().render(
+                        compiled.many(compiled.values(queryset), context))),
+                    ('compiled + orjson', lambda: ORJSONRenderer().render(
+                        compiled.many(compiled.values(queryset), context))),
+                ]
+                self.stdout.write(f'{label} ({options["rows"]} rows):')
+                baseline = None
+                for name, render in variants:
+                    seconds = min(self.time(render) for _ in range(options['repeat']))
+                    rate = options['rows'] / seconds
+                    baseline = baseline or rate
+                    self.stdout.write(f'  {name:<20}{rate:>12,.0f} rows/s{rate / baseline:>8.1f}x')
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def time(self, render):
+        started = time.perf_counter()
+        render()
+        return time.perf_counter() - started
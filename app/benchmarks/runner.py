@@ -0,0 +1,186 @@
+"""
+Replays the exam flow of seeded students against the real endpoints.
+
+Each virtual student logs in, lists notices, opens their section's quiz,
+starts an attempt, answers every question one request at a time and
+submits. Virtual students run concurrently on a thread pool, each with its
+own test client and database connection. Every request is timed and its
+SQL queries are counted.
+
+run_http_load() instead sends the read requests of many students over HTTP
+to a running server, to compare deployments (see run_http_benchmark).
+"""
+import math
+import queue
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection, connections
+from rest_framework.test import APIClient
+
+from .seed import PASSWORD
+
+
+class Recorder:
+    """Collects (seconds, queries, ok) samples per endpoint label from all threads."""
+
+    def __init__(self):
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def add(self, label, seconds, queries, ok):
+        with self.lock:
+            self.samples.setdefault(label, []).append((seconds, queries, ok))
+
+
+class QueryCounter:
+    def __init__(self):
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+
+def timed(recorder, label, expected_status, request, *args, **kwargs):
+    counter = QueryCounter()
+    start = time.perf_counter()
+    with connection.execute_wrapper(counter):
+        response = request(*args, **kwargs)
+    recorder.add(label, time.perf_counter() - start, counter.queries, response.status_code in expected_status)
+    return response
+
+
+def exam_session(recorder, student_id, quiz_id, rng):
+    """One student's exam: login, notices, quiz, start, answers, submit."""
+    client = APIClient()
+    response = timed(recorder, 'login', [200], client.post, '/api/users/login/',
+                     {'identification_number': student_id, 'password': PASSWORD}, format='json')
+    if response.status_code != 200:
+        return
+    client.credentials(HTTP_AUTHORIZATION=f'Token {response.data["token"]}')
+
+    timed(recorder, 'notice_list', [200], client.get, '/api/notices/')
+    response = timed(recorder, 'quiz_retrieve', [200], client.get, f'/api/quizzes/quizzes/{quiz_id}/')
+    if response.status_code != 200:
+        return
+    paper = response.data
+
+    response = timed(recorder, 'start_attempt', [200, 201], client.post,
+                     f'/api/quizzes/quizzes/{quiz_id}/start_attempt/')
+    if response.status_code not in [200, 201]:
+        return
+    attempt_code = response.data['quiz_attempt_code']
+
+    for question in paper['questions']:
+        timed(recorder, 'answer', [201], client.post, '/api/quizzes/answers/', {
+            'quiz_attempt_code': attempt_code,
+            'question_code': question['question_code'],
+            'selected_option_code': rng.choice(question['options'])['option_code'],
+        }, format='json')
+
+    timed(recorder, 'submit_attempt', [200, 202], client.post,
+          f'/api/quizzes/quizzes/{quiz_id}/submit_attempt/')
+
+
+def run_sessions(sessions, concurrency, seed=0):
+    """
+    Run exam_session for each (student_id, quiz_id) on `concurrency` threads.
+    Returns the Recorder and the wall time of the whole run.
+    """
+    recorder = Recorder()
+    pending = queue.SimpleQueue()
+    for position, session in enumerate(sessions):
+        pending.put((position, session))
+
+    def worker():
+        # one long-lived thread per virtual client, so connecting to the
+        # database happens once per thread and not inside a timed request
+        try:
+            while True:
+                try:
+                    position, (student_id, quiz_id) = pending.get_nowait()
+                except queue.Empty:
+                    return
+                exam_session(recorder, student_id, quiz_id, random.Random(seed + position))
+        finally:
+            connections.close_all()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    return recorder, time.perf_counter() - start
+
+
+def run_http_load(base_url, clients, concurrency, duration):
+    """
+    GET the requests of `clients`, a list of (token, [(label, path)]), from
+    `concurrency` threads for `duration` seconds, each thread cycling through
+    its share of the clients. Returns the Recorder (with no query counts, the
+    queries run in the server) and the wall time of the run.
+    """
+    recorder = Recorder()
+    stop_at = time.perf_counter() + duration
+
+    def worker(offset):
+        position = offset
+        while time.perf_counter() < stop_at:
+            token, requests = clients[position % len(clients)]
+            position += concurrency
+            for label, path in requests:
+                request = urllib.request.Request(base_url + path, headers={'Authorization': f'Token {token}'})
+                start = time.perf_counter()
+                try:
+                    with urllib.request.urlopen(request, timeout=60) as response:
+                        response.read()
+                        ok = response.status == 200
+                except OSError:
+                    # URLError, HTTPError and timeouts
+                    ok = False
+                recorder.add(label, time.perf_counter() - start, 0, ok)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker, offset) for offset in range(concurrency)]:
+            future.result()
+    return recorder, time.perf_counter() - start
+
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(percent / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(recorder, wall_seconds):
+    endpoints = {}
+    total_requests = 0
+    total_errors = 0
+    for label, samples in sorted(recorder.samples.items()):
+        latencies = sorted(seconds * 1000 for seconds, _, _ in samples)
+        errors = sum(1 for _, _, ok in samples if not ok)
+        endpoints[label] = {
+            'requests': len(samples),
+            'errors': errors,
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'mean_ms': round(sum(latencies) / len(latencies), 2),
+            'queries_per_request': round(sum(queries for _, queries, _ in samples) / len(samples), 2),
+        }
+        total_requests += len(samples)
+        total_errors += errors
+    return {
+        'wall_seconds': round(wall_seconds, 3),
+        'requests': total_requests,
+        'errors': total_errors,
+        'throughput_rps': round(total_requests / wall_seconds, 2) if wall_seconds else None,
+        'endpoints': endpoints,
+    }
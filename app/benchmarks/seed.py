@@ -0,0 +1,166 @@
+"""Bulk seeding of a synthetic institution for the benchmark."""
+import random
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from core.models import (
+    User, Program, SpecializationBranch, Section, Student, Teacher, Subject,
+    Quiz, Question, QuestionOption, Assignment, AssignmentSubmission, Notices, QuizAttempt,
+    StudentSelectedQuestionOption,
+)
+
+BATCH_SIZE = 1000
+PASSWORD = 'benchmark-password'
+
+
+def seed_institution(students, sections, questions, options, assignments, notices, seed=0):
+    """
+    Create one program and branch with `sections` sections, `students`
+    students spread over them, a live quiz per section and some assignments
+    and notices per section. Everything except the quizzes is inserted with
+    bulk_create. Returns {section_code: (quiz id, [student ids])}.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    # hashing once and sharing the hash keeps seeding fast, logins still run the real hasher
+    password = make_password(PASSWORD)
+
+    program = Program.objects.create(program_code='BENCH', name='Benchmark Program')
+    branch = SpecializationBranch.objects.create(
+        program=program, name='Benchmark Branch', specialization_branch_code='BENCH', total_credits=160
+    )
+    subject = Subject.objects.create(
+        subject_code='BENCH101', specialization_branch=branch, subject_name='Benchmarking', credits=4
+    )
+    section_codes = [f'BENCH-{number:03d}' for number in range(sections)]
+    Section.objects.bulk_create([
+        Section(section_code=code, specialization_branch=branch, total_students=students // sections)
+        for code in section_codes
+    ])
+
+    teacher_user = User.objects.create(identification_number='BENCH-T0', role='teacher', password=password)
+    teacher = Teacher.objects.create(
+        user=teacher_user, first_name='Bench', last_name='Teacher', department='BENCH', specialization_branch=branch
+    )
+
+    student_ids = [f'BENCH-S{number:06d}' for number in range(students)]
+    User.objects.bulk_create(
+        [User(identification_number=student_id, role='student', password=password) for student_id in student_ids],
+        batch_size=BATCH_SIZE,
+    )
+    Student.objects.bulk_create([
+        Student(
+            user_id=student_id, first_name='Bench', last_name=f'Student {number}', batch='2024',
+            section_id=section_codes[number % sections]
+        )
+        for number, student_id in enumerate(student_ids)
+    ], batch_size=BATCH_SIZE)
+
+    question_rows = []
+    option_rows = []
+    sessions = {}
+    for position, section_code in enumerate(section_codes):
+        quiz = Quiz.objects.create(
+            quiz_name=f'Benchmark Quiz {position}', quiz_subject=subject, teacher=teacher,
+            total_marks=questions, due_date=now.date(),
+            start_time=now - timedelta(hours=1), end_time=now + timedelta(hours=3),
+        )
+        quiz.sections.set([section_code])
+        for order in range(questions):
+            option_codes = [uuid.uuid4() for _ in range(options)]
+            question = Question(
+                quiz=quiz, question_text=f'Question {order}', question_type='multiple_choice',
+                correct_option_code=rng.choice(option_codes), order=order
+            )
+            question_rows.append(question)
+            option_rows.extend(
+                QuestionOption(option_code=code, related_question=question, text=f'Option {index}')
+                for index, code in enumerate(option_codes)
+            )
+        sessions[section_code] = (quiz.id, student_ids[position::sections])
+    Question.objects.bulk_create(question_rows, batch_size=BATCH_SIZE)
+    QuestionOption.objects.bulk_create(option_rows, batch_size=BATCH_SIZE)
+
+    Assignment.objects.bulk_create([
+        Assignment(
+            name=f'Assignment {number}', section_id=section_code, teacher=teacher, subject=subject,
+            total_marks=10, due_date=(now + timedelta(days=7)).date(), assignment_pdf='assignments/benchmark.pdf'
+        )
+        for section_code in section_codes for number in range(assignments)
+    ], batch_size=BATCH_SIZE)
+
+    notice_rows = Notices.objects.bulk_create([
+        Notices(title=f'Notice {number}', description='Benchmark notice', teacher=teacher)
+        for _ in section_codes for number in range(notices)
+    ], batch_size=BATCH_SIZE)
+    Notices.section.through.objects.bulk_create([
+        Notices.section.through(notices_id=notice.pk, section_id=section_codes[position // notices])
+        for position, notice in enumerate(notice_rows)
+    ], batch_size=BATCH_SIZE)
+
+    return sessions
+
+
+def seed_activity(sessions, pending=0.1, seed=0):
+    """
+    Give every student of `sessions` (as returned by seed_institution) an
+    attempt at the quiz of their section, graded except for a `pending`
+    share, and a submission to every assignment of their section.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    attempts = []
+    submissions = []
+    assignments = {}
+    for assignment_id, section_code in Assignment.objects.values_list('id', 'section_id'):
+        assignments.setdefault(section_code, []).append(assignment_id)
+    for section_code, (quiz_id, student_ids) in sessions.items():
+        for student_id in student_ids:
+            completed = rng.random() >= pending
+            attempts.append(QuizAttempt(
+                related_student_id=student_id, related_quiz_id=quiz_id, is_completed=completed,
+                ended_at=now if completed else None, marks_obtained=rng.randint(0, 10) if completed else 0,
+            ))
+            submissions.extend(
+                AssignmentSubmission(
+                    student_id=student_id, assignment_id=assignment_id, submission_pdf='submissions/benchmark.pdf'
+                )
+                for assignment_id in assignments.get(section_code, [])
+            )
+    QuizAttempt.objects.bulk_create(attempts, batch_size=BATCH_SIZE)
+    AssignmentSubmission.objects.bulk_create(submissions, batch_size=BATCH_SIZE)
+
+
+def seed_answers(seed=0):
+    """
+    Answer every question of every seeded attempt with a random option, one
+    batch of attempts at a time. Returns the number of answers. Run
+    quizzes.grading.regrade_quiz afterwards for scores that match them.
+    """
+    rng = random.Random(seed)
+    options = {}
+    for option_code, question_code in QuestionOption.objects.values_list('option_code', 'related_question_id'):
+        options.setdefault(question_code, []).append(option_code)
+    questions = {}
+    for question_code, quiz_id in Question.objects.values_list('question_code', 'quiz_id'):
+        questions.setdefault(quiz_id, []).append(question_code)
+
+    answered = 0
+    attempts = list(QuizAttempt.objects.values_list('quiz_attempt_code', 'related_quiz_id'))
+    per_batch = max(1, BATCH_SIZE * 10 // max(1, max(map(len, questions.values()), default=1)))
+    for start in range(0, len(attempts), per_batch):
+        answers = [
+            StudentSelectedQuestionOption(
+                quiz_attempt_id=attempt_code, question_id=question_code,
+                selected_option_id=rng.choice(options[question_code]),
+            )
+            for attempt_code, quiz_id in attempts[start:start + per_batch]
+            for question_code in questions.get(quiz_id, [])
+        ]
+        StudentSelectedQuestionOption.objects.bulk_create(answers, batch_size=BATCH_SIZE)
+        answered += len(answers)
+    return answered
+
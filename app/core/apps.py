@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    name = 'core'
+
+    def ready(self):
+        # connect the auth token cache invalidation handlers
+        from . import signals  # noqa: F401
+        # connect the request hooks of after_response() before the first request
+        from . import deferred  # noqa: F401
@@ -0,0 +1,125 @@
+"""
+ZIP archives built while they are sent (see stream_zip).
+
+Entries are compressed one after the other into a small buffer that is
+handed to the client as soon as it fills, without a temporary file.
+zipfile writes to the unseekable stream with data descriptors, and with
+ZIP64 extensions, so archives over 4 GB stay valid.
+
+Meanwhile the next ZIP_PREFETCH_FILES files are read from disk on a thread
+pool of the same size, so disk reads overlap compression. Each
+reader queues at most ZIP_PREFETCH_CHUNKS blocks of DOWNLOAD_CHUNK_SIZE,
+which bounds the memory of an archive whatever its total size.
+
+Entries are plain filesystem paths, resolved by the view before the
+response is built: the generator runs while the response is sent (on the
+event loop under ASGI) and the reader threads would each open a database
+connection nothing closes, so neither may touch the database.
+"""
+import queue
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+# marks the end of a file in its reader's queue
+END_OF_FILE = object()
+
+
+class StreamBuffer:
+    """Write-only file object that zipfile writes into and stream_zip drains."""
+
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+        self.position = 0
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.size += len(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        self.size = 0
+        return data
+
+
+def put(chunks, item, stop):
+    # give up when the archive was abandoned, so the reader thread ends
+    while not stop.is_set():
+        try:
+            chunks.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def read_file(path, chunks, stop, chunk_size):
+    try:
+        with open(path, 'rb') as file:
+            while True:
+                block = file.read(chunk_size)
+                if not block:
+                    break
+                if not put(chunks, block, stop):
+                    return
+    except Exception as error:
+        put(chunks, error, stop)
+        return
+    put(chunks, END_OF_FILE, stop)
+
+
+def stream_zip(entries):
+    """
+    Yield the bytes of a ZIP archive of `entries`, an iterable of
+    (archive name, filesystem path) tuples.
+    """
+    prefetch = settings.ZIP_PREFETCH_FILES
+    chunk_size = settings.DOWNLOAD_CHUNK_SIZE
+    entries = iter(entries)
+    stop = threading.Event()
+    pending = deque()
+    output = StreamBuffer()
+    pool = ThreadPoolExecutor(max_workers=prefetch, thread_name_prefix='zip-read')
+
+    def start_next():
+        for archive_name, path in entries:
+            chunks = queue.Queue(maxsize=settings.ZIP_PREFETCH_CHUNKS)
+            pool.submit(read_file, path, chunks, stop, chunk_size)
+            pending.append((archive_name, chunks))
+            return
+
+    try:
+        for _ in range(prefetch):
+            start_next()
+        with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED,
+                             compresslevel=settings.ZIP_COMPRESSLEVEL) as archive:
+            while pending:
+                archive_name, chunks = pending.popleft()
+                start_next()
+                with archive.open(archive_name, 'w', force_zip64=True) as entry:
+                    while True:
+                        block = chunks.get()
+                        if block is END_OF_FILE:
+                            break
+                        if isinstance(block, Exception):
+                            raise block
+                        entry.write(block)
+                        if output.size >= chunk_size:
+                            yield output.drain()
+        yield output.drain()
+    finally:
+        stop.set()
+        pool.shutdown(wait=False)
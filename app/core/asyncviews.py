@@ -0,0 +1,68 @@
+"""
+Async views for the read-heavy endpoints, used when the app is deployed
+under ASGI (ASYNC_READ_VIEWS, see scripts/run.sh).
+
+Django 4.0 has no async ORM, so the DRF view itself still runs in a thread.
+What the async view changes is what a request holds while it runs:
+
+- the view runs on a pool of ASYNC_READ_THREADS threads, so a slow query
+  holds one of them (and one database connection) while the worker keeps
+  accepting and answering other requests
+- DRF authenticates the request there with the configured authenticators;
+  CachedTokenAuthentication resolves a token from the per-process token
+  cache (core/authentication.py) without a query
+
+Other methods of the same URL (creates, updates) run like any sync view.
+"""
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.urls import URLPattern
+
+READ_METHODS = ['GET', 'HEAD', 'OPTIONS']
+
+read_executor = ThreadPoolExecutor(max_workers=settings.ASYNC_READ_THREADS, thread_name_prefix='async-read')
+
+
+def run_view(view, request, args, kwargs):
+    # the pool threads are not request threads, so they close their
+    # connections themselves, like the request_started/finished handlers do
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def async_read_view(view):
+    """Wrap a DRF view function so its reads are served as described above."""
+
+    @functools.wraps(view)
+    async def async_view(request, *args, **kwargs):
+        if request.method not in READ_METHODS:
+            return await sync_to_async(view)(request, *args, **kwargs)
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            read_executor, context.run, run_view, view, request, args, kwargs
+        )
+
+    return async_view
+
+
+def serve_reads_async(urlpatterns, names):
+    """Serve the named URL patterns with async_read_view when ASYNC_READ_VIEWS is on."""
+    if not settings.ASYNC_READ_VIEWS:
+        return urlpatterns
+    return [
+        URLPattern(pattern.pattern, async_read_view(pattern.callback), pattern.default_args, pattern.name)
+        if isinstance(pattern, URLPattern) and pattern.name in names else pattern
+        for pattern in urlpatterns
+    ]
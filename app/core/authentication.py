@@ -0,0 +1,129 @@
+"""
+Token authentication that resolves a token without touching the database.
+
+A token resolves to its User with the student or teacher profile already
+attached (request.user.student / request.user.teacher do not query). The
+lookup goes through two tiers:
+
+- a small LRU inside each worker process, kept for AUTH_TOKEN_LOCAL_TIMEOUT
+  seconds only, since another worker cannot clear it
+- the shared Django cache (AUTH_TOKEN_CACHE), kept for AUTH_TOKEN_TIMEOUT
+
+Only a miss on both tiers reads the Token, User and profile rows, in one
+query. invalidate_user_tokens() clears the shared tier and this process's
+LRU; it runs when a token is deleted (logout) and when a user or profile is
+saved (password change, section move), see core/signals.py. Other workers
+may keep accepting a revoked token for at most AUTH_TOKEN_LOCAL_TIMEOUT
+seconds.
+"""
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class LocalTokenCache:
+    """Bounded LRU of pickled users with a time to live, safe to share between threads."""
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+        # every request gets its own copy, views may modify request.user
+        return pickle.loads(payload)
+
+    def set(self, key, user):
+        if self.max_size <= 0 or self.timeout <= 0:
+            return
+        payload = pickle.dumps(user)
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.timeout, payload)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_tokens = LocalTokenCache(settings.AUTH_TOKEN_LOCAL_SIZE, settings.AUTH_TOKEN_LOCAL_TIMEOUT)
+
+
+def token_cache():
+    return caches[settings.AUTH_TOKEN_CACHE]
+
+
+def token_cache_key(key):
+    # tokens are credentials, so only their digest is used as a cache key
+    return 'auth_token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def load_user(key):
+    """Read a token's user with its profile attached, in a single query."""
+    token = Token.objects.select_related(
+        'user__student__section__specialization_branch', 'user__teacher__specialization_branch'
+    ).get(key=key)
+    user = token.user
+    # the cached copy carries neither the token key nor the password hash:
+    # user.auth_token and user.password are read from the database on access,
+    # and save() leaves a password it did not load as it is
+    user._state.fields_cache.pop('auth_token', None)
+    user.__dict__.pop('password', None)
+    return user
+
+
+def invalidate_token(key):
+    cache_key = token_cache_key(key)
+    token_cache().delete(cache_key)
+    local_tokens.delete(cache_key)
+
+
+def invalidate_user_tokens(user_id):
+    for key in Token.objects.filter(user_id=user_id).values_list('key', flat=True):
+        invalidate_token(key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Drop-in replacement for TokenAuthentication ("Authorization: Token <key>")."""
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        user = local_tokens.get(cache_key)
+        if user is None:
+            user = token_cache().get(cache_key)
+            if user is None:
+                try:
+                    user = load_user(key)
+                except Token.DoesNotExist:
+                    raise exceptions.AuthenticationFailed('Invalid token.')
+                token_cache().set(cache_key, user, timeout=settings.AUTH_TOKEN_TIMEOUT)
+            local_tokens.set(cache_key, user)
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        # an unsaved Token keeps request.auth compatible with TokenAuthentication
+        return (user, Token(key=key, user=user))
@@ -0,0 +1,170 @@
+"""
+Read-only fast path for serializers of hot list endpoints.
+
+compile_serializer() turns a ModelSerializer class, once, into the list of
+columns its readable fields need and a flat function from a `.values()` row
+to the dict the serializer would return. Listing then skips model
+instances, related objects and the per-field machinery of DRF, which is most
+of the time spent serializing a page.
+
+Only plain fields and dotted sources over model fields compile; a serializer
+with method fields, nested serializers, source='*' or properties raises
+NotCompilable and has to be used as is. The output is the same as the
+serializer's, which core/tests.py checks for the compiled serializers.
+"""
+from functools import partial
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .metrics import timed_serialization
+
+_compiled = {}
+
+
+class NotCompilable(Exception):
+    pass
+
+
+def model_lookup(model, source_attrs):
+    """The `.values()` lookup of a serializer source, checked against the model fields."""
+    for position, attr in enumerate(source_attrs):
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            raise NotCompilable(f'{model.__name__}.{attr} is not a model field')
+        if position < len(source_attrs) - 1:
+            if not field.is_relation or field.many_to_many or field.one_to_many:
+                raise NotCompilable(f'{model.__name__}.{attr} is not a single related object')
+            model = field.related_model
+    if field.many_to_many or field.one_to_many:
+        raise NotCompilable(f'{model.__name__}.{field.name} has several values per row')
+    return '__'.join(source_attrs), field
+
+
+def datetime_converter(field):
+    if getattr(field, 'format', api_settings.DATETIME_FORMAT) != ISO_8601:
+        return field.to_representation
+
+    def convert(value):
+        value = field.enforce_timezone(value).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return convert
+
+
+def file_converter(field, model_field):
+    storage = model_field.storage
+    if not getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+        # the stored name, as the column holds it
+        return lambda value, context: value or None
+
+    def convert(value, context):
+        if not value:
+            return None
+        url = storage.url(value)
+        request = context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
+    return convert
+
+
+def field_converter(field, model_field):
+    """
+    Function applied to a non-null column value, None when the value is
+    returned as it comes from the database. File fields get the serializer
+    context as second argument.
+    """
+    if isinstance(field, (serializers.BooleanField, serializers.IntegerField, serializers.CharField)) \
+            and not isinstance(field, (serializers.UUIDField, serializers.DecimalField)):
+        # the database already returns these as bool, int and str
+        return None
+    if isinstance(field, serializers.PrimaryKeyRelatedField):
+        # .values() of a foreign key is the related primary key
+        return None if field.pk_field is None else field.pk_field.to_representation
+    if isinstance(field, serializers.DateTimeField):
+        return datetime_converter(field)
+    if isinstance(field, serializers.UUIDField) and field.uuid_format == 'hex_verbose':
+        return str
+    if isinstance(field, serializers.FileField):
+        return file_converter(field, model_field)
+    return field.to_representation
+
+
+class CompiledSerializer:
+
+    def __init__(self, serializer_class):
+        model = serializer_class.Meta.model
+        # (output name, column, converter, whether it takes the context) in field order
+        self.fields = []
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if field.source == '*' or isinstance(field, (
+                serializers.BaseSerializer, serializers.SerializerMethodField, serializers.ManyRelatedField,
+                serializers.HiddenField,
+            )) or (isinstance(field, serializers.RelatedField)
+                   and not isinstance(field, serializers.PrimaryKeyRelatedField)):
+                raise NotCompilable(f'{serializer_class.__name__}.{name} cannot be read from a row')
+            lookup, model_field = model_lookup(model, field.source_attrs)
+            convert = field_converter(field, model_field)
+            self.fields.append((name, lookup, convert, isinstance(field, serializers.FileField)))
+        self.columns = [lookup for _, lookup, _, _ in self.fields]
+
+    def values(self, queryset, extra=()):
+        """`queryset` as rows with the columns of the serializer and the `extra` ones (e.g. the ordering keys)."""
+        return queryset.values(*dict.fromkeys([*self.columns, *extra]))
+
+    def bind(self, context):
+        return [
+            (name, lookup, partial(convert, context=context or {}) if takes_context else convert)
+            for name, lookup, convert, takes_context in self.fields
+        ]
+
+    def to_representation(self, row, context=None):
+        return self.many([row], context)[0]
+
+    def many(self, rows, context=None):
+        fields = self.bind(context)
+        data = []
+        for row in rows:
+            item = {}
+            for name, lookup, convert in fields:
+                value = row[lookup]
+                item[name] = value if convert is None or value is None else convert(value)
+            data.append(item)
+        return data
+
+
+def compile_serializer(serializer_class):
+    """The CompiledSerializer of `serializer_class`, built on first use."""
+    compiled = _compiled.get(serializer_class)
+    if compiled is None:
+        compiled = _compiled[serializer_class] = CompiledSerializer(serializer_class)
+    return compiled
+
+
+class CompiledListMixin:
+    """
+    Viewset mixin serving list() from `.values()` rows through the compiled
+    form of the serializer class. Retrieve and writes keep the serializer.
+    """
+
+    def list(self, request, *args, **kwargs):
+        compiled = compile_serializer(self.get_serializer_class())
+        queryset = self.filter_queryset(self.get_queryset())
+        # cursor pagination reads its position from the row
+        ordering = getattr(self.paginator, 'ordering', None) or ()
+        rows = compiled.values(queryset, extra=[key.lstrip('-') for key in ordering])
+        context = self.get_serializer_context()
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            rows = page
+        with timed_serialization():
+            data = compiled.many(rows, context)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
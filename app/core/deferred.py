@@ -0,0 +1,43 @@
+"""
+Work deferred until the response of the current request has been sent.
+
+after_response() queues a callback on the request being served; Django's
+request_finished signal, sent once the server has written the response and
+closed it, runs the queue. Outside a request (management commands, the
+grading worker, tests calling functions directly) the callback runs at once.
+"""
+import logging
+from contextvars import ContextVar
+
+from django.core.signals import request_finished, request_started
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+# callbacks of the request served in this context, None outside a request
+pending_callbacks = ContextVar('pending_callbacks', default=None)
+
+
+def after_response(callback):
+    callbacks = pending_callbacks.get()
+    if callbacks is None:
+        callback()
+    else:
+        callbacks.append(callback)
+
+
+@receiver(request_started)
+def start_request(**kwargs):
+    pending_callbacks.set([])
+
+
+@receiver(request_finished)
+def run_pending_callbacks(**kwargs):
+    callbacks = pending_callbacks.get()
+    pending_callbacks.set(None)
+    for callback in callbacks or ():
+        # the response is already sent, a failure can only be logged
+        try:
+            callback()
+        except Exception:
+            logger.exception('Deferred callback %r failed', callback)
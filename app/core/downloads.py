@@ -0,0 +1,104 @@
+"""
+Delivery of stored files (assignment and submission PDFs) to the clients
+allowed to read them.
+
+With MEDIA_ACCEL_REDIRECT set, the response only carries an X-Accel-Redirect
+header and nginx sends the file itself, with Range support, from an
+`internal` location over MEDIA_ROOT. Otherwise the file is streamed from
+storage in DOWNLOAD_CHUNK_SIZE blocks, honouring a single byte range, so a
+worker holds one block in memory whatever the size of the file. Under ASGI
+these reads block, so the download paths are served by the WSGI handler on
+threads of their own (see app/asgi.py).
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """
+    Return the inclusive (start, end) of a `Range: bytes=...` header, or None
+    when the whole file should be sent (no header, a malformed one or several
+    ranges, which servers may ignore). Raises RangeNotSatisfiable for a range
+    outside the file.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def read_blocks(file, start, length, chunk_size):
+    try:
+        file.seek(start)
+        while length > 0:
+            block = file.read(min(chunk_size, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+    finally:
+        file.close()
+
+
+def content_disposition(filename):
+    return f"attachment; filename*=UTF-8''{quote(filename)}"
+
+
+def download_response(request, field_file):
+    """Response delivering a FieldFile as an attachment named after its base name."""
+    filename = os.path.basename(field_file.name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    if settings.MEDIA_ACCEL_REDIRECT:
+        response = HttpResponse(content_type=content_type)
+        # where the storage keeps the file under MEDIA_ROOT, which may differ from its name
+        stored_name = os.path.relpath(field_file.path, settings.MEDIA_ROOT).replace(os.sep, '/')
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT + quote(stored_name)
+        response['Content-Disposition'] = content_disposition(filename)
+        return response
+
+    file = field_file.storage.open(field_file.name, 'rb')
+    size = field_file.storage.size(field_file.name)
+    try:
+        byte_range = parse_range(request.headers.get('Range'), size)
+    except RangeNotSatisfiable:
+        file.close()
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    start, end = byte_range if byte_range else (0, size - 1)
+    response = StreamingHttpResponse(
+        read_blocks(file, start, end - start + 1, settings.DOWNLOAD_CHUNK_SIZE),
+        status=206 if byte_range else 200, content_type=content_type
+    )
+    response['Content-Length'] = end - start + 1
+    response['Accept-Ranges'] = 'bytes'
+    if byte_range:
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Disposition'] = content_disposition(filename)
+    return response
@@ -0,0 +1,94 @@
+"""
+Live events per section, for the server-sent events stream in quizzes/live.py.
+
+publish_event() appends an event to the section's log in the cache: a
+counter (live_events_seq:<section>) hands out increasing event ids and each
+event is stored under its own key until LIVE_EVENTS_TIMEOUT. The log is the
+source of truth. It is what lets a stream started in another process (or a
+reconnecting client sending Last-Event-ID) catch up.
+
+Streams in the same process are also woken up at once through an
+in-process broker, so they do not wait for their next poll of the log.
+Publishers can run in any thread (sync views, signal handlers), the broker
+hands the wake-up over to the event loop of each stream.
+"""
+import json
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+def events_cache():
+    return caches[settings.LIVE_EVENTS_CACHE]
+
+
+def sequence_key(section_code):
+    return f'live_events_seq:{section_code}'
+
+
+def event_key(section_code, event_id):
+    return f'live_event:{section_code}:{event_id}'
+
+
+class Broker:
+    """Wakes up the streams of a section that live in this process."""
+
+    def __init__(self):
+        self.subscribers = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, section_code, loop, wake_up):
+        with self.lock:
+            self.subscribers.setdefault(section_code, set()).add((loop, wake_up))
+
+    def unsubscribe(self, section_code, loop, wake_up):
+        with self.lock:
+            subscribers = self.subscribers.get(section_code, set())
+            subscribers.discard((loop, wake_up))
+            if not subscribers:
+                self.subscribers.pop(section_code, None)
+
+    def publish(self, section_code):
+        with self.lock:
+            subscribers = list(self.subscribers.get(section_code, ()))
+        for loop, wake_up in subscribers:
+            # wake_up is an asyncio.Event, which must be set from its own loop
+            loop.call_soon_threadsafe(wake_up.set)
+
+
+broker = Broker()
+
+
+def last_event_id(section_code):
+    return events_cache().get(sequence_key(section_code), 0)
+
+
+def publish_event(section_code, event_type, data):
+    cache = events_cache()
+    timeout = settings.LIVE_EVENTS_TIMEOUT
+    cache.add(sequence_key(section_code), 0, timeout=None)
+    event_id = cache.incr(sequence_key(section_code))
+    cache.set(event_key(section_code, event_id), {
+        'id': event_id,
+        'type': event_type,
+        'data': json.dumps(data, cls=DjangoJSONEncoder),
+    }, timeout=timeout)
+    broker.publish(section_code)
+    return event_id
+
+
+def events_since(section_code, after_id, limit=100):
+    """Events of a section with an id greater than after_id, oldest first."""
+    newest = last_event_id(section_code)
+    if newest < after_id:
+        # the counter was evicted from the cache and started over
+        after_id = 0
+    if newest == after_id:
+        return []
+    # a client that was away for too long only gets the latest `limit` events
+    first = max(after_id + 1, newest - limit + 1)
+    keys = [event_key(section_code, event_id) for event_id in range(first, newest + 1)]
+    events = events_cache().get_many(keys)
+    return [events[key] for key in keys if key in events]
@@ -0,0 +1,144 @@
+import re
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from benchmarks.seed import seed_activity, seed_institution
+from core.models import Assignment, AssignmentSubmission, Notices, Quiz, QuizAttempt, Student
+from notices.feed import NOTICE_FEED_SIZE
+from quizzes.grading import pending_attempts
+
+# PostgreSQL: "Seq Scan on core_quiz", SQLite: "SCAN core_quiz" (a full scan of an index reads "SCAN t USING ...")
+SEQ_SCAN_RE = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'\bSCAN (\w+)\s*$', re.MULTILINE),
+}
+EXECUTION_TIME_RE = re.compile(r'Execution Time: ([\d.]+) ms')
+
+
+def hot_queries():
+    """
+    (label, queryset) of the queries behind the busiest endpoints and
+    workers, built the way the views build them, for a sample section,
+    student and teacher of the seeded data.
+    """
+    page = settings.REST_FRAMEWORK['PAGE_SIZE'] + 1
+    student = Student.objects.order_by('pk').first()
+    section_code = student.section_id
+    quiz = Quiz.objects.filter(sections=section_code).first()
+    teacher_id = quiz.teacher_id
+    assignment = Assignment.objects.filter(section=section_code).first()
+    now = timezone.now()
+    return [
+        ('quizzes of a section', Quiz.objects.filter(sections=section_code).order_by('-created_at', '-id')[:page]),
+        ('quizzes of a teacher', Quiz.objects.filter(teacher=teacher_id).order_by('-created_at', '-id')[:page]),
+        ('section schedule', Quiz.objects.filter(sections=section_code, end_time__gt=now)
+            .order_by('start_time').values_list('id', 'quiz_name', 'start_time', 'end_time')),
+        ('attempts of a student', QuizAttempt.objects.filter(related_student=student)
+            .order_by('-started_at', '-quiz_attempt_code')[:page]),
+        ('graded attempts of a quiz', QuizAttempt.objects.filter(related_quiz=quiz, is_completed=True)
+            .values_list('related_student_id', 'related_student__first_name', 'related_student__last_name',
+                         'related_student__section_id', 'marks_obtained')),
+        ('pending attempts', pending_attempts(now).order_by('started_at').values_list('pk', 'related_quiz_id')[:200]),
+        ('open attempts', QuizAttempt.objects.filter(is_completed=False, ended_at__isnull=True)),
+        ('assignments of a section', Assignment.objects.filter(section=section_code)
+            .order_by('-created_at', '-id')[:page]),
+        ('assignments of a teacher', Assignment.objects.filter(teacher=teacher_id)
+            .order_by('-created_at', '-id')[:page]),
+        ('submissions of an assignment', AssignmentSubmission.objects.filter(assignment=assignment)
+            .select_related('student').order_by('student_id')),
+        ('submissions to a teacher', AssignmentSubmission.objects.filter(assignment__teacher=teacher_id)
+            .order_by('-submitted_at', '-id')[:page]),
+        ('submissions of a student', AssignmentSubmission.objects.filter(student=student)
+            .order_by('-submitted_at', '-id')[:page]),
+        ('notice feed of a section', Notices.objects.filter(section=section_code)
+            .order_by('-created_at', '-id')[:NOTICE_FEED_SIZE]),
+        ('notices of a teacher', Notices.objects.filter(teacher=teacher_id).order_by('-created_at', '-id')[:page]),
+    ]
+
+
+def table_rows(table):
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}')
+        return cursor.fetchone()[0]
+
+
+class Command(BaseCommand):
+    """Django command to explain the hot queries on seeded data."""
+
+    help = (
+        'Seed a synthetic institution into a throwaway test database, run EXPLAIN ANALYZE over the queries '
+        'of the busiest endpoints and flag the sequential scans of tables that are not small.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=5000, help='Students to seed.')
+        parser.add_argument('--sections', type=int, default=20, help='Sections, each with its own quiz.')
+        parser.add_argument('--questions', type=int, default=10, help='Questions per quiz.')
+        parser.add_argument('--options', type=int, default=4, help='Options per question.')
+        parser.add_argument('--assignments', type=int, default=5, help='Assignments per section.')
+        parser.add_argument('--notices', type=int, default=20, help='Notices per section.')
+        parser.add_argument('--min-rows', type=int, default=1000,
+                            help='Sequential scans of tables with fewer rows are not flagged.')
+        parser.add_argument('--fail', action='store_true', help='Exit with an error when a scan is flagged.')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if connection.vendor not in SEQ_SCAN_RE:
+            raise CommandError(f'{connection.vendor} is not supported, use PostgreSQL or SQLite')
+        if min(options['students'], options['sections']) < 1:
+            raise CommandError('--students and --sections must be positive')
+
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            seed_activity(seed_institution(
+                options['students'], options['sections'], options['questions'], options['options'],
+                options['assignments'], options['notices'],
+            ))
+            # planner statistics, as autovacuum would have them on a live database
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            flagged = self.explain(hot_queries(), options['min_rows'], options['verbose_plans'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if flagged and options['fail']:
+            raise CommandError(f'{len(flagged)} queries scan whole tables: {", ".join(flagged)}')
+
+    def explain(self, queries, min_rows, verbose_plans):
+        """Print the time and the flagged scans of each query, return the labels of the flagged ones."""
+        sizes = {}
+        flagged = []
+        self.stdout.write(f'{"query":<32}{"ms":>9}  sequential scans')
+        for label, queryset in queries:
+            if connection.vendor == 'postgresql':
+                plan = queryset.explain(analyze=True)
+                milliseconds = float(EXECUTION_TIME_RE.search(plan).group(1))
+            else:
+                # SQLite has no EXPLAIN ANALYZE: the plan, and the query timed on its own
+                plan = queryset.explain()
+                started = time.perf_counter()
+                list(queryset)
+                milliseconds = (time.perf_counter() - started) * 1000
+            scans = []
+            for table in dict.fromkeys(SEQ_SCAN_RE[connection.vendor].findall(plan)):
+                if table not in sizes:
+                    sizes[table] = table_rows(table)
+                if sizes[table] >= min_rows:
+                    scans.append(f'{table} ({sizes[table]} rows)')
+
+            line = f'{label:<32}{milliseconds:>9.2f}  {", ".join(scans) or "-"}'
+            self.stdout.write(self.style.ERROR(line) if scans else line)
+            if verbose_plans:
+                self.stdout.write(plan)
+            if scans:
+                flagged.append(label)
+        return flagged
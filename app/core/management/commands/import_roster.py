@@ -0,0 +1,75 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django import db
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+
+from core.roster import KINDS, PASSWORD_MODES, RosterError, RosterImport, read_rows
+
+
+def close_inherited_connections():
+    # a forked worker must not share the parent's database connection
+    db.connections.close_all()
+
+
+class Command(BaseCommand):
+    """Django command to bulk import sections, students, teachers or teaching assignments."""
+
+    help = (
+        'Import a CSV (with a header row) or JSON Lines roster in chunks with bulk inserts. '
+        'Import sections before the students and teachers that reference them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=KINDS, help='What the roster contains.')
+        parser.add_argument('path', help='Path to a .csv or .jsonl file.')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Rows validated and written per transaction.')
+        parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(),
+                            help='Processes hashing passwords.')
+        parser.add_argument('--passwords', choices=PASSWORD_MODES, default='plain',
+                            help='plain: hash the password column. hashed: the column already holds Django '
+                                 'password hashes. unusable: ignore it, users must reset their password.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        started = time.monotonic()
+
+        def progress(rows):
+            elapsed = time.monotonic() - started
+            self.stdout.write(f'{rows} rows, {rows / elapsed:.0f} rows/s')
+
+        pool = None
+        hash_passwords = None
+        if options['passwords'] == 'plain' and options['workers'] > 1:
+            close_inherited_connections()
+            pool = ProcessPoolExecutor(
+                max_workers=options['workers'],
+                mp_context=multiprocessing.get_context('fork'),
+                initializer=close_inherited_connections,
+            )
+
+            def hash_passwords(passwords):
+                # map() submits every hash at once, so they run while the previous chunk is written
+                chunksize = max(1, len(passwords) // (4 * options['workers']))
+                return pool.map(make_password, passwords, chunksize=chunksize)
+
+        roster_import = RosterImport(options['kind'], options['passwords'], hash_passwords)
+        try:
+            rows = roster_import.run(read_rows(options['path']), options['chunk_size'], progress)
+        except (RosterError, OSError) as error:
+            raise CommandError(error)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        for message in roster_import.errors:
+            self.stderr.write(message)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{rows} rows in {elapsed:.1f}s ({rows / elapsed if elapsed else rows:.0f} rows/s): '
+            f'{roster_import.created} created, {roster_import.skipped} already existed, '
+            f'{len(roster_import.errors)} invalid'
+        ))
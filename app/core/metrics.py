@@ -0,0 +1,122 @@
+"""
+In-process request metrics in the Prometheus text format.
+
+RequestMetricsMiddleware (core/middleware.py) observes every request into
+the histograms below, labelled with the resolved URL name and the method.
+GET /api/metrics/ renders them for a Prometheus scrape.
+
+Each worker process keeps its own registry, so a scrape answered by one
+uwsgi worker only covers that worker's requests. Scrape each worker, or run
+a single worker per container, for totals.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Histogram:
+    """A cumulative histogram per label set, as exposed by Prometheus clients."""
+
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        # labels -> [count per bucket (not cumulative), +Inf count, sum]
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, labels, value):
+        position = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0]
+            series[position] += 1
+            series[-1] += value
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            series = {labels: list(values) for labels, values in self.series.items()}
+        for labels, values in sorted(series.items()):
+            label_text = ','.join(f'{name}="{value}"' for name, value in labels)
+            total = 0
+            for edge, count in zip(self.buckets + ('+Inf',), values):
+                total += count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{edge}"}} {total}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {values[-1]}')
+            lines.append(f'{self.name}_count{{{label_text}}} {total}')
+        return lines
+
+
+REQUEST_SECONDS = Histogram('kojo_request_duration_seconds', 'Wall time of a request.', SECONDS_BUCKETS)
+DB_SECONDS = Histogram('kojo_request_db_seconds', 'Time spent in SQL queries per request.', SECONDS_BUCKETS)
+SERIALIZER_SECONDS = Histogram(
+    'kojo_request_serializer_seconds',
+    'Time spent turning the view result into the response body per request: the compiled serializers of '
+    'the list endpoints and the JSON rendering.',
+    SECONDS_BUCKETS,
+)
+QUERIES = Histogram('kojo_request_queries', 'Number of SQL queries per request.', QUERY_BUCKETS)
+HISTOGRAMS = [REQUEST_SECONDS, DB_SECONDS, SERIALIZER_SECONDS, QUERIES]
+
+
+class RequestTimings:
+    """What one request spent, filled in by the query wrapper and timed_serialization()."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializer_depth = 0
+
+    def time_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - start
+            self.queries += 1
+
+
+# timings of the request being handled, None outside of a request
+current_timings = ContextVar('current_timings', default=None)
+
+
+def observe_request(endpoint, method, wall_seconds, timings):
+    labels = (('endpoint', endpoint), ('method', method))
+    REQUEST_SECONDS.observe(labels, wall_seconds)
+    DB_SECONDS.observe(labels, timings.db_seconds)
+    SERIALIZER_SECONDS.observe(labels, timings.serializer_seconds)
+    QUERIES.observe(labels, timings.queries)
+
+
+def render_metrics():
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.expose())
+    return '\n'.join(lines) + '\n'
+
+
+@contextmanager
+def timed_serialization():
+    """
+    Count the time spent in the block as the current request's serializer
+    time. Nested blocks are already part of the outermost one.
+    """
+    timings = current_timings.get()
+    if timings is None or timings.serializer_depth:
+        yield
+        return
+    timings.serializer_depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.serializer_seconds += time.perf_counter() - start
+        timings.serializer_depth -= 1
@@ -0,0 +1,50 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .metrics import RequestTimings, current_timings, observe_request
+
+
+class RequestMetricsMiddleware:
+    """
+    Record query count, DB time, serializer time and wall time per URL name
+    (see core/metrics.py) and report them in a Server-Timing header. The
+    serializer time is what the orjson renderer and the compiled list
+    serializers report through timed_serialization(); the DRF serializers of
+    other views build their data in the view and only count in the total.
+
+    Enabled with REQUEST_METRICS. When it is off, Django drops the
+    middleware at startup and requests do not go through it at all.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings.time_query))
+                response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        wall_seconds = time.perf_counter() - start
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        endpoint = resolver_match.view_name if resolver_match else 'unresolved'
+        observe_request(endpoint, request.method, wall_seconds, timings)
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={timings.db_seconds * 1000:.1f};desc="{timings.queries} queries"',
+            f'serializer;dur={timings.serializer_seconds * 1000:.1f}',
+            f'total;dur={wall_seconds * 1000:.1f}',
+        ])
+        return response
@@ -0,0 +1,33 @@
+# Generated by Django 4.0.10 on 2026-10-18 10:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['created_at', 'id'], name='assignment_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assignmentsubmission',
+            index=models.Index(fields=['submitted_at', 'id'], name='submission_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notices',
+            index=models.Index(fields=['created_at', 'id'], name='notice_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['created_at', 'id'], name='quiz_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['started_at', 'quiz_attempt_code'], name='attempt_started_idx'),
+        ),
+    ]
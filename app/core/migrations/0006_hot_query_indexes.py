@@ -0,0 +1,53 @@
+# Generated by Django 4.0.10 on 2026-10-18 10:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_question_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['section', 'created_at', 'id'], name='assignment_section_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['teacher', 'created_at', 'id'], name='assignment_teacher_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assignmentsubmission',
+            index=models.Index(fields=['assignment', 'submitted_at', 'id'], name='submission_assignment_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assignmentsubmission',
+            index=models.Index(fields=['student', 'submitted_at', 'id'], name='submission_student_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notices',
+            index=models.Index(fields=['teacher', 'created_at', 'id'], name='notice_teacher_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['teacher', 'created_at', 'id'], name='quiz_teacher_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['end_time', 'start_time'], name='quiz_window_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['related_student', 'started_at', 'quiz_attempt_code'], name='attempt_student_started_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['related_quiz', 'is_completed'], name='attempt_quiz_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(condition=models.Q(('is_completed', False)), fields=['started_at'], name='attempt_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.0.10 on 2026-10-18 11:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='studentselectedquestionoption',
+            name='quiz_attempt',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='core.quizattempt'),
+        ),
+        migrations.AddIndex(
+            model_name='studentselectedquestionoption',
+            index=models.Index(fields=['quiz_attempt', 'selected_option'], name='answer_attempt_option_idx'),
+        ),
+    ]
@@ -142,6 +142,15 @@ class Assignment(models.Model):
     assignment_pdf = models.FileField(upload_to=get_assignment_path)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # keyset pagination key
+            models.Index(fields=['created_at', 'id'], name='assignment_created_idx'),
+            # the pages of a section (students) and of a teacher
+            models.Index(fields=['section', 'created_at', 'id'], name='assignment_section_created_idx'),
+            models.Index(fields=['teacher', 'created_at', 'id'], name='assignment_teacher_created_idx'),
+        ]
+
     def __str__(self):
         return f'{self.name}-{self.section}'
 
@@ -158,6 +167,52 @@ class AssignmentSubmission(models.Model):
     class Meta:
         # Optionally add unique constraint to prevent multiple submissions
         unique_together = ['student', 'assignment']
+        indexes = [
+            # keyset pagination key
+            models.Index(fields=['submitted_at', 'id'], name='submission_submitted_idx'),
+            # the submissions of an assignment (teachers, ZIP download) and the pages of a student
+            models.Index(fields=['assignment', 'submitted_at', 'id'], name='submission_assignment_idx'),
+            models.Index(fields=['student', 'submitted_at', 'id'], name='submission_student_idx'),
+        ]
+
+class UploadSession(models.Model):
+    # a submission PDF sent in chunks, see assignments/uploads.py
+    upload_code = models.UUIDField(primary_key=True, editable=False, default=uuid.uuid4)
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    sha256 = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.student}-{self.filename}'
+
+class UploadChunk(models.Model):
+    session = models.ForeignKey(UploadSession, on_delete=models.CASCADE, related_name='chunks')
+    index = models.PositiveIntegerField()
+    sha256 = models.CharField(max_length=64)
+
+    class Meta:
+        unique_together = ['session', 'index']
+
+class StoredBlob(models.Model):
+    # one stored file content, shared by every name that has it, see core/storage.py
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    size = models.PositiveBigIntegerField()
+    references = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return self.sha256
+
+class StoredFile(models.Model):
+    name = models.CharField(max_length=255, primary_key=True)
+    blob = models.ForeignKey(StoredBlob, on_delete=models.PROTECT, related_name='files')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
 
 class Notices(models.Model):
     title=models.CharField(max_length=100,blank=False)
@@ -166,9 +221,16 @@ class Notices(models.Model):
     section=models.ManyToManyField(Section)
     teacher=models.ForeignKey(Teacher,on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            # keyset pagination key, also the order of the section feeds
+            models.Index(fields=['created_at', 'id'], name='notice_created_idx'),
+            models.Index(fields=['teacher', 'created_at', 'id'], name='notice_teacher_created_idx'),
+        ]
+
 def question_image_path(instance, filename):
     # Upload path: quiz_images/quiz_id/question_id/filename
-    return f'quiz_images/quiz_{instance.quiz.id}/question_{instance.id}/{filename}'
+    return f'quiz_images/quiz_{instance.quiz_id}/question_{instance.pk}/{filename}'
 
 class Quiz(models.Model):
     quiz_name = models.CharField(max_length=150)
@@ -184,6 +246,15 @@ class Quiz(models.Model):
     end_time = models.DateTimeField()    # Time when quiz is no longer available
     is_proctored = models.BooleanField(default=False)  # Whether proctoring is enabled
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # keyset pagination key
+            models.Index(fields=['created_at', 'id'], name='quiz_created_idx'),
+            models.Index(fields=['teacher', 'created_at', 'id'], name='quiz_teacher_created_idx'),
+            # quizzes not over yet in start order (section schedules, grading of closed quizzes)
+            models.Index(fields=['end_time', 'start_time'], name='quiz_window_idx'),
+        ]
     
     def __str__(self):
         return self.quiz_name
@@ -202,6 +273,8 @@ class Question(models.Model):
     question_text = models.TextField()
     question_type = models.CharField(max_length=20, choices=QUESTION_TYPES)
     image = models.ImageField(upload_to=question_image_path, blank=True, null=True)
+    # manifest of the resized copies of image, filled in by quizzes/images.py
+    image_variants = models.JSONField(blank=True, null=True, editable=False)
     correct_option_code=models.UUIDField(blank=True)
     marks = models.PositiveIntegerField(default=1)
     order = models.PositiveIntegerField(default=0)
@@ -232,6 +305,16 @@ class QuizAttempt(models.Model):
         
     class Meta:
         unique_together = ['related_student', 'related_quiz']  # One attempt per student per quiz
+        indexes = [
+            # keyset pagination key
+            models.Index(fields=['started_at', 'quiz_attempt_code'], name='attempt_started_idx'),
+            models.Index(fields=['related_student', 'started_at', 'quiz_attempt_code'],
+                         name='attempt_student_started_idx'),
+            # graded attempts of a quiz (leaderboards, analytics, regrading)
+            models.Index(fields=['related_quiz', 'is_completed'], name='attempt_quiz_completed_idx'),
+            # only the attempts still open or waiting for the grader, a small part of the table
+            models.Index(fields=['started_at'], name='attempt_pending_idx', condition=models.Q(is_completed=False)),
+        ]
         
     @property
     def duration(self):
@@ -249,19 +332,17 @@ class QuizAttempt(models.Model):
     
     def get_correct_answers(self):
         """Get the number of correctly answered questions."""
-        return self.answers.filter(selected_option__is_correct=True).count()
+        return self.answers.filter(selected_option_id=models.F('question__correct_option_code')).count()
     
     
     def get_score(self):
-        selected_answers=self.answers.all()
-        score=0
-        for answer in selected_answers:
-            score+=(answer.marks_awarded)
-        return score
+        """Sum of the marks awarded to this attempt's answers, computed by the database."""
+        return self.answers.aggregate(score=models.Sum('marks_awarded'))['score'] or 0
     
 
 class StudentSelectedQuestionOption(models.Model):
-    quiz_attempt = models.ForeignKey(QuizAttempt, on_delete=models.CASCADE, related_name='answers')
+    # indexed first in unique_together and in answer_attempt_option_idx
+    quiz_attempt = models.ForeignKey(QuizAttempt, on_delete=models.CASCADE, related_name='answers', db_index=False)
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
     selected_option = models.ForeignKey(QuestionOption, on_delete=models.CASCADE, null=True, blank=True)
     marks_awarded = models.PositiveIntegerField(default=0)
@@ -269,6 +350,10 @@ class StudentSelectedQuestionOption(models.Model):
     
     class Meta:
         unique_together = ['quiz_attempt', 'question']  # One answer per question per attempt
+        indexes = [
+            # covers the answers counted by quiz analytics, read per attempt
+            models.Index(fields=['quiz_attempt', 'selected_option'], name='answer_attempt_option_idx'),
+        ]
 
   
 
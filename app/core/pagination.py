@@ -0,0 +1,41 @@
+from rest_framework.pagination import CursorPagination
+
+# Keyset pagination: each page is fetched with WHERE key < cursor ORDER BY key
+# LIMIT n on an indexed key, so deep pages cost the same as the first one.
+# DRF keys the cursor on the first ordering field only; rows sharing the
+# cursor's timestamp are skipped with an offset stored in the cursor. The
+# second ordering field keeps those rows in the same order from one page to
+# the next, so the offset skips the same ones.
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """Newest first on (created_at, id). Default for all list endpoints."""
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def get_cached_first_page_response(self, request, positions, data):
+        """
+        Paginated response for a first page that was served from a cache
+        instead of a queryset. positions are the cursor positions
+        (str(created_at)) of the cached rows in order, including the row that
+        follows the page if there is one, so the next link continues on the
+        database from there.
+        """
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.cursor = None
+        # the same state paginate_queryset leaves behind for a first page
+        self.page = [{self.ordering[0].lstrip('-'): position} for position in positions[:self.page_size]]
+        self.has_previous = False
+        self.has_next = len(positions) > self.page_size
+        self.next_position = positions[self.page_size] if self.has_next else None
+        return self.get_paginated_response(data)
+
+
+class SubmittedAtCursorPagination(CreatedAtCursorPagination):
+    ordering = ('-submitted_at', '-id')
+
+
+class StartedAtCursorPagination(CreatedAtCursorPagination):
+    ordering = ('-started_at', '-quiz_attempt_code')
@@ -1,9 +1,13 @@
 from rest_framework.permissions import BasePermission
 
+from .profiles import get_profile
+
+# the profile is resolved here once and reused by the view through get_profile(request)
+
 class IsTeacher(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.role == 'teacher'
+        return request.user.is_authenticated and request.user.role == 'teacher' and get_profile(request) is not None
 
 class IsStudent(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.role == 'student'
\ No newline at end of file
+        return request.user.is_authenticated and request.user.role == 'student' and get_profile(request) is not None
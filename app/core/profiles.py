@@ -0,0 +1,40 @@
+"""
+The Student or Teacher profile of the requesting user, resolved once per request.
+
+Permissions, views and serializers all call get_profile(request) instead of
+looking the profile up by user themselves. The first call stores the result
+on the request, so later calls in the same request are free. Users
+authenticated by CachedTokenAuthentication already carry their profile (with
+its section and branch), in which case no query is made at all.
+"""
+from .models import User, Student, Teacher
+
+PROFILE_MODELS = {
+    'student': Student,
+    'teacher': Teacher,
+}
+
+PROFILE_RELATED = {
+    'student': ['section__specialization_branch'],
+    'teacher': ['specialization_branch'],
+}
+
+
+def resolve_profile(user):
+    if not user.is_authenticated or user.role not in PROFILE_MODELS:
+        return None
+    # user.student / user.teacher, filled in by the token cache's select_related
+    descriptor = getattr(User, user.role)
+    if descriptor.is_cached(user):
+        return getattr(user, user.role, None)
+    model = PROFILE_MODELS[user.role]
+    return model.objects.select_related(*PROFILE_RELATED[user.role]).filter(user=user).first()
+
+
+def get_profile(request):
+    """Student or Teacher of request.user, or None for anonymous users and users without one."""
+    try:
+        return request.role_profile
+    except AttributeError:
+        request.role_profile = resolve_profile(request.user)
+        return request.role_profile
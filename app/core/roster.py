@@ -0,0 +1,319 @@
+"""
+Bulk import of institutional rosters (see `manage.py import_roster`).
+
+A roster is a CSV file with a header row or a JSON Lines file, one record
+per line. Records are read as a stream and handled in chunks: each chunk is
+validated with one query per referenced table, its passwords are hashed on a
+process pool and it is written with bulk_create in a single transaction.
+Hashing of the next chunk overlaps with writing the current one.
+
+Rows that fail validation are reported with their line number and skipped.
+Rows whose key already exists (in the database or earlier in the file) are
+skipped too, so an interrupted import can simply be run again.
+"""
+import csv
+import json
+from itertools import islice
+
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.db import transaction
+
+from .models import User, Student, Teacher, Section, SpecializationBranch, Subject, TeachingAssignment
+
+# columns every row of a kind must have
+REQUIRED_COLUMNS = {
+    'sections': ['section_code', 'specialization_branch_code'],
+    'students': ['identification_number', 'first_name', 'last_name', 'batch', 'section_code'],
+    'teachers': ['identification_number', 'first_name', 'last_name', 'department', 'specialization_branch_code'],
+    'teaching_assignments': [
+        'teacher_identification_number', 'section_code', 'subject_code', 'academic_year', 'semester'
+    ],
+}
+# the model field each column is written to, whose max_length the column is checked against
+COLUMN_FIELDS = {
+    'sections': {
+        'section_code': (Section, 'section_code'),
+        'specialization_branch_code': (SpecializationBranch, 'specialization_branch_code'),
+    },
+    'students': {
+        'identification_number': (User, 'identification_number'),
+        'first_name': (Student, 'first_name'),
+        'last_name': (Student, 'last_name'),
+        'batch': (Student, 'batch'),
+        'section_code': (Section, 'section_code'),
+    },
+    'teachers': {
+        'identification_number': (User, 'identification_number'),
+        'first_name': (Teacher, 'first_name'),
+        'last_name': (Teacher, 'last_name'),
+        'department': (Teacher, 'department'),
+        'specialization_branch_code': (SpecializationBranch, 'specialization_branch_code'),
+    },
+    'teaching_assignments': {
+        'teacher_identification_number': (User, 'identification_number'),
+        'section_code': (Section, 'section_code'),
+        'subject_code': (Subject, 'subject_code'),
+        'academic_year': (TeachingAssignment, 'academic_year'),
+    },
+}
+KINDS = list(REQUIRED_COLUMNS)
+PASSWORD_MODES = ['plain', 'hashed', 'unusable']
+
+
+class RosterError(Exception):
+    pass
+
+
+def read_rows(path):
+    """Yield (line number, record dict) from a .csv or .jsonl file without loading it whole."""
+    with open(path, newline='', encoding='utf-8') as roster:
+        if path.endswith('.jsonl'):
+            for line_number, line in enumerate(roster, start=1):
+                if line.strip():
+                    try:
+                        yield line_number, json.loads(line)
+                    except ValueError as error:
+                        raise RosterError(f'line {line_number}: invalid JSON ({error})')
+        elif path.endswith('.csv'):
+            reader = csv.DictReader(roster)
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            raise RosterError('roster must be a .csv or .jsonl file')
+
+
+def chunked(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def clean(record):
+    return {key: str(value).strip() for key, value in record.items() if value is not None and key is not None}
+
+
+def existing_keys(model, keys):
+    return set(model.objects.filter(pk__in=keys).values_list('pk', flat=True))
+
+
+class RosterImport:
+    """
+    Import one roster file of a given kind. `hash_passwords` maps a list of
+    plain passwords to a list of hashes (a process pool's map in the
+    command). Counters are kept on the instance for the final report.
+    """
+
+    def __init__(self, kind, password_mode='plain', hash_passwords=None):
+        if kind not in KINDS:
+            raise RosterError(f'unknown roster kind {kind}')
+        if password_mode not in PASSWORD_MODES:
+            raise RosterError(f'unknown password mode {password_mode}')
+        self.kind = kind
+        self.password_mode = password_mode
+        self.hash_passwords = hash_passwords or (lambda passwords: list(map(make_password, passwords)))
+        self.seen = set()
+        self.created = 0
+        self.skipped = 0
+        self.errors = []
+        self.max_lengths = {
+            column: model._meta.get_field(field).max_length for column, (model, field) in COLUMN_FIELDS[kind].items()
+        }
+
+    def error(self, line_number, message):
+        self.errors.append(f'line {line_number}: {message}')
+
+    def validate(self, chunk):
+        """Return the records of a chunk that can be written, each cleaned and with its line number."""
+        records = []
+        for line_number, record in chunk:
+            if not isinstance(record, dict):
+                # a JSON Lines line holding a list, a string or a number
+                self.error(line_number, 'not an object')
+                continue
+            record = clean(record)
+            missing = [column for column in REQUIRED_COLUMNS[self.kind] if not record.get(column)]
+            too_long = [
+                column for column, max_length in self.max_lengths.items() if len(record.get(column, '')) > max_length
+            ]
+            if missing:
+                self.error(line_number, f'missing {", ".join(missing)}')
+            elif too_long:
+                # rejected here, the database would abort the whole chunk
+                self.error(line_number, ', '.join(
+                    f'{column} is longer than {self.max_lengths[column]} characters' for column in too_long
+                ))
+            else:
+                records.append((line_number, record))
+        return getattr(self, f'validate_{self.kind}')(records)
+
+    def check_references(self, records, column, model, label):
+        known = existing_keys(model, {record[column] for _, record in records})
+        valid = []
+        for line_number, record in records:
+            if record[column] in known:
+                valid.append((line_number, record))
+            else:
+                self.error(line_number, f'unknown {label} {record[column]}')
+        return valid
+
+    def skip_existing(self, records, key, model):
+        """Drop records whose key is already in the database or earlier in the roster."""
+        existing = existing_keys(model, {key(record) for _, record in records})
+        fresh = []
+        for line_number, record in records:
+            record_key = key(record)
+            if record_key in existing or record_key in self.seen:
+                self.skipped += 1
+            else:
+                self.seen.add(record_key)
+                fresh.append((line_number, record))
+        return fresh
+
+    def validate_sections(self, records):
+        records = self.check_references(
+            records, 'specialization_branch_code', SpecializationBranch, 'specialization branch'
+        )
+        valid = []
+        for line_number, record in records:
+            record['total_students'] = record.get('total_students') or '0'
+            if not record['total_students'].isdigit():
+                self.error(line_number, 'total_students must be a number')
+            else:
+                valid.append((line_number, record))
+        return self.skip_existing(valid, lambda record: record['section_code'], Section)
+
+    def validate_people(self, records):
+        valid = []
+        for line_number, record in records:
+            password = record.get('password')
+            if self.password_mode != 'unusable' and not password:
+                self.error(line_number, 'missing password')
+            elif self.password_mode == 'hashed' and not is_password_hash(password):
+                self.error(line_number, 'password is not a Django password hash')
+            else:
+                valid.append((line_number, record))
+        return self.skip_existing(valid, lambda record: record['identification_number'], User)
+
+    def validate_students(self, records):
+        return self.validate_people(self.check_references(records, 'section_code', Section, 'section'))
+
+    def validate_teachers(self, records):
+        return self.validate_people(self.check_references(
+            records, 'specialization_branch_code', SpecializationBranch, 'specialization branch'
+        ))
+
+    def validate_teaching_assignments(self, records):
+        records = self.check_references(records, 'teacher_identification_number', Teacher, 'teacher')
+        records = self.check_references(records, 'section_code', Section, 'section')
+        records = self.check_references(records, 'subject_code', Subject, 'subject')
+        numbered = []
+        for line_number, record in records:
+            if record['semester'].isdigit():
+                numbered.append((line_number, record))
+            else:
+                self.error(line_number, 'semester must be a number')
+        existing = set(TeachingAssignment.objects.filter(
+            teacher_id__in={record['teacher_identification_number'] for _, record in numbered},
+            section_id__in={record['section_code'] for _, record in numbered},
+            subject_id__in={record['subject_code'] for _, record in numbered},
+        ).values_list('teacher_id', 'section_id', 'subject_id', 'academic_year', 'semester'))
+        valid = []
+        for line_number, record in numbered:
+            key = (record['teacher_identification_number'], record['section_code'], record['subject_code'],
+                   record['academic_year'], int(record['semester']))
+            if key in existing or key in self.seen:
+                self.skipped += 1
+            else:
+                self.seen.add(key)
+                valid.append((line_number, record))
+        return valid
+
+    def hash_chunk(self, records):
+        """Start hashing the passwords of a chunk. Returns something write() can take the hashes from."""
+        if self.kind not in ['students', 'teachers']:
+            return None
+        if self.password_mode == 'plain':
+            return self.hash_passwords([record['password'] for _, record in records])
+        if self.password_mode == 'hashed':
+            return [record['password'] for _, record in records]
+        # unusable passwords still get a random hash, like set_unusable_password()
+        return [make_password(None) for _ in records]
+
+    def write(self, records, hashes):
+        if not records:
+            return
+        with transaction.atomic():
+            if self.kind == 'sections':
+                Section.objects.bulk_create([
+                    Section(
+                        section_code=record['section_code'],
+                        specialization_branch_id=record['specialization_branch_code'],
+                        total_students=int(record['total_students']),
+                    )
+                    for _, record in records
+                ])
+            elif self.kind == 'teaching_assignments':
+                # existing rows were skipped above, ignore_conflicts only covers a concurrent import
+                TeachingAssignment.objects.bulk_create([
+                    TeachingAssignment(
+                        teacher_id=record['teacher_identification_number'], section_id=record['section_code'],
+                        subject_id=record['subject_code'], academic_year=record['academic_year'],
+                        semester=int(record['semester']),
+                    )
+                    for _, record in records
+                ], ignore_conflicts=True)
+            else:
+                role = self.kind[:-1]
+                User.objects.bulk_create([
+                    User(identification_number=record['identification_number'], role=role, password=password)
+                    for (_, record), password in zip(records, hashes)
+                ])
+                if self.kind == 'students':
+                    Student.objects.bulk_create([
+                        Student(
+                            user_id=record['identification_number'], first_name=record['first_name'],
+                            last_name=record['last_name'], batch=record['batch'],
+                            section_id=record['section_code'],
+                        )
+                        for _, record in records
+                    ])
+                else:
+                    Teacher.objects.bulk_create([
+                        Teacher(
+                            user_id=record['identification_number'], first_name=record['first_name'],
+                            last_name=record['last_name'], department=record['department'],
+                            specialization_branch_id=record['specialization_branch_code'],
+                        )
+                        for _, record in records
+                    ])
+        self.created += len(records)
+
+    def run(self, rows, chunk_size, progress=None):
+        """Import all rows. progress(rows read so far) is called after each chunk is written."""
+        pending = None
+        read = 0
+        for chunk in chunked(rows, chunk_size):
+            read += len(chunk)
+            records = self.validate(chunk)
+            hashes = self.hash_chunk(records)
+            if pending is not None:
+                self.write(*pending)
+                if progress:
+                    progress(read - len(chunk))
+            pending = (records, hashes)
+        if pending is not None:
+            self.write(*pending)
+            if progress:
+                progress(read)
+        return read
+
+
+def is_password_hash(value):
+    try:
+        identify_hasher(value)
+    except ValueError:
+        return False
+    return True
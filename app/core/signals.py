@@ -0,0 +1,25 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_token, invalidate_user_tokens
+from .models import User, Student, Teacher
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    # LogoutView deletes the token
+    invalidate_token(instance.key)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_tokens_on_user_change(sender, instance, **kwargs):
+    # password changes, deactivation, role changes
+    invalidate_user_tokens(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Student)
+@receiver([post_save, post_delete], sender=Teacher)
+def invalidate_tokens_on_profile_change(sender, instance, **kwargs):
+    # the cached user carries its profile, e.g. the student's section
+    invalidate_user_tokens(instance.user_id)
@@ -0,0 +1,143 @@
+"""
+Content-addressed, deduplicated file storage (DEFAULT_FILE_STORAGE).
+
+Models keep their logical names (assignments/<section>/<name>/<file>,
+submissions/..., quiz_images/...), which are mapped by StoredFile rows to a
+StoredBlob: the content, stored once under
+MEDIA_ROOT/CONTENT_STORE_DIR/<sha256[:2]>/<sha256[2:4]>/<sha256>.
+
+Saving streams the content to a temporary file while hashing it. When a
+blob with the same hash already exists the temporary file is dropped and the
+save only adds rows. Blobs count their names and are deleted with the last
+one, their file once that deletion has committed. The blob row is locked
+while a name is added or removed, so a blob is never deleted under a
+concurrent save of the same content.
+
+Names without a StoredFile row (files stored before this storage was used)
+are read from their logical path, like FileSystemStorage does.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import StoredBlob, StoredFile
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def blob_name(self, sha256):
+        return f'{settings.CONTENT_STORE_DIR}/{sha256[:2]}/{sha256[2:4]}/{sha256}'
+
+    def stored_file(self, name):
+        return StoredFile.objects.filter(name=name).select_related('blob').first()
+
+    def path(self, name):
+        stored = self.stored_file(name)
+        if stored is not None:
+            return super().path(self.blob_name(stored.blob_id))
+        return super().path(name)
+
+    def paths(self, names):
+        """path() of each of `names`, with one query."""
+        blobs = dict(StoredFile.objects.filter(name__in=names).values_list('name', 'blob_id'))
+        paths = {}
+        for name in names:
+            paths[name] = super().path(self.blob_name(blobs[name]) if name in blobs else name)
+        return paths
+
+    def exists(self, name):
+        return StoredFile.objects.filter(name=name).exists() or os.path.lexists(super().path(name))
+
+    def size(self, name):
+        stored = self.stored_file(name)
+        return stored.blob.size if stored is not None else super().size(name)
+
+    def write_temporary(self, content):
+        """Stream content to a temporary file next to the blobs. Returns its path, sha256 and size."""
+        directory = super().path(f'{settings.CONTENT_STORE_DIR}/tmp')
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        descriptor, path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(descriptor, 'wb') as temporary:
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    digest.update(chunk)
+                    temporary.write(chunk)
+                    size += len(chunk)
+        except BaseException:
+            os.remove(path)
+            raise
+        return path, digest.hexdigest(), size
+
+    def _save(self, name, content):
+        temporary_path, sha256, size = self.write_temporary(content)
+        try:
+            while True:
+                try:
+                    with transaction.atomic():
+                        StoredBlob.objects.get_or_create(sha256=sha256, defaults={'size': size})
+                        # locked until commit, see delete()
+                        blob = StoredBlob.objects.select_for_update().get(sha256=sha256)
+                        blob_path = super().path(self.blob_name(sha256))
+                        if not os.path.exists(blob_path):
+                            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                            os.replace(temporary_path, blob_path)
+                            if self.file_permissions_mode is not None:
+                                os.chmod(blob_path, self.file_permissions_mode)
+                        StoredFile.objects.create(name=name, blob=blob)
+                        StoredBlob.objects.filter(sha256=sha256).update(references=F('references') + 1)
+                    return name
+                except IntegrityError:
+                    # another save took the name in between
+                    name = self.get_available_name(name)
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+    def delete(self, name):
+        with transaction.atomic():
+            stored = StoredFile.objects.filter(name=name).first()
+            if stored is None:
+                return super().delete(name)
+            blob = StoredBlob.objects.select_for_update().get(sha256=stored.blob_id)
+            stored.delete()
+            if blob.references > 1:
+                StoredBlob.objects.filter(sha256=blob.sha256).update(references=F('references') - 1)
+                return
+            sha256 = blob.sha256
+            blob.delete()
+            # the content goes once the rows are gone for good, a rollback keeps both
+            transaction.on_commit(lambda: self.remove_blob(sha256))
+
+    def remove_blob(self, sha256):
+        """Delete the file of a blob, unless a save has stored the same content again since."""
+        with transaction.atomic():
+            # a row to lock: a concurrent save of the content waits on it and then puts the file back
+            StoredBlob.objects.get_or_create(sha256=sha256, defaults={'size': 0})
+            blob = StoredBlob.objects.select_for_update().get(sha256=sha256)
+            if blob.references > 0:
+                return
+            blob.delete()
+            blob_path = super().path(self.blob_name(sha256))
+            if os.path.exists(blob_path):
+                os.remove(blob_path)
+
+    def listdir(self, path):
+        prefix = f'{path.rstrip("/")}/' if path else ''
+        directories, files = set(), set()
+        for name in StoredFile.objects.filter(name__startswith=prefix).values_list('name', flat=True):
+            head, _, tail = name[len(prefix):].partition('/')
+            (directories if tail else files).add(head)
+        if os.path.isdir(super().path(path)):
+            legacy_directories, legacy_files = super().listdir(path)
+            directories.update(legacy_directories)
+            files.update(legacy_files)
+        return sorted(directories), sorted(files)
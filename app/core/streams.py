@@ -0,0 +1,42 @@
+"""
+ASGI app serving responses streamed from blocking iterators (see app/asgi.py).
+
+Django 4.0's ASGI handler iterates a StreamingHttpResponse on the event
+loop, so the blocking reads and the compression of a streamed ZIP would
+stall every other connection of the worker. Paths routed here go through
+Django's WSGI handler instead, each request on its own thread of asgiref's
+pool, and only the sending of each block goes back to the event loop.
+"""
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+
+class ThreadedWsgiInstance(WsgiToAsgiInstance):
+
+    async def run_wsgi_app(self, body):
+        # asgiref runs WSGI apps on its one thread for thread-sensitive code,
+        # which would serve the downloads of a worker one after the other
+        await sync_to_async(self.run_in_thread, thread_sensitive=False)(body)
+
+    def run_in_thread(self, body):
+        response = self.wsgi_application(self.build_environ(self.scope, body), self.start_response)
+        try:
+            for block in response:
+                if not self.response_started:
+                    self.response_started = True
+                    self.sync_send(self.response_start)
+                self.sync_send({'type': 'http.response.body', 'body': block, 'more_body': True})
+            if not self.response_started:
+                self.response_started = True
+                self.sync_send(self.response_start)
+            self.sync_send({'type': 'http.response.body'})
+        finally:
+            # Django sends request_finished, which closes this thread's database connections
+            if hasattr(response, 'close'):
+                response.close()
+
+
+class ThreadedWsgiToAsgi(WsgiToAsgi):
+
+    async def __call__(self, scope, receive, send):
+        await ThreadedWsgiInstance(self.wsgi_application)(scope, receive, send)
@@ -1,3 +1,1671 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO, StringIO
+from datetime import timedelta
+from unittest import mock, skipIf
+from urllib.parse import quote
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.db.models import Sum
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image as PILImage
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.renderers import JSONRenderer
+from rest_framework.routers import DefaultRouter
+from rest_framework.serializers import BaseSerializer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.models import (
+    User, Program, SpecializationBranch, Section, Student, Teacher, Subject,
+    Quiz, Question, QuestionOption, QuizAttempt, StudentSelectedQuestionOption, Notices, TeachingAssignment,
+    Assignment, AssignmentSubmission, UploadSession, StoredBlob
+)
+from benchmarks.runner import run_sessions, summarize
+from benchmarks.seed import seed_activity, seed_institution
+from core.asyncviews import async_read_view, serve_reads_async
+from core.archives import stream_zip
+from core.downloads import read_blocks
+from core.authentication import CachedTokenAuthentication, local_tokens, token_cache_key
+from core.compiled import NotCompilable, compile_serializer
+from core.deferred import run_pending_callbacks, start_request
+from core.events import events_since, publish_event
+from core.storage import ContentAddressedStorage
+from core.management.commands.explain_hot_queries import Command as ExplainHotQueries, hot_queries
+from core.renderers import ORJSONRenderer
+from quizzes.buffer import flush_attempts, flush_open_attempts
+from quizzes.grading import attempt_graded, grade_pending_batch
+from quizzes.live import live_events
+from quizzes.leaderboard import bucket_key, get_board, quiz_lock, rebuild_quiz_leaderboards
+from quizzes.serializers import BulkAnswerSerializer, QuizAttemptSerializer, QuizSerializer
+from quizzes.views import QuizViewSet
+from user.views import UserProfileAPIView
+from assignments import uploads
+from assignments.serializers import AssignmentSubmissionSerializer
+
+
+def create_institution():
+    """Create the smallest program -> branch -> section -> subject chain the models need."""
+    program = Program.objects.create(program_code='BTECH', name='Bachelor of Technology')
+    branch = SpecializationBranch.objects.create(
+        program=program, name='Information Technology',
+        specialization_branch_code='IT', total_credits=160
+    )
+    section = Section.objects.create(section_code='IT-E', specialization_branch=branch, total_students=60)
+    subject = Subject.objects.create(
+        subject_code='IT2101', specialization_branch=branch, subject_name='DBMS', credits=4
+    )
+    return section, subject
+
+
+def create_student(identification_number, section):
+    user = User.objects.create_user(identification_number=identification_number, password='pass', role='student')
+    return Student.objects.create(user=user, first_name='Test', last_name='Student', batch='2024', section=section)
+
+
+def create_teacher(identification_number, branch):
+    user = User.objects.create_user(identification_number=identification_number, password='pass', role='teacher')
+    return Teacher.objects.create(
+        user=user, first_name='Test', last_name='Teacher', department='IT', specialization_branch=branch
+    )
+
+
+def create_quiz(teacher, subject, section, number_of_questions, options_per_question=4):
+    now = timezone.now()
+    quiz = Quiz.objects.create(
+        quiz_name='Quiz', quiz_subject=subject, teacher=teacher, total_marks=number_of_questions,
+        due_date=now.date(), start_time=now - timedelta(hours=1), end_time=now + timedelta(hours=1)
+    )
+    quiz.sections.set([section])
+    for order in range(number_of_questions):
+        question = Question.objects.create(
+            quiz=quiz, question_text=f'Question {order}', question_type='multiple_choice',
+            correct_option_code=uuid.uuid4(), order=order
+        )
+        options = [
+            QuestionOption.objects.create(related_question=question, text=f'Option {index}')
+            for index in range(options_per_question)
+        ]
+        question.correct_option_code = options[0].option_code
+        question.save()
+    return quiz
+
+
+class QuizQueryCountTests(TestCase):
+    """The quiz read paths must not issue a query per question or per option."""
+
+    def setUp(self):
+        cache.clear()
+        self.section, self.subject = create_institution()
+        self.teacher = create_teacher('T001', self.section.specialization_branch)
+        self.student = create_student('S001', self.section)
+        self.client = APIClient()
+
+    def count_queries(self, user, url):
+        self.client.force_authenticate(user=user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_retrieve_query_count_does_not_grow_with_questions(self):
+        small_quiz = create_quiz(self.teacher, self.subject, self.section, 1)
+        large_quiz = create_quiz(self.teacher, self.subject, self.section, 25)
+
+        for user in [self.student.user, self.teacher.user]:
+            small = self.count_queries(user, f'/api/quizzes/quizzes/{small_quiz.id}/')
+            large = self.count_queries(user, f'/api/quizzes/quizzes/{large_quiz.id}/')
+            self.assertEqual(small, large)
+
+    def test_list_query_count_does_not_grow_with_questions(self):
+        create_quiz(self.teacher, self.subject, self.section, 2)
+        small = self.count_queries(self.student.user, '/api/quizzes/quizzes/')
+
+        create_quiz(self.teacher, self.subject, self.section, 30)
+        large = self.count_queries(self.student.user, '/api/quizzes/quizzes/')
+        self.assertEqual(small, large)
+
+    def test_retrieve_returns_questions_with_options(self):
+        quiz = create_quiz(self.teacher, self.subject, self.section, 3)
+        self.client.force_authenticate(user=self.student.user)
+        response = self.client.get(f'/api/quizzes/quizzes/{quiz.id}/')
+        self.assertEqual(len(response.data['questions']), 3)
+        self.assertEqual([len(question['options']) for question in response.data['questions']], [4, 4, 4])
+
+
+class CursorPaginationTests(TestCase):
+    """List endpoints page on (created_at, id) with opaque cursors."""
+
+    def setUp(self):
+        cache.clear()
+        self.section, self.subject = create_institution()
+        self.teacher = create_teacher('T001', self.section.specialization_branch)
+        self.quizzes = [create_quiz(self.teacher, self.subject, self.section, 0) for _ in range(7)]
+        # equal timestamps must not make rows repeat or vanish between pages
+        Quiz.objects.filter(pk__in=[quiz.pk for quiz in self.quizzes[2:5]]).update(
+            created_at=self.quizzes[2].created_at
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.teacher.user)
+
+    def test_walking_the_cursors_returns_every_row_once(self):
+        seen = []
+        url = '/api/quizzes/quizzes/?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 2)
+            seen.extend(quiz['id'] for quiz in response.data['results'])
+            url = response.data['next']
+        expected = Quiz.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        self.assertEqual(seen, list(expected))
+
+
+class QuizPaperCacheTests(TestCase):
+    """Students read a compiled quiz paper from the cache, edits invalidate it."""
+
+    def setUp(self):
+        cache.clear()
+        self.section, self.subject = create_institution()
+        self.teacher = create_teacher('T001', self.section.specialization_branch)
+        self.student = create_student('S001', self.section)
+        self.quiz = create_quiz(self.teacher, self.subject, self.section, 10)
+        self.url = f'/api/quizzes/quizzes/{self.quiz.id}/'
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.student.user)
+
+    def test_cached_paper_skips_question_queries(self):
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['questions']), 10)
+        # the access-checked quiz row only, the user already carries its student profile
+        self.assertEqual(len(context.captured_queries), 1)
+
+    def test_paper_hides_answer_key(self):
+        response = self.client.get(self.url)
+        for question in response.data['questions']:
+            self.assertNotIn('correct_option_code', question)
+
+    def test_editing_question_or_option_invalidates_paper(self):
+        self.client.get(self.url)
+
+        question = self.quiz.questions.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            question.question_text = 'Edited question'
+            question.save()
+            # until the edit commits, readers keep the cached paper
+            response = self.client.get(self.url)
+            self.assertEqual(response.data['questions'][0]['question_text'], 'Question 0')
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['questions'][0]['question_text'], 'Edited question')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            question.options.first().delete()
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data['questions'][0]['options']), 3)
+
+
+class BulkAnswerTests(TestCase):
+    """All answers of an attempt are validated and upserted in one request."""
+    url = '/api/quizzes/answers/bulk/'
+
+    def setUp(self):
+        cache.clear()
+        self.section, self.subject = create_institution()
+        self.teacher = create_teacher('T001', self.section.specialization_branch)
+        self.student = create_student('S001', self.section)
+        self.quiz = create_quiz(self.teacher, self.subject, self.section, 10)
+        self.attempt = QuizAttempt.objects.create(related_student=self.student, related_quiz=self.quiz)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.student.user)
+
+    def payload(self, questions, option_index):
+        return {
+            'quiz_attempt_code': str(self.attempt.quiz_attempt_code),
+            'answers': [
+                {
+                    'question_code': str(question.question_code),
+                    'selected_option_code': str(list(question.options.order_by('text'))[option_index].option_code),
+                }
+                for question in questions
+            ]
+        }
+
+    def test_bulk_answers_are_upserted(self):
+        questions = list(self.quiz.questions.all())
+        response = self.client.post(self.url, self.payload(questions, 0), format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['saved'], 10)
+        self.assertEqual(self.attempt.answers.aggregate(total=Sum('marks_awarded'))['total'], 10)
+
+        # changing half of the answers updates the existing rows
+        response = self.client.post(self.url, self.payload(questions[:5], 1), format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.attempt.answers.count(), 10)
+        self.assertEqual(self.attempt.answers.aggregate(total=Sum('marks_awarded'))['total'], 5)
+
+    def test_query_count_does_not_grow_with_answers(self):
+        questions = list(self.quiz.questions.all())
+        small_payload = self.payload(questions[:2], 0)
+        large_payload = self.payload(questions, 0)
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(self.url, small_payload, format='json')
+        self.attempt.answers.all().delete()
+        with CaptureQueriesContext(connection) as large:
+            self.client.post(self.url, large_payload, format='json')
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_option_from_another_question_is_rejected(self):
+        first, second = list(self.quiz.questions.all())[:2]
+        payload = {
+            'quiz_attempt_code': str(self.attempt.quiz_attempt_code),
+            'answers': [{
+                'question_code': str(first.question_code),
+                'selected_option_code': str(second.options.first().option_code),
+            }]
+        }
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.attempt.answers.exists())
+
+    def test_attempt_submitted_after_validation_is_not_changed(self):
+        validate = BulkAnswerSerializer.validate
+
+        def validate_then_submit(serializer, data):
+            data = validate(serializer, data)
+            QuizAttempt.objects.filter(pk=self.attempt.pk).update(
+                ended_at=timezone.now(), is_completed=True, marks_obtained=0
+            )
+            return data
+
+        with mock.patch.object(BulkAnswerSerializer, 'validate', validate_then_submit):
+            response = self.client.post(self.url, self.payload(list(self.quiz.questions.all()), 0), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.attempt.answers.exists())
+
+    def test_answers_after_the_quiz_end_are_rejected(self):
+        self.quiz.end_time = timezone.now() - timedelta(minutes=1)
+        self.quiz.save()
+        response = self.client.post(self.url, self.payload(list(self.quiz.questions.all()), 0), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.attempt.answers.exists())
+
+
+class GradingTests(TestCase):
+    """Scores are computed by the database from the answer key."""
+
+    def setUp(self):
+        cache.clear()
+        self.section, self.subject = create_institution()
+        self.teacher = create_teacher('T001', self.section.specialization_branch)
+        self.student = create_student('S001', self.section)
+        self.quiz = create_quiz(self.teacher, self.subject, self.section, 4)
+        self.attempt = QuizAttempt.objects.create(related_student=self.student, related_quiz=self.quiz)
+        self.questions = list(self.quiz.questions.all())
+        # right answers for the first three questions, a wrong one for the last
+        for index, question in enumerate(self.questions):
+            options = list(question.options.order_by('text'))
+            selected = options[0] if index < 3 else options[1]
+            StudentSelectedQuestionOption.objects.create(
+                quiz_attempt=self.attempt, question=question, selected_option=selected,
+                marks_awarded=question.marks if index < 3 else 0
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.student.user)
+
+    def test_submit_attempt_grades_in_database(self):
+        response = self.client.post(f'/api/quizzes/quizzes/{self.quiz.id}/submit_attempt/')
+        self.assertEqual(response.status_code, 200)
+        self.attempt.refresh_from_db()
+        self.assertTrue(self.attempt.is_completed)
+        self.assertIsNotNone(self.attempt.ended_at)
+        self.assertEqual(self.attempt.marks_obtained, 3)
+
+        # a second submit finds no open attempt
+        response = self.client.post(f'/api/quizzes/quizzes/{self.quiz.id}/submit_attempt/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_regrade_quiz_after_answer_key_change(self):
+        self.client.post(f'/api/quizzes/quizzes/{self.quiz.id}/submit_attempt/')
+        last_question = self.questions[-1]
+        last_question.correct_option_code = last_question.options.order_by('text')[1].option_code
+        last_question.save()
+
+        call_command('regrade_quiz', self.quiz.id, stdout=StringIO())
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.marks_obtained, 4)
+        self.assertEqual(self.attempt.get_score(), 4)
+        self.assertEqual(self.attempt.get_correct_answers(), 4)
+
+    @override_settings(QUIZ_ASYNC_GRADING=True)
+    def test_async_submit_only_queues_the_attempt(self):
+        response = self.client.post(f'/api/quizzes/quizzes/{self.quiz.id}/submit_attempt/')
+        self.assertEqual(response.status_code, 202)
+        self.attempt.refresh_from_db()
+        self.assertFalse(self.attempt.is_completed)
+        self.assertIsNotNone(self.attempt.ended_at)
+
+        self.assertEqual(grade_pending_batch(100), [self.attempt.pk])
+        self.attempt.refresh_from_db()
+        self.assertTrue(self.attempt.is_completed)
+        self.assertEqual(self.attempt.marks_obtained, 3)
+        self.assertEqual(grade_pending_batch(100), [])
+
+    def test_attempts_of_ended_quiz_are_graded(self):
+        self.assertEqual(grade_pending_batch(100), [])
+        Quiz.objects.filter(pk=self.quiz.pk).update(end_time=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(grade_pending_batch(100), [self.attempt.pk])
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.marks_obtained, 3)
+
+
+class AnswerBufferTests(TestCase):
+    """Answers of live attempts can be buffered in the cache and flushed in batches."""
+    url = '/api/quizzes/answers/'
+
+    def setUp(self):
+        cache.clear()
+        self.section, self.subject = create_institution()
+        self.teacher = create_teacher('T001', self.section.specialization_branch)
+        self.student = create_student('S001', self.section)
+        self.quiz = create_quiz(self.teacher, self.subject, self.section, 5)
+        self.attempt = QuizAttempt.objects.create(related_student=self.student, related_quiz=self.quiz)
+        self.questions = list(self.quiz.questions.all())
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.student.user)
+
+    def answer(self, question, option_index):
+        return self.client.post(self.url, {
+            'quiz_attempt_code': str(self.attempt.quiz_attempt_code),
+            'question_code': str(question.question_code),
+            'selected_option_code': str(list(question.options.order_by('text'))[option_index].option_code),
+        }, format='json')
+
+    def test_single_answer_is_written_without_buffer(self):
+        self.assertEqual(self.answer(self.questions[0], 1).status_code, 201)
+        self.assertEqual(self.answer(self.questions[0], 0).status_code, 201)
+        self.assertEqual(self.attempt.answers.get().marks_awarded, 1)
+
+    @override_settings(QUIZ_ANSWER_BUFFER=True)
+    def test_buffered_answers_are_flushed_on_timer(self):
+        for question in self.questions:
+            self.assertEqual(self.answer(question, 0).status_code, 201)
+        self.assertFalse(self.attempt.answers.exists())
+
+        self.assertEqual(flush_open_attempts(), 5)
+        self.assertEqual(self.attempt.answers.count(), 5)
+        # nothing is dirty any more
+        self.assertEqual(flush_open_attempts(), 0)
+
+    @override_settings(QUIZ_ANSWER_BUFFER=True)
+    def test_submit_flushes_buffer_before_grading(self):
+        for question in self.questions[:3]:
+            self.answer(question, 0)
+        flush_open_attempts()
+        # changed and new answers after the last timer flush
+        self.answer(self.questions[0], 1)
+        self.answer(self.questions[3], 0)
+
+        response = self.client.post(f'/api/quizzes/quizzes/{self.quiz.id}/submit_attempt/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['marks_obtained'], 3)
+        self.assertEqual(self.attempt.answers.count(), 4)
+
+        # the attempt no longer accepts answers
+        self.assertEqual(self.answer(self.questions[4], 0).status_code, 400)
+
+    @override_settings(QUIZ_ANSWER_BUFFER=True)
+    def test_timer_flush_after_submit_does_not_overwrite_it(self):
+        for question in self.questions[:2]:
+            self.answer(question, 0)
+        # a timer flush picks the attempt up while it is still open...
+        open_attempts = list(QuizAttempt.objects.filter(is_completed=False, ended_at__isnull=True))
+        # ...and only gets the lock once the submit has committed, with an older buffer
+        self.assertEqual(self.client.post(f'/api/quizzes/quizzes/{self.quiz.id}/submit_attempt/').status_code, 200)
+        stale = list(self.questions[0].options.order_by('text'))[1].option_code
+        cache.set(f'quiz_answer:{self.attempt.pk}:{self.questions[0].pk}', str(stale))
+
+        self.assertEqual(flush_attempts(open_attempts), 0)
+        self.assertEqual(self.attempt.answers.get(question=self.questions[0]).marks_awarded, 1)
+
+
+class QuizAnalyticsTests(TestCase):
+    """Item statistics are computed from all completed attempts and cached until the next submit."""
+
+    def setUp(self):
+        cache.clear()
+        self.section, self.subject = create_institution()
+        self.teacher = create_teacher('T001', self.section.specialization_branch)
+        self.quiz = create_quiz(self.teacher, self.subject, self.section, 2)
+        self.questions = list(self.quiz.questions.all())
+        self.url = f'/api/quizzes/quizzes/{self.quiz.id}/analytics/'
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.teacher.user)
+
+    def add_attempt(self, identification_number, option_indexes, is_completed=True):
+        student = create_student(identification_number, self.section)
+        # option 0 is the correct one, worth a mark, as grading would have scored it
+        attempt = QuizAttempt.objects.create(
+            related_student=student, related_quiz=self.quiz, is_completed=is_completed,
+            marks_obtained=option_indexes.count(0) if is_completed else 0
+        )
+        for question, option_index in zip(self.questions, option_indexes):
+            StudentSelectedQuestionOption.objects.create(
+                quiz_attempt=attempt, question=question,
+                selected_option=None if option_index is None else list(question.options.order_by('text'))[option_index]
+            )
+        return attempt
+
+    def test_item_statistics(self):
+        # option 0 is correct: the first question is right for everyone, the second only for the best student
+        self.add_attempt('S001', [0, 0])
+        self.add_attempt('S002', [0, 1])
+        self.add_attempt('S003', [0, 2])
+        self.add_attempt('S004', [1], is_completed=False)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['attempts'], 3)
+        first, second = response.data['questions']
+        self.assertEqual(first['difficulty'], 1.0)
+        self.assertEqual(first['discrimination'], 0.0)
+        self.assertEqual(second['difficulty'], 0.3333)
+        self.assertEqual(second['discrimination'], 1.0)
+        self.assertEqual(sorted(option['count'] for option in second['options']), [0, 1, 1, 1])
+        self.assertEqual(sum(response.data['score_histogram']['counts']), 3)
+
+    def test_cleared_answers_count_as_unanswered(self):
+        self.add_attempt('S001', [0, None])
+        self.add_attempt('S002', [1, 0])
+
+        second = self.client.get(self.url).data['questions'][1]
+        self.assertEqual(second['answered'], 1)
+        self.assertEqual(second['unanswered'], 1)
+        self.assertEqual(second['difficulty'], 0.5)
+
+    def test_analytics_are_cached_until_an_attempt_is_graded(self):
+        self.add_attempt('S001', [0, 0])
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        # the access-checked quiz row only
+        self.assertEqual(len(context.captured_queries), 1)
+
+        attempt = self.add_attempt('S002', [1, 1], is_completed=False)
+        student_client = APIClient()
+        student_client.force_authenticate(user=attempt.related_student.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            student_client.post(f'/api/quizzes/quizzes/{self.quiz.id}/submit_attempt/')
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['attempts'], 2)
+
+    def test_students_cannot_read_analytics(self):
+        student = create_student('S001', self.section)
+        self.client.force_authenticate(user=student.user)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class LeaderboardTests(TestCase):
+    """Leaderboards are kept up to date as attempts are graded."""
+
+    def setUp(self):
+        cache.clear()
+        self.section, self.subject = create_institution()
+        self.other_section = Section.objects.create(
+            section_code='IT-F', specialization_branch=self.section.specialization_branch, total_students=60
+        )
+        self.teacher = create_teacher('T001', self.section.specialization_branch)
+        self.quiz = create_quiz(self.teacher, self.subject, self.section, 3)
+        self.quiz.sections.add(self.other_section)
+        self.questions = list(self.quiz.questions.all())
+        self.url = f'/api/quizzes/quizzes/{self.quiz.id}/leaderboard/'
+        self.client = APIClient()
+
+    def submit(self, identification_number, section, correct_answers):
+        student = create_student(identification_number, section)
+        attempt = QuizAttempt.objects.create(related_student=student, related_quiz=self.quiz)
+        for question in self.questions[:correct_answers]:
+            StudentSelectedQuestionOption.objects.create(
+                quiz_attempt=attempt, question=question, selected_option_id=question.correct_option_code
+            )
+        self.client.force_authenticate(user=student.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/quizzes/quizzes/{self.quiz.id}/submit_attempt/')
+        return student
+
+    def test_ranks_follow_graded_attempts(self):
+        self.submit('S001', self.section, 1)
+        # the board is cached from here on and updated in place
+        self.client.get(self.url)
+        self.submit('S002', self.section, 3)
+        self.submit('S003', self.other_section, 1)
+        self.submit('S004', self.other_section, 0)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['total'], 4)
+        self.assertEqual(
+            [(row['student'], row['rank']) for row in response.data['results']],
+            [('S002', 1), ('S001', 2), ('S003', 2), ('S004', 4)]
+        )
+        self.assertEqual(response.data['me'], {'rank': 4, 'of': 4, 'marks': 0})
+
+        response = self.client.get(self.url, {'section': 'IT-F', 'limit': 1, 'offset': 1})
+        self.assertEqual(response.data['total'], 2)
+        self.assertEqual(response.data['results'], [{'rank': 2, 'student': 'S004', 'name': 'Test Student', 'marks': 0}])
+        self.assertEqual(response.data['me']['rank'], 2)
+
+    def test_rebuild_matches_incremental_board(self):
+        for index, correct_answers in enumerate([2, 0, 3]):
+            self.submit(f'S00{index}', self.section, correct_answers)
+        incremental = self.client.get(self.url).data['results']
+        cache.clear()
+        call_command('rebuild_leaderboards', self.quiz.id, stdout=StringIO())
+        self.assertEqual(self.client.get(self.url).data['results'], incremental)
+
+    def test_sections_outside_the_quiz_are_not_found(self):
+        self.submit('S001', self.section, 1)
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, {'section': 'NO-SUCH'})
+        self.assertEqual(response.status_code, 404)
+        # no rebuild of the boards
+        self.assertFalse(any('core_quizattempt' in query['sql'] for query in context.captured_queries))
+
+    def test_pages_read_only_the_buckets_they_span(self):
+        for index, correct_answers in enumerate([3, 2, 2, 0]):
+            self.submit(f'S00{index}', self.section, correct_answers)
+        board = get_board(self.quiz.id)
+        # the bucket of the last score is not on the first page
+        cache.delete(bucket_key(board.key, board.generation, 0))
+        with CaptureQueriesContext(connection) as context:
+            page = get_board(self.quiz.id).page(0, 2)
+        self.assertEqual([(row['student'], row['rank']) for row in page], [('S000', 1), ('S001', 2)])
+        self.assertFalse(any('core_quizattempt' in query['sql'] for query in context.captured_queries))
+        # a page whose bucket was evicted comes from a rebuilt board
+        page = get_board(self.quiz.id).page(2, 5)
+        self.assertEqual([(row['student'], row['rank']) for row in page], [('S002', 2), ('S003', 4)])
+
+    def test_boards_are_updated_after_the_response(self):
+        self.submit('S001', self.section, 1)
+        self.client.get(self.url)
+        student = create_student('S002', self.section)
+        attempt = QuizAttempt.objects.create(related_student=student, related_quiz=self.quiz, is_completed=True,
+                                             marks_obtained=3)
+        start_request()
+        attempt_graded(attempt)
+        self.assertEqual(get_board(self.quiz.id).total, 1)
+        run_pending_callbacks()
+        self.assertEqual(get_board(self.quiz.id).standing('S002'), {'rank': 1, 'of': 2, 'marks': 3})
+
+    @mock.patch('quizzes.leaderboard.LOCK_WAIT', 0.05)
+    def test_rebuild_and_updates_share_the_quiz_lock(self):
+        self.submit('S001', self.section, 1)
+        self.client.get(self.url)
+        # a rebuild that cannot lock does not cache its snapshot
+        with quiz_lock(self.quiz.id):
+            cache.delete(f'quiz_leaderboard:{self.quiz.id}')
+            rebuild_quiz_leaderboards(self.quiz.id)
+            self.assertIsNone(cache.get(f'quiz_leaderboard:{self.quiz.id}'))
+        self.client.get(self.url)
+        # and a grade recorded during a rebuild drops the boards rather than being lost
+        with quiz_lock(self.quiz.id):
+            self.submit('S002', self.section, 3)
+        self.assertIsNone(cache.get(f'quiz_leaderboard:{self.quiz.id}'))
+        self.assertEqual(self.client.get(self.url).data['total'], 2)
+
+
+class StartAttemptTests(TestCase):
+    """Starting an attempt is idempotent."""
+
+    def setUp(self):
+        cache.clear()
+        self.section, self.subject = create_institution()
+        self.teacher = create_teacher('T001', self.section.specialization_branch)
+        self.student = create_student('S001', self.section)
+        self.quiz = create_quiz(self.teacher, self.subject, self.section, 2)
+        self.url = f'/api/quizzes/quizzes/{self.quiz.id}/start_attempt/'
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.student.user)
+
+    def test_second_start_returns_existing_attempt(self):
+        first = self.client.post(self.url)
+        second = self.client.post(self.url)
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(first.data['quiz_attempt_code'], second.data['quiz_attempt_code'])
+        self.assertEqual(QuizAttempt.objects.count(), 1)
+
+    def test_idempotency_key_replays_first_response(self):
+        first = self.client.post(self.url, HTTP_IDEMPOTENCY_KEY='abc')
+        with CaptureQueriesContext(connection) as context:
+            replay = self.client.post(self.url, HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(replay.status_code, 201)
+        self.assertEqual(replay.data, first.data)
+        # the access-checked quiz row only, the user already carries its student profile
+        self.assertEqual(len(context.captured_queries), 1)
+
+    def test_teachers_cannot_start_attempts(self):
+        self.client.force_authenticate(user=self.teacher.user)
+        self.assertEqual(self.client.post(self.url).status_code, 403)
+
+
+@skipIf(connection.vendor == 'sqlite', 'the in-memory SQLite test database rejects concurrent writers')
+class ConcurrentStartAttemptTests(TransactionTestCase):
+    """N parallel starts for the same student create one attempt and no errors."""
+    parallel_starts = 16
+
+    def test_parallel_starts(self):
+        cache.clear()
+        section, subject = create_institution()
+        teacher = create_teacher('T001', section.specialization_branch)
+        student = create_student('S001', section)
+        quiz = create_quiz(teacher, subject, section, 2)
+        url = f'/api/quizzes/quizzes/{quiz.id}/start_attempt/'
+
+        def start(_):
+            client = APIClient()
+            client.force_authenticate(user=student.user)
+            try:
+                return client.post(url).status_code
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=self.parallel_starts) as pool:
+            statuses = list(pool.map(start, range(self.parallel_starts)))
+
+        self.assertTrue(all(code in (200, 201) for code in statuses), statuses)
+        self.assertEqual(QuizAttempt.objects.filter(related_student=student, related_quiz=quiz).count(), 1)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Tokens resolve from the cache tiers, revocation clears them."""
+
+    def setUp(self):
+        cache.clear()
+        local_tokens.clear()
+        self.section, _ = create_institution()
+        self.student = create_student('S001', self.section)
+        self.token = Token.objects.create(user=self.student.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def authenticate(self):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        return CachedTokenAuthentication().authenticate(request)
+
+    def test_only_the_first_lookup_reads_the_database(self):
+        with self.assertNumQueries(1):
+            user, _ = self.authenticate()
+            self.assertEqual(user.student.section_id, 'IT-E')
+        with self.assertNumQueries(0):
+            user, auth = self.authenticate()
+            self.assertEqual(user.student.section_id, 'IT-E')
+        self.assertEqual(auth.key, self.token.key)
+        # a fresh worker process still finds it in the shared cache
+        local_tokens.clear()
+        with self.assertNumQueries(0):
+            self.authenticate()
+
+    def test_cached_user_holds_no_credentials(self):
+        self.authenticate()
+        payload = pickle.dumps(cache.get(token_cache_key(self.token.key)))
+        self.assertNotIn(self.token.key.encode(), payload)
+        self.assertNotIn(self.student.user.password.encode(), payload)
+        # a profile save from a cached user keeps the password
+        user, _ = self.authenticate()
+        user.save()
+        self.assertTrue(User.objects.get(pk=user.pk).check_password('pass'))
+
+    def test_logout_revokes_the_cached_token(self):
+        self.authenticate()
+        self.assertEqual(self.client.post('/api/users/logout/').status_code, 200)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_password_and_profile_changes_refresh_the_cached_user(self):
+        self.authenticate()
+        response = self.client.post(
+            '/api/users/password/change/', {'old_password': 'pass', 'new_password': 'new-pass'}
+        )
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(1):
+            user, _ = self.authenticate()
+        self.assertTrue(user.check_password('new-pass'))
+
+        Section.objects.create(
+            section_code='IT-F', specialization_branch=self.section.specialization_branch, total_students=60
+        )
+        self.student.section_id = 'IT-F'
+        self.student.save()
+        user, _ = self.authenticate()
+        self.assertEqual(user.student.section_id, 'IT-F')
+
+
+class RequestQueryBudgetTests(TestCase):
+    """
+    With a cached token, authentication and the role profile cost no queries,
+    so each endpoint only pays for the rows it returns.
+    """
+
+    # (role, url) -> queries per request once the token is cached
+    budgets = {
+        ('student', '/api/quizzes/quizzes/'): 3,  # quizzes, questions, options
+        ('student', '/api/quizzes/quizzes/{quiz}/'): 1,  # the paper comes from the cache
+        ('student', '/api/quizzes/submitted-quizzes/'): 1,
+        ('student', '/api/assignments/assignments/'): 1,
+        ('student', '/api/notices/'): 0,  # served from the section feed
+        ('student', '/api/users/profile/'): 0,
+        ('teacher', '/api/quizzes/quizzes/'): 3,
+        ('teacher', '/api/quizzes/quizzes/{quiz}/'): 3,
+        ('teacher', '/api/quizzes/questions/'): 2,  # questions, options
+        ('teacher', '/api/quizzes/options/'): 1,
+        ('teacher', '/api/assignments/assignments/'): 1,
+        ('teacher', '/api/assignments/submissions/'): 1,
+        ('teacher', '/api/notices/'): 2,
+        ('teacher', '/api/users/profile/'): 0,
+    }
+
+    def setUp(self):
+        cache.clear()
+        local_tokens.clear()
+        section, subject = create_institution()
+        teacher = create_teacher('T001', section.specialization_branch)
+        student = create_student('S001', section)
+        self.quiz = create_quiz(teacher, subject, section, 3)
+        notice = Notices.objects.create(title='Notice', description='Text', teacher=teacher)
+        notice.section.set([section])
+        self.clients = {}
+        for profile in [student, teacher]:
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=profile.user).key}')
+            self.clients[profile.user.role] = client
+
+    def test_query_budget_per_endpoint(self):
+        for (role, url), budget in self.budgets.items():
+            url = url.format(quiz=self.quiz.id)
+            with self.subTest(role=role, url=url):
+                client = self.clients[role]
+                # the first request fills the token and quiz paper caches
+                self.assertEqual(client.get(url).status_code, 200)
+                with self.assertNumQueries(budget):
+                    self.assertEqual(client.get(url).status_code, 200)
+
+
+@override_settings(REQUEST_METRICS=True)
+class RequestMetricsTests(TestCase):
+    """The metrics middleware reports per-endpoint timings."""
+
+    def setUp(self):
+        cache.clear()
+        self.section, subject = create_institution()
+        self.teacher = create_teacher('T001', self.section.specialization_branch)
+        self.quiz = create_quiz(self.teacher, subject, self.section, 2)
+        self.client = APIClient()
+
+    def test_server_timing_header_and_histograms(self):
+        self.client.force_authenticate(user=self.teacher.user)
+        response = self.client.get('/api/quizzes/quizzes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(
+            response['Server-Timing'], r'^db;dur=[\d.]+;desc="3 queries", serializer;dur=[\d.]+, total;dur='
+        )
+
+        admin = User.objects.create_user(
+            identification_number='A001', password='pass', role='teacher', is_staff=True
+        )
+        self.client.force_authenticate(user=admin)
+        metrics = self.client.get('/api/metrics/').content.decode()
+        self.assertIn('kojo_request_queries_bucket{endpoint="quizzes:quiz-list",method="GET",le="2"} 0', metrics)
+        self.assertIn('kojo_request_queries_bucket{endpoint="quizzes:quiz-list",method="GET",le="3"} 1', metrics)
+        self.assertIn('kojo_request_serializer_seconds_count{endpoint="quizzes:quiz-list",method="GET"}', metrics)
+
+    def test_compiled_lists_report_serializer_time_without_patching_drf(self):
+        student = create_student('S001', self.section)
+        QuizAttempt.objects.create(related_student=student, related_quiz=self.quiz)
+        self.client.force_authenticate(user=student.user)
+        with mock.patch('core.middleware.observe_request') as observe_request:
+            response = self.client.get('/api/quizzes/submitted-quizzes/')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertGreater(observe_request.call_args.args[3].serializer_seconds, 0)
+        self.assertEqual(BaseSerializer.data.fget.__qualname__, 'BaseSerializer.data')
+
+    def test_metrics_are_staff_only(self):
+        self.client.force_authenticate(user=self.teacher.user)
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+
+
+class BenchmarkTests(TransactionTestCase):
+    """A tiny benchmark run goes through the whole exam flow without errors."""
+
+    def setUp(self):
+        cache.clear()
+        local_tokens.clear()
+
+    def test_exam_sessions_run_cleanly(self):
+        sections = seed_institution(students=6, sections=2, questions=3, options=2, assignments=1, notices=2)
+        self.assertEqual(Student.objects.count(), 6)
+        self.assertEqual(Question.objects.count(), 6)
+        sessions = [(student_id, quiz_id) for quiz_id, students in sections.values() for student_id in students]
+
+        recorder, wall_seconds = run_sessions(sessions, concurrency=1)
+        results = summarize(recorder, wall_seconds)
+
+        self.assertEqual(results['errors'], 0)
+        self.assertEqual(results['endpoints']['answer']['requests'], 18)
+        self.assertEqual(QuizAttempt.objects.filter(is_completed=True).count(), 6)
+
+
+class ImportRosterTests(TestCase):
+    """import_roster bulk-creates users and profiles and can be re-run safely."""
+
+    def setUp(self):
+        self.section, self.subject = create_institution()
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_roster(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as roster:
+            roster.write(content)
+        return path
+
+    def import_roster(self, *args):
+        output = StringIO()
+        errors = StringIO()
+        call_command('import_roster', *args, '--workers', '1', stdout=output, stderr=errors)
+        return output.getvalue(), errors.getvalue()
+
+    def test_students_csv(self):
+        path = self.write_roster('students.csv', (
+            'identification_number,first_name,last_name,batch,section_code,password\n'
+            'S001,Ada,Lovelace,2024,IT-E,secret-1\n'
+            'S002,Alan,Turing,2024,IT-E,secret-2\n'
+            'S003,Grace,Hopper,2024,NOPE,secret-3\n'
+            'S001,Ada,Again,2024,IT-E,secret-1\n'
+        ))
+        output, errors = self.import_roster('students', path, '--chunk-size', '2')
+
+        self.assertIn('2 created, 1 already existed, 1 invalid', output)
+        self.assertIn('line 4: unknown section NOPE', errors)
+        student = Student.objects.select_related('user').get(pk='S001')
+        self.assertEqual((student.first_name, student.section_id, student.user.role), ('Ada', 'IT-E', 'student'))
+        self.assertTrue(student.user.check_password('secret-1'))
+
+        output, _ = self.import_roster('students', path)
+        self.assertIn('0 created, 3 already existed', output)
+
+    def test_values_longer_than_their_column_are_row_errors(self):
+        path = self.write_roster('students.csv', (
+            'identification_number,first_name,last_name,batch,section_code,password\n'
+            'S001,Ada,Lovelace,2024-25,IT-E,secret-1\n'
+            f'S002,{"A" * 101},Turing,2024,IT-E,secret-2\n'
+            'S003,Grace,Hopper,2024,IT-E,secret-3\n'
+        ))
+        output, errors = self.import_roster('students', path)
+
+        self.assertIn('1 created', output)
+        self.assertIn('line 2: batch is longer than 4 characters', errors)
+        self.assertIn('line 3: first_name is longer than 100 characters', errors)
+        self.assertEqual(list(Student.objects.values_list('pk', flat=True)), ['S003'])
+
+    def test_teachers_jsonl_with_unusable_passwords(self):
+        branch = self.section.specialization_branch_id
+        path = self.write_roster('teachers.jsonl', '\n'.join(json.dumps(row) for row in [
+            {'identification_number': 'T001', 'first_name': 'Edsger', 'last_name': 'Dijkstra',
+             'department': 'IT', 'specialization_branch_code': branch},
+            {'identification_number': 'T002', 'first_name': 'Barbara', 'last_name': 'Liskov',
+             'department': 'IT', 'specialization_branch_code': branch},
+        ]))
+        self.import_roster('teachers', path, '--passwords', 'unusable')
+
+        teachers = Teacher.objects.select_related('user').order_by('pk')
+        self.assertEqual([teacher.pk for teacher in teachers], ['T001', 'T002'])
+        self.assertFalse(any(teacher.user.has_usable_password() for teacher in teachers))
+
+        path = self.write_roster('assignments.csv', (
+            'teacher_identification_number,section_code,subject_code,academic_year,semester\n'
+            'T001,IT-E,IT2101,2024-2025,1\n'
+        ))
+        self.import_roster('teaching_assignments', path)
+        self.assertTrue(TeachingAssignment.objects.filter(teacher_id='T001', section=self.section).exists())
+        output, _ = self.import_roster('teaching_assignments', path)
+        self.assertIn('0 created, 1 already existed', output)
+
+    def test_jsonl_lines_that_are_not_objects_are_row_errors(self):
+        path = self.write_roster('students.jsonl', '\n'.join([
+            '[]',
+            '"S001"',
+            json.dumps({'identification_number': 'S002', 'first_name': 'Alan', 'last_name': 'Turing',
+                        'batch': '2024', 'section_code': 'IT-E', 'password': 'secret-2'}),
+        ]))
+        output, errors = self.import_roster('students', path)
+
+        self.assertIn('1 created, 0 already existed, 2 invalid', output)
+        self.assertIn('line 1: not an object', errors)
+        self.assertIn('line 2: not an object', errors)
+
+
+class NoticeFeedTests(TestCase):
+    """Students read their section's notices from a cached feed with ETag revalidation."""
+
+    def setUp(self):
+        cache.clear()
+        local_tokens.clear()
+        self.section, _ = create_institution()
+        self.teacher = create_teacher('T001', self.section.specialization_branch)
+        student = create_student('S001', self.section)
+        self.student_client = APIClient()
+        self.student_client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=student.user).key}')
+        self.teacher_client = APIClient()
+        self.teacher_client.force_authenticate(user=self.teacher.user)
+
+    def post_notice(self, title):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.teacher_client.post(
+                '/api/notices/', {'title': title, 'description': 'Text', 'section': ['IT-E']}, format='json'
+            )
+        self.assertEqual(response.status_code, 201)
+        return response.data
+
+    def test_feed_is_revalidated_without_queries(self):
+        self.post_notice('First')
+        response = self.student_client.get('/api/notices/')
+        self.assertEqual([notice['title'] for notice in response.data['results']], ['First'])
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+        with self.assertNumQueries(0):
+            not_modified = self.student_client.get('/api/notices/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+        self.post_notice('Second')
+        changed = self.student_client.get('/api/notices/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], response['ETag'])
+        self.assertEqual([notice['title'] for notice in changed.data['results']], ['Second', 'First'])
+
+    def test_next_page_continues_from_the_database(self):
+        for title in ['First', 'Second', 'Third']:
+            self.post_notice(title)
+        first_page = self.student_client.get('/api/notices/?page_size=2')
+        self.assertEqual([notice['title'] for notice in first_page.data['results']], ['Third', 'Second'])
+        second_page = self.student_client.get(first_page.data['next'])
+        self.assertEqual([notice['title'] for notice in second_page.data['results']], ['First'])
+        self.assertIsNone(second_page.data['next'])
+
+    def test_edits_and_deletes_update_the_feed(self):
+        notice = self.post_notice('Draft')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.teacher_client.patch(f'/api/notices/{notice["id"]}/', {'title': 'Final'}, format='json')
+        self.assertEqual(self.student_client.get('/api/notices/').data['results'][0]['title'], 'Final')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.teacher_client.delete(f'/api/notices/{notice["id"]}/').status_code, 204)
+        self.assertEqual(self.student_client.get('/api/notices/').data['results'], [])
+
+
+class LiveEventsTests(TestCase):
+    """Section events are logged in the cache and streamed over server-sent events."""
+
+    def setUp(self):
+        cache.clear()
+        local_tokens.clear()
+        self.section, self.subject = create_institution()
+        self.teacher = create_teacher('T001', self.section.specialization_branch)
+        student = create_student('S001', self.section)
+        self.token = Token.objects.create(user=student.user).key
+        self.teacher_client = APIClient()
+        self.teacher_client.force_authenticate(user=self.teacher.user)
+
+    def stream(self, headers=(), query=b''):
+        """Run the live stream until it ends and return the response status and body."""
+        messages = []
+
+        async def receive():
+            # the client stays connected until the stream gives up
+            await asyncio.Event().wait()
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': '/api/live/', 'query_string': query,
+            'headers': [(b'authorization', f'Token {self.token}'.encode())] + list(headers),
+        }
+        async_to_sync(live_events)(scope, receive, send)
+        body = b''.join(message.get('body', b'') for message in messages[1:]).decode()
+        return messages[0]['status'], body
+
+    def test_notice_events_are_logged_per_section(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.teacher_client.post(
+                '/api/notices/', {'title': 'Exam', 'description': 'Text', 'section': ['IT-E']}, format='json'
+            )
+        events = events_since('IT-E', 0)
+        self.assertEqual([event['type'] for event in events], ['notice_created'])
+        self.assertEqual(json.loads(events[0]['data'])['title'], 'Exam')
+        self.assertEqual(events_since('IT-E', events[0]['id']), [])
+
+    def test_counter_reset_replays_the_log(self):
+        publish_event('IT-E', 'notice_deleted', {'id': 1})
+        # a client that saw ids of an evicted counter gets the new events again
+        self.assertEqual([event['id'] for event in events_since('IT-E', 40)], [1])
+
+    @override_settings(LIVE_STREAM_MAX_SECONDS=0.5, LIVE_POLL_SECONDS=0.05)
+    def test_stream_replays_missed_events_and_times_quizzes(self):
+        publish_event('IT-E', 'notice_created', {'id': 1})
+        publish_event('IT-E', 'notice_deleted', {'id': 1})
+        quiz = create_quiz(self.teacher, self.subject, self.section, 1)
+        Quiz.objects.filter(pk=quiz.pk).update(start_time=timezone.now() + timedelta(seconds=0.2))
+
+        status, body = self.stream(headers=[(b'last-event-id', b'1')])
+        self.assertEqual(status, 200)
+        self.assertIn('retry: 3000', body)
+        self.assertIn('id: 2\nevent: notice_deleted\ndata: {"id": 1}', body)
+        self.assertNotIn('id: 1\n', body)
+        self.assertIn('event: quiz_opened', body)
+        self.assertNotIn('event: quiz_closed', body)
+
+    def test_stream_requires_a_token(self):
+        self.token = 'invalid'
+        status, _ = self.stream()
+        self.assertEqual(status, 401)
+
+    @override_settings(LIVE_STREAM_MAX_SECONDS=0)
+    def test_teachers_only_follow_sections_they_teach(self):
+        self.token = Token.objects.create(user=self.teacher.user).key
+        status, _ = self.stream(query=b'section=IT-E')
+        self.assertEqual(status, 403)
+
+        TeachingAssignment.objects.create(
+            teacher=self.teacher, section=self.section, subject=self.subject, academic_year='2024-2025', semester=1
+        )
+        status, _ = self.stream(query=b'section=IT-E')
+        self.assertEqual(status, 200)
+
+
+class AsyncReadViewTests(TransactionTestCase):
+    """Under ASGI the read endpoints are async views running their DRF view on the read pool."""
+
+    def setUp(self):
+        cache.clear()
+        local_tokens.clear()
+        section, _ = create_institution()
+        self.student = create_student('S001', section)
+        self.key = Token.objects.create(user=self.student.user).key
+        self.view = async_read_view(UserProfileAPIView.as_view())
+        self.factory = AsyncRequestFactory()
+
+    def authorized(self, request):
+        # Django 4.0's AsyncRequestFactory does not take headers
+        request.META['HTTP_AUTHORIZATION'] = f'Token {self.key}'
+        return request
+
+    def test_reads_reuse_the_cached_user(self):
+        self.assertTrue(asyncio.iscoroutinefunction(self.view))
+        first = self.authorized(self.factory.get('/api/users/profile/'))
+        response = async_to_sync(self.view)(first)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['section'], 'IT-E')
+
+        # the first request cached the user in this process, the token
+        # authentication of the next one does not read the token again
+        second = self.authorized(self.factory.get('/api/users/profile/'))
+        with mock.patch('core.authentication.load_user', side_effect=AssertionError):
+            self.assertEqual(async_to_sync(self.view)(second).status_code, 200)
+        self.assertFalse(hasattr(second, '_force_auth_user'))
+
+    def test_writes_and_anonymous_reads_go_through_the_view(self):
+        anonymous = self.factory.get('/api/users/profile/')
+        self.assertEqual(async_to_sync(self.view)(anonymous).status_code, 401)
+        update = self.authorized(self.factory.put(
+            '/api/users/profile/', {'first_name': 'Asha'}, content_type='application/json'
+        ))
+        self.assertEqual(async_to_sync(self.view)(update).status_code, 200)
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.first_name, 'Asha')
+
+    def test_only_named_patterns_are_served_async(self):
+        router = DefaultRouter()
+        router.register('quizzes', QuizViewSet, basename='quiz')
+        with override_settings(ASYNC_READ_VIEWS=True):
+            patterns = serve_reads_async(router.urls, ['quiz-list'])
+        served_async = {pattern.name for pattern in patterns if asyncio.iscoroutinefunction(pattern.callback)}
+        self.assertEqual(served_async, {'quiz-list'})
+        self.assertEqual(serve_reads_async(router.urls, ['quiz-list']), router.urls)
+
+
+class DownloadTests(TestCase):
+    """Assignment and submission PDFs are streamed with Range support to the users allowed to read them."""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media_root.name, MEDIA_ACCEL_REDIRECT='', DOWNLOAD_CHUNK_SIZE=16)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        cache.clear()
+        section, subject = create_institution()
+        self.teacher = create_teacher('T001', section.specialization_branch)
+        self.student = create_student('S001', section)
+        self.content = bytes(range(100))
+        assignment = Assignment.objects.create(
+            name='Essay', section=section, teacher=self.teacher, subject=subject, total_marks=10,
+            due_date=timezone.now().date(), assignment_pdf=SimpleUploadedFile('essay.pdf', self.content)
+        )
+        self.submission = AssignmentSubmission.objects.create(
+            student=self.student, assignment=assignment, submission_pdf=SimpleUploadedFile('answer.pdf', self.content)
+        )
+        self.url = f'/api/assignments/submissions/{self.submission.pk}/download/'
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.teacher.user)
+
+    def test_whole_file_is_streamed(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Content-Length'], '100')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['Content-Disposition'], "attachment; filename*=UTF-8''answer.pdf")
+
+    def test_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-29')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.content[10:30])
+        self.assertEqual(response['Content-Range'], 'bytes 10-29/100')
+
+        suffix = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(suffix.streaming_content), self.content[-5:])
+
+        unsatisfiable = self.client.get(self.url, HTTP_RANGE='bytes=100-')
+        self.assertEqual(unsatisfiable.status_code, 416)
+        self.assertEqual(unsatisfiable['Content-Range'], 'bytes */100')
+
+    def test_nginx_sends_the_file_when_configured(self):
+        with override_settings(MEDIA_ACCEL_REDIRECT='/protected-media/'):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(
+            response['X-Accel-Redirect'], '/protected-media/blobs/' + quote(self.submission.submission_pdf.path.split('/blobs/')[1])
+        )
+
+    def test_only_permitted_users_can_download(self):
+        other = create_student('S002', self.student.section)
+        self.client.force_authenticate(user=other.user)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.force_authenticate(user=self.student.user)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        assignment_url = f'/api/assignments/assignments/{self.submission.assignment_id}/download/'
+        self.client.force_authenticate(user=other.user)
+        self.assertEqual(b''.join(self.client.get(assignment_url).streaming_content), self.content)
+
+
+class SubmissionArchiveTests(TestCase):
+    """Teachers download all submissions of an assignment as a ZIP streamed while it is built."""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_settings = override_settings(
+            MEDIA_ROOT=media_root.name, DOWNLOAD_CHUNK_SIZE=1024, ZIP_PREFETCH_FILES=2, ZIP_PREFETCH_CHUNKS=2
+        )
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        section, subject = create_institution()
+        self.teacher = create_teacher('T001', section.specialization_branch)
+        self.assignment = Assignment.objects.create(
+            name='Essay', section=section, teacher=self.teacher, subject=subject, total_marks=10,
+            due_date=timezone.now().date(), assignment_pdf=SimpleUploadedFile('essay.pdf', b'%PDF')
+        )
+        self.contents = {}
+        for number in range(5):
+            student = create_student(f'S00{number}', section)
+            content = os.urandom(5000 + number)
+            AssignmentSubmission.objects.create(
+                student=student, assignment=self.assignment,
+                submission_pdf=SimpleUploadedFile('answer.pdf', content)
+            )
+            self.contents[f'S00{number} Test Student.pdf'] = content
+        self.url = f'/api/assignments/assignments/{self.assignment.pk}/download_submissions/'
+        self.client = APIClient()
+
+    def test_archive_has_an_entry_per_student(self):
+        self.client.force_authenticate(user=self.teacher.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        parts = list(response.streaming_content)
+        # sent as it is built, not as one buffered body
+        self.assertGreater(len(parts), 1)
+        with zipfile.ZipFile(BytesIO(b''.join(parts))) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual({name: archive.read(name) for name in archive.namelist()}, self.contents)
+
+    def test_archive_is_built_without_queries(self):
+        # under ASGI the response is iterated on the event loop, where queries raise
+        self.client.force_authenticate(user=self.teacher.user)
+        response = self.client.get(self.url)
+        with CaptureQueriesContext(connection) as context:
+            content = b''.join(response.streaming_content)
+        self.assertEqual(context.captured_queries, [])
+        with zipfile.ZipFile(BytesIO(content)) as archive:
+            self.assertEqual(len(archive.namelist()), 5)
+
+    def test_students_cannot_download_the_archive(self):
+        self.client.force_authenticate(user=Student.objects.first().user)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class AsgiStreamingTests(TransactionTestCase):
+    """Under ASGI, downloads streamed from blocking iterators are built off the event loop."""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media_root.name, DOWNLOAD_CHUNK_SIZE=1024)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        cache.clear()
+        local_tokens.clear()
+        section, subject = create_institution()
+        teacher = create_teacher('T001', section.specialization_branch)
+        self.key = Token.objects.create(user=teacher.user).key
+        self.assignment = Assignment.objects.create(
+            name='Essay', section=section, teacher=teacher, subject=subject, total_marks=10,
+            due_date=timezone.now().date(), assignment_pdf=SimpleUploadedFile('essay.pdf', b'%PDF')
+        )
+        self.content = os.urandom(5000)
+        AssignmentSubmission.objects.create(
+            student=create_student('S001', section), assignment=self.assignment,
+            submission_pdf=SimpleUploadedFile('answer.pdf', self.content)
+        )
+
+    def get(self, path):
+        from app.asgi import application
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            self.loop_threads.add(threading.get_ident())
+            messages.append(message)
+
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'', 'http_version': '1.1',
+            'headers': [(b'host', b'testserver'), (b'authorization', f'Token {self.key}'.encode())],
+        }
+        async_to_sync(application)(scope, receive, send)
+        return messages[0]['status'], b''.join(message.get('body', b'') for message in messages[1:])
+
+    def record_threads(self, stream):
+        def recorded(*args):
+            for block in stream(*args):
+                self.stream_threads.add(threading.get_ident())
+                yield block
+        return recorded
+
+    def test_submission_archive_is_built_on_a_worker_thread(self):
+        self.loop_threads, self.stream_threads = set(), set()
+        with mock.patch('assignments.views.stream_zip', self.record_threads(stream_zip)):
+            status, body = self.get(f'/api/assignments/assignments/{self.assignment.pk}/download_submissions/')
+        self.assertEqual(status, 200)
+        self.assertTrue(self.stream_threads)
+        self.assertFalse(self.stream_threads & self.loop_threads)
+        with zipfile.ZipFile(BytesIO(body)) as archive:
+            self.assertEqual(archive.read('S001 Test Student.pdf'), self.content)
+
+    @override_settings(MEDIA_ACCEL_REDIRECT='')
+    def test_file_downloads_are_read_on_a_worker_thread(self):
+        self.loop_threads, self.stream_threads = set(), set()
+        submission = AssignmentSubmission.objects.get()
+        with mock.patch('core.downloads.read_blocks', self.record_threads(read_blocks)):
+            status, body = self.get(f'/api/assignments/submissions/{submission.pk}/download/')
+        self.assertEqual(status, 200)
+        self.assertEqual(body, self.content)
+        self.assertTrue(self.stream_threads)
+        self.assertFalse(self.stream_threads & self.loop_threads)
+
+
+@override_settings(UPLOAD_CHUNK_SIZE=1000)
+class ChunkedUploadTests(TestCase):
+    """Submissions are uploaded in checksummed chunks and created when the upload is finalized."""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media_root.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        section, subject = create_institution()
+        teacher = create_teacher('T001', section.specialization_branch)
+        self.student = create_student('S001', section)
+        self.assignment = Assignment.objects.create(
+            name='Essay', section=section, teacher=teacher, subject=subject, total_marks=10,
+            due_date=timezone.now().date(), assignment_pdf=SimpleUploadedFile('essay.pdf', b'%PDF')
+        )
+        self.content = os.urandom(2500)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.student.user)
+
+    def start(self, **fields):
+        response = self.client.post('/api/assignments/uploads/', {
+            'assignment_id': self.assignment.pk, 'filename': 'answer.pdf', 'size': len(self.content),
+            'sha256': hashlib.sha256(self.content).hexdigest(), **fields
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data
+
+    def send(self, session, offset, checksum=None):
+        chunk = self.content[offset:offset + session['chunk_size']]
+        return self.client.put(
+            f'/api/assignments/uploads/{session["upload_code"]}/', chunk, content_type='application/octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset), HTTP_UPLOAD_CHECKSUM=checksum or hashlib.sha256(chunk).hexdigest()
+        )
+
+    def test_resumed_upload_creates_the_submission(self):
+        session = self.start()
+        self.assertEqual(session['missing_chunks'], [0, 1, 2])
+        self.assertEqual(self.send(session, 2000).data['missing_chunks'], [0, 1])
+        self.assertEqual(self.send(session, 0, checksum='0' * 64).status_code, 400)
+
+        # after an interruption the client asks what is missing and sends only that
+        missing = self.client.get(f'/api/assignments/uploads/{session["upload_code"]}/').data['missing_chunks']
+        self.assertEqual(missing, [0, 1])
+        early = self.client.post(f'/api/assignments/uploads/{session["upload_code"]}/finalize/')
+        self.assertEqual(early.status_code, 400)
+        for index in missing:
+            self.assertEqual(self.send(session, index * 1000).status_code, 200)
+
+        response = self.client.post(f'/api/assignments/uploads/{session["upload_code"]}/finalize/')
+        self.assertEqual(response.status_code, 201)
+        submission = AssignmentSubmission.objects.get(student=self.student, assignment=self.assignment)
+        with submission.submission_pdf.open('rb') as stored:
+            self.assertEqual(stored.read(), self.content)
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(settings.MEDIA_ROOT, settings.UPLOAD_PARTS_DIR)), [])
+
+        # a second upload for the same assignment is refused up front
+        response = self.client.post('/api/assignments/uploads/', {
+            'assignment_id': self.assignment.pk, 'filename': 'again.pdf', 'size': 10
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_chunks_must_line_up(self):
+        session = self.start()
+        self.assertEqual(self.send(session, 500).status_code, 400)
+        short = self.client.put(
+            f'/api/assignments/uploads/{session["upload_code"]}/', self.content[:10],
+            content_type='application/octet-stream', HTTP_UPLOAD_OFFSET='0',
+            HTTP_UPLOAD_CHECKSUM=hashlib.sha256(self.content[:10]).hexdigest()
+        )
+        self.assertEqual(short.status_code, 400)
+
+    def test_whole_file_checksum_is_verified(self):
+        session = self.start(sha256='f' * 64)
+        for offset in [0, 1000, 2000]:
+            self.send(session, offset)
+        response = self.client.post(f'/api/assignments/uploads/{session["upload_code"]}/finalize/')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(AssignmentSubmission.objects.exists())
+
+    def test_concurrent_finalize_finds_the_session_gone(self):
+        session = self.start()
+        for offset in [0, 1000, 2000]:
+            self.send(session, offset)
+        # both requests loaded the session before either finalized it
+        loaded = UploadSession.objects.get(pk=session['upload_code'])
+        uploads.finalize(loaded)
+        with self.assertRaises(uploads.SessionGone):
+            uploads.finalize(loaded)
+        self.assertEqual(AssignmentSubmission.objects.count(), 1)
+
+    def test_sessions_belong_to_their_student(self):
+        session = self.start()
+        self.client.force_authenticate(user=create_student('S002', self.student.section).user)
+        self.assertEqual(self.send(session, 0).status_code, 404)
+
+
+class ContentAddressedStorageTests(TestCase):
+    """Uploads are stored once per content and mapped to their names."""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.media_root = media_root.name
+        self.storage = ContentAddressedStorage(location=self.media_root)
+
+    def blob_files(self):
+        return [name for _, _, names in os.walk(os.path.join(self.media_root, 'blobs')) for name in names]
+
+    def test_identical_content_is_stored_once(self):
+        first = self.storage.save('assignments/IT-E/Essay/handout.pdf', ContentFile(b'handout'))
+        second = self.storage.save('assignments/IT-F/Essay/handout.pdf', ContentFile(b'handout'))
+        self.assertEqual(len(self.blob_files()), 1)
+        self.assertEqual(StoredBlob.objects.get().references, 2)
+        self.assertEqual(self.storage.path(first), self.storage.path(second))
+        with self.storage.open(second) as stored:
+            self.assertEqual(stored.read(), b'handout')
+        self.assertEqual(self.storage.size(first), 7)
+
+        # a taken name gets a new one, like FileSystemStorage
+        third = self.storage.save(first, ContentFile(b'handout'))
+        self.assertNotEqual(third, first)
+        self.assertEqual(self.storage.listdir('assignments')[0], ['IT-E', 'IT-F'])
+
+    def test_blob_goes_with_its_last_name(self):
+        first = self.storage.save('a/one.pdf', ContentFile(b'same'))
+        second = self.storage.save('b/two.pdf', ContentFile(b'same'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.storage.delete(first)
+        self.assertFalse(self.storage.exists(first))
+        self.assertEqual(len(self.blob_files()), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.storage.delete(second)
+        self.assertEqual(self.blob_files(), [])
+        self.assertFalse(StoredBlob.objects.exists())
+
+    def test_rolled_back_delete_keeps_the_content(self):
+        name = self.storage.save('a/one.pdf', ContentFile(b'kept'))
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    self.storage.delete(name)
+                    raise RuntimeError
+        with self.storage.open(name) as stored:
+            self.assertEqual(stored.read(), b'kept')
+
+    def test_files_stored_before_are_still_read(self):
+        os.makedirs(os.path.join(self.media_root, 'old'))
+        with open(os.path.join(self.media_root, 'old', 'file.pdf'), 'wb') as legacy:
+            legacy.write(b'legacy')
+        self.assertTrue(self.storage.exists('old/file.pdf'))
+        with self.storage.open('old/file.pdf') as stored:
+            self.assertEqual(stored.read(), b'legacy')
+
+
+class QuestionImageVariantTests(TestCase):
+    """Question images are resized outside the request and the paper points at the variants."""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media_root.name, QUESTION_IMAGE_WIDTHS=[100, 400, 2000])
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        cache.clear()
+        section, subject = create_institution()
+        teacher = create_teacher('T001', section.specialization_branch)
+        self.quiz = create_quiz(teacher, subject, section, 2)
+        self.questions = list(self.quiz.questions.all())
+        for question in self.questions:
+            question.image = self.png('diagram.png', 'red')
+            question.save()
+
+    def png(self, name, color):
+        output = BytesIO()
+        PILImage.new('RGBA', (800, 600), color).save(output, 'PNG')
+        return SimpleUploadedFile(name, output.getvalue())
+
+    def test_variants_are_derived_once_per_content(self):
+        self.assertIsNone(self.questions[0].image_variants)
+        call_command('derive_question_images', workers=1, once=True, stdout=StringIO())
+
+        manifests = [question.image_variants for question in Question.objects.all()]
+        self.assertEqual(manifests[0], manifests[1])
+        manifest = manifests[0]
+        self.assertEqual([(variant['width'], variant['format']) for variant in manifest['variants']],
+                         [(100, 'webp'), (100, 'jpg'), (400, 'webp'), (400, 'jpg')])
+        self.assertEqual(manifest['variants'][3]['height'], 300)
+        self.assertTrue(manifest['default'].endswith('/400.jpg'))
+        self.assertTrue(manifest['placeholder'].startswith('data:image/jpeg;base64,'))
+        directory = os.path.join(settings.MEDIA_ROOT, 'question_images', manifest['sha256'][:2], manifest['sha256'])
+        self.assertEqual(sorted(os.listdir(directory)), ['100.jpg', '100.webp', '400.jpg', '400.webp', 'manifest.json'])
+
+        student = create_student('S001', self.quiz.sections.get())
+        client = APIClient()
+        client.force_authenticate(user=student.user)
+        paper = client.get(f'/api/quizzes/quizzes/{self.quiz.pk}/').data
+        self.assertEqual(paper['questions'][0]['image_variants']['default'], manifest['default'])
+        self.assertNotIn('image', paper['questions'][0])
+
+    def test_replacing_the_image_derives_it_again(self):
+        call_command('derive_question_images', workers=1, once=True, stdout=StringIO())
+        question = Question.objects.get(pk=self.questions[0].pk)
+        question.image = self.png('new.png', 'blue')
+        question.save()
+        self.assertIsNone(Question.objects.get(pk=question.pk).image_variants)
+
+        call_command('derive_question_images', workers=1, once=True, stdout=StringIO())
+        variants = Question.objects.get(pk=question.pk).image_variants
+        untouched = Question.objects.get(pk=self.questions[1].pk).image_variants
+        self.assertNotEqual(variants['sha256'], untouched['sha256'])
+
+    def test_unreadable_images_are_not_retried(self):
+        Question.objects.filter(pk=self.questions[0].pk).update(image='quiz_images/missing.png')
+        call_command('derive_question_images', workers=1, once=True, stdout=StringIO())
+        self.assertEqual(Question.objects.get(pk=self.questions[0].pk).image_variants['variants'], [])
+
+
+class CompiledSerializerTests(TestCase):
+    """Hot list endpoints serialize .values() rows and must return what their serializers would."""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media_root.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        cache.clear()
+        section, subject = create_institution()
+        self.teacher = create_teacher('T001', section.specialization_branch)
+        self.student = create_student('S001', section)
+        for number in range(3):
+            quiz = create_quiz(self.teacher, subject, section, 1)
+            QuizAttempt.objects.create(
+                related_student=self.student, related_quiz=quiz, is_completed=number > 0, marks_obtained=number,
+                ended_at=timezone.now() if number > 0 else None,
+            )
+            assignment = Assignment.objects.create(
+                name=f'Essay {number}', section=section, teacher=self.teacher, subject=subject, total_marks=10,
+                due_date=timezone.now().date(), assignment_pdf=SimpleUploadedFile('essay.pdf', b'%PDF')
+            )
+            AssignmentSubmission.objects.create(
+                student=self.student, assignment=assignment, marks=None if number else 7,
+                submission_pdf=SimpleUploadedFile('answer.pdf', b'%PDF')
+            )
+        self.client = APIClient()
+
+    def pages(self, url):
+        results = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            results.extend(response.json()['results'])
+            url = response.json()['next']
+        return results
+
+    def expected(self, serializer_class, queryset, ordering):
+        request = APIRequestFactory().get('/')
+        data = serializer_class(queryset.order_by(*ordering), many=True, context={'request': request}).data
+        return json.loads(JSONRenderer().render(data))
+
+    def test_quiz_attempt_list_matches_the_serializer(self):
+        self.client.force_authenticate(user=self.student.user)
+        results = self.pages('/api/quizzes/submitted-quizzes/?page_size=2')
+        self.assertEqual(results, self.expected(
+            QuizAttemptSerializer, QuizAttempt.objects.all(), ['-started_at', '-quiz_attempt_code']
+        ))
+
+    def test_submission_list_matches_the_serializer(self):
+        self.client.force_authenticate(user=self.teacher.user)
+        results = self.pages('/api/assignments/submissions/?page_size=2')
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results, self.expected(
+            AssignmentSubmissionSerializer, AssignmentSubmission.objects.all(), ['-submitted_at', '-id']
+        ))
+
+    def test_list_takes_one_query_per_page(self):
+        self.client.force_authenticate(user=self.teacher.user)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get('/api/assignments/submissions/')
+        submission_queries = [query for query in context.captured_queries
+                              if 'core_assignmentsubmission' in query['sql']]
+        self.assertEqual(len(submission_queries), 1)
+
+    def test_serializers_that_need_instances_do_not_compile(self):
+        with self.assertRaises(NotCompilable):
+            compile_serializer(QuizSerializer)
+
+    def test_orjson_renderer_matches_the_json_renderer(self):
+        data = {
+            'when': timezone.now(), 'day': timezone.now().date(), 'code': uuid.uuid4(),
+            'rows': [{'a': 1, 'b': None, 'c': 'é'}], 1: 'non-string key',
+        }
+        self.assertEqual(json.loads(ORJSONRenderer().render(data)), json.loads(JSONRenderer().render(data)))
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+
+class HotQueryIndexTests(TestCase):
+    """The queries of the busiest endpoints are served by indexes."""
+
+    def setUp(self):
+        seed_activity(seed_institution(40, 2, 1, 2, 2, 2))
+
+    def test_no_hot_query_scans_a_whole_table(self):
+        command = ExplainHotQueries(stdout=StringIO())
+        self.assertEqual(command.explain(hot_queries(), min_rows=0, verbose_plans=False), [])
+
+    def test_scans_are_flagged(self):
+        command = ExplainHotQueries(stdout=StringIO())
+        unindexed = [('attempts by marks', QuizAttempt.objects.filter(marks_obtained=3))]
+        self.assertEqual(command.explain(unindexed, min_rows=0, verbose_plans=False), ['attempts by marks'])
+        self.assertEqual(command.explain(unindexed, min_rows=1000, verbose_plans=False), [])
@@ -0,0 +1,85 @@
+"""
+Per-section notice feeds kept in the cache.
+
+A section's feed is the ordered list (newest first) of the ids of its
+latest NOTICE_FEED_SIZE notices, with each notice's cursor position, a
+version and the time it last changed. The rendered payload of every notice
+is cached once under its own key, whatever the number of sections it was
+posted to.
+
+Feeds are rebuilt when a notice is created, edited, moved between sections
+or deleted (see notices/signals.py), so students polling the first page of
+their feed are answered from the cache, or with a 304 when nothing changed.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from core.models import Notices
+from .serializers import NoticeSerializer
+
+# one more than the largest page, so a full first page still knows whether a next page exists
+NOTICE_FEED_SIZE = 201
+
+
+def feed_cache():
+    return caches[settings.NOTICE_FEED_CACHE]
+
+
+def feed_key(section_code):
+    return f'notice_feed:{section_code}'
+
+
+def payload_key(notice_id):
+    return f'notice_payload:{notice_id}'
+
+
+def build_section_feed(section_code):
+    """Read a section's latest notices from the database and cache its feed and their payloads."""
+    notices = list(
+        Notices.objects.filter(section=section_code).order_by('-created_at', '-id').prefetch_related('section')
+        [:NOTICE_FEED_SIZE]
+    )
+    feed = {
+        'version': time.time_ns(),
+        'last_modified': timezone.now(),
+        'ids': [notice.id for notice in notices],
+        # the value CursorPagination builds its cursor from
+        'positions': [str(notice.created_at) for notice in notices],
+    }
+    cache = feed_cache()
+    cache.set_many(
+        {payload_key(notice.id): NoticeSerializer(notice).data for notice in notices},
+        timeout=settings.NOTICE_FEED_TIMEOUT
+    )
+    cache.set(feed_key(section_code), feed, timeout=settings.NOTICE_FEED_TIMEOUT)
+    return feed
+
+
+def get_section_feed(section_code):
+    feed = feed_cache().get(feed_key(section_code))
+    if feed is None:
+        feed = build_section_feed(section_code)
+    return feed
+
+
+def feed_payloads(section_code, feed, count):
+    """
+    Rendered payloads of the first `count` notices of a feed. If any payload
+    expired the feed is rebuilt. Returns the feed the payloads came from and
+    the payloads.
+    """
+    ids = feed['ids'][:count]
+    payloads = feed_cache().get_many([payload_key(notice_id) for notice_id in ids])
+    if len(payloads) < len(ids):
+        feed = build_section_feed(section_code)
+        ids = feed['ids'][:count]
+        payloads = feed_cache().get_many([payload_key(notice_id) for notice_id in ids])
+    return feed, [payloads[payload_key(notice_id)] for notice_id in ids]
+
+
+def rebuild_section_feeds(section_codes):
+    for section_code in set(section_codes):
+        build_section_feed(section_code)
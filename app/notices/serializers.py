@@ -6,4 +6,4 @@ class NoticeSerializer(serializers.ModelSerializer):
     class Meta:
         model=Notices
         fields='__all__'
-        read_only_fields=['created_by']
\ No newline at end of file
+        read_only_fields=['teacher']
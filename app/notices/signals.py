@@ -0,0 +1,56 @@
+from django.db import transaction
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from core.events import publish_event
+from core.models import Notices
+from .feed import rebuild_section_feeds
+from .serializers import NoticeSerializer
+
+# feeds are rebuilt once the change is committed, so they never show rolled back notices
+
+
+def rebuild_after_commit(section_codes, notice=None, event_type=None):
+    """Rebuild the sections' feeds after commit and push event_type for the notice to their live streams."""
+    section_codes = list(section_codes)
+    if not section_codes:
+        return
+    # read now, a deleted notice has lost its pk by the time the transaction commits
+    notice_id = notice.pk if notice is not None else None
+
+    def rebuild():
+        rebuild_section_feeds(section_codes)
+        if event_type is not None:
+            data = {'id': notice_id} if event_type == 'notice_deleted' else NoticeSerializer(notice).data
+            for section_code in section_codes:
+                publish_event(section_code, event_type, data)
+
+    transaction.on_commit(rebuild)
+
+
+@receiver(post_save, sender=Notices)
+def rebuild_feeds_on_notice_save(sender, instance, created, **kwargs):
+    # a new notice has no sections yet, m2m_changed fans it out once they are added
+    if not created:
+        rebuild_after_commit(instance.section.values_list('section_code', flat=True), instance, 'notice_updated')
+
+
+@receiver(m2m_changed, sender=Notices.section.through)
+def rebuild_feeds_on_sections_change(sender, instance, action, pk_set, **kwargs):
+    if action == 'post_add':
+        rebuild_after_commit(pk_set, instance, 'notice_created')
+    elif action == 'post_remove':
+        rebuild_after_commit(pk_set, instance, 'notice_deleted')
+    elif action == 'pre_clear':
+        rebuild_after_commit(instance.section.values_list('section_code', flat=True), instance, 'notice_deleted')
+
+
+@receiver(pre_delete, sender=Notices)
+def remember_notice_sections(sender, instance, **kwargs):
+    # the section links are gone by the time post_delete runs
+    instance.feed_sections = list(instance.section.values_list('section_code', flat=True))
+
+
+@receiver(post_delete, sender=Notices)
+def rebuild_feeds_on_notice_delete(sender, instance, **kwargs):
+    rebuild_after_commit(getattr(instance, 'feed_sections', []), instance, 'notice_deleted')
@@ -1,6 +1,7 @@
 from rest_framework.routers import DefaultRouter
 from .views import NoticeViewSet
 from django.urls import path,include
+from core.asyncviews import serve_reads_async
 
 router=DefaultRouter()
 
@@ -8,5 +9,5 @@ router.register('',NoticeViewSet)
 app_name='notice'
 
 urlpatterns=[
-    path('',include(router.urls))
+    path('',include(serve_reads_async(router.urls,['notices-list'])))
 ]
\ No newline at end of file
@@ -1,10 +1,14 @@
 from rest_framework import viewsets,generics
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 from core.models import Notices
 from .serializers import NoticeSerializer
+from .feed import get_section_feed, feed_payloads
 from core.permissions import IsTeacher
+from core.profiles import get_profile
 from rest_framework.permissions import IsAuthenticated
 class NoticeViewSet(viewsets.ModelViewSet):
-    queryset=Notices.objects.all()
+    queryset=Notices.objects.prefetch_related('section')
     serializer_class=NoticeSerializer
 
     def get_permissions(self):
@@ -15,8 +19,39 @@ class NoticeViewSet(viewsets.ModelViewSet):
         return [permission() for permission in permission_classes]
     
     def perform_create(self, serializer):
-        serializer.save(created_by=self.request.user)
+        serializer.save(teacher=get_profile(self.request))
     
     def get_queryset(self):
-        return self.queryset.filter(section=self.request.user.student.section)
-    
+        profile = get_profile(self.request)
+        if profile is None:
+            return self.queryset.none()
+        if self.request.user.role == 'teacher':
+            # teachers see the notices they posted
+            return self.queryset.filter(teacher=profile)
+        return self.queryset.filter(section=profile.section_id)
+
+    def list(self, request, *args, **kwargs):
+        profile = get_profile(request)
+        # older pages (with a cursor) and teachers' lists are read from the database
+        is_first_page = self.paginator.cursor_query_param not in request.query_params
+        if request.user.role != 'student' or profile is None or not is_first_page:
+            return super().list(request, *args, **kwargs)
+
+        # the first page of a student's feed is served from the cached section feed
+        section_code = profile.section_id
+        page_size = self.paginator.get_page_size(request)
+        feed = get_section_feed(section_code)
+        etag = quote_etag(f'{section_code}-{feed["version"]}-{page_size}')
+        last_modified = int(feed['last_modified'].timestamp())
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+
+        feed, data = feed_payloads(section_code, feed, page_size)
+        response = self.paginator.get_cached_first_page_response(request, feed['positions'][:page_size + 1], data)
+        response['ETag'] = quote_etag(f'{section_code}-{feed["version"]}-{page_size}')
+        response['Last-Modified'] = http_date(feed['last_modified'].timestamp())
+        # clients keep the feed but must revalidate it on every poll
+        response['Cache-Control'] = 'private, no-cache'
+        return response
@@ -0,0 +1,159 @@
+"""
+Item statistics for a quiz, aggregated by the database and finished with NumPy.
+
+The answers of a quiz are never read row by row. Scores are the graded
+marks_obtained of the completed attempts, and the answers are counted by
+one GROUP BY over the selected option and the score of the attempt, read
+from the answer_attempt_option_idx index alone. An option belongs to one
+question, so the counts give the answered and correct matrices and the option
+counts. Every statistic is then an array operation over a questions x
+distinct scores matrix, whose size does not depend on the number of
+attempts.
+
+Attempts tied on the score at the edge of a discrimination group are counted
+in it in proportion, which is the expected value of breaking the tie at
+random.
+
+Results are cached until an attempt of the quiz is graded or its questions
+change (see invalidate_quiz_analytics).
+"""
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count
+
+from core.models import Question, QuestionOption, QuizAttempt, StudentSelectedQuestionOption
+
+# share of attempts in the upper and lower groups of the discrimination index
+DISCRIMINATION_GROUP = 0.27
+HISTOGRAM_BINS = 10
+
+
+def analytics_cache():
+    return caches[settings.QUIZ_ANALYTICS_CACHE]
+
+
+def analytics_key(quiz_id):
+    return f'quiz_analytics:{quiz_id}'
+
+
+def invalidate_quiz_analytics(quiz_id):
+    analytics_cache().delete(analytics_key(quiz_id))
+
+
+def group_weights(score_counts, group, descending):
+    """Share of the attempts of each distinct score that fall in the first `group` attempts of the ranking."""
+    weights = np.zeros(len(score_counts))
+    remaining = group
+    positions = range(len(score_counts) - 1, -1, -1) if descending else range(len(score_counts))
+    for position in positions:
+        if remaining <= 0:
+            break
+        taken = min(remaining, score_counts[position])
+        weights[position] = taken / score_counts[position]
+        remaining -= taken
+    return weights
+
+
+def compute_quiz_analytics(quiz_id):
+    questions = list(
+        Question.objects.filter(quiz_id=quiz_id).order_by('order').values_list(
+            'question_code', 'correct_option_code', 'marks'
+        )
+    )
+    options = list(
+        QuestionOption.objects.filter(related_question__quiz_id=quiz_id).values_list(
+            'option_code', 'related_question_id'
+        )
+    )
+    scores = np.fromiter(
+        QuizAttempt.objects.filter(related_quiz_id=quiz_id, is_completed=True).values_list(
+            'marks_obtained', flat=True
+        ),
+        dtype=np.int64,
+    )
+    by_option_and_score = StudentSelectedQuestionOption.objects.filter(
+        quiz_attempt__related_quiz_id=quiz_id,
+        quiz_attempt__is_completed=True,
+    ).order_by().values_list('selected_option_id', 'quiz_attempt__marks_obtained').annotate(count=Count('pk'))
+
+    question_index = {code: position for position, (code, _, _) in enumerate(questions)}
+    option_question = {option_code: question_index[question_code] for option_code, question_code in options}
+    number_of_attempts = len(scores)
+    number_of_questions = len(questions)
+    score_values, score_counts = np.unique(scores, return_counts=True)
+    score_index = {int(score): position for position, score in enumerate(score_values)}
+
+    # answered and correct answers per question and distinct score
+    answered = np.zeros((number_of_questions, len(score_values)), dtype=np.int64)
+    correct = np.zeros((number_of_questions, len(score_values)), dtype=np.int64)
+    option_counts = {}
+    for option_code, score, count in by_option_and_score:
+        # cleared answers (no option) are unanswered
+        if option_code not in option_question:
+            continue
+        position = option_question[option_code]
+        answered[position, score_index[score]] += count
+        if questions[position][1] == option_code:
+            correct[position, score_index[score]] += count
+        option_counts[option_code] = option_counts.get(option_code, 0) + count
+
+    if number_of_attempts:
+        difficulty = correct.sum(axis=1) / number_of_attempts
+    else:
+        difficulty = np.full(number_of_questions, np.nan)
+
+    discrimination = np.full(number_of_questions, np.nan)
+    if number_of_attempts >= 2:
+        group = max(1, int(round(number_of_attempts * DISCRIMINATION_GROUP)))
+        upper = correct @ group_weights(score_counts, group, descending=True)
+        lower = correct @ group_weights(score_counts, group, descending=False)
+        discrimination = (upper - lower) / group
+
+    maximum_score = sum(marks for _, _, marks in questions)
+    counts, edges = np.histogram(scores, bins=HISTOGRAM_BINS, range=(0, max(maximum_score, 1)))
+
+    options_by_question = [[] for _ in range(number_of_questions)]
+    for option_code, question_code in options:
+        position = option_question[option_code]
+        options_by_question[position].append({
+            'option_code': str(option_code),
+            'count': option_counts.get(option_code, 0),
+            'is_correct': questions[position][1] == option_code,
+        })
+
+    def as_float(value):
+        return None if np.isnan(value) else round(float(value), 4)
+
+    return {
+        'quiz': quiz_id,
+        'attempts': number_of_attempts,
+        'maximum_score': maximum_score,
+        'mean_score': as_float(scores.mean()) if number_of_attempts else None,
+        'median_score': as_float(np.median(scores)) if number_of_attempts else None,
+        'score_std': as_float(scores.std()) if number_of_attempts else None,
+        'score_histogram': {
+            'bin_edges': [round(float(edge), 2) for edge in edges],
+            'counts': counts.tolist(),
+        },
+        'questions': [
+            {
+                'question_code': str(question_code),
+                'difficulty': as_float(difficulty[position]),
+                'discrimination': as_float(discrimination[position]),
+                'answered': int(answered[position].sum()),
+                'unanswered': number_of_attempts - int(answered[position].sum()),
+                'options': options_by_question[position],
+            }
+            for position, (question_code, _, _) in enumerate(questions)
+        ],
+    }
+
+
+def get_quiz_analytics(quiz_id):
+    cache = analytics_cache()
+    analytics = cache.get(analytics_key(quiz_id))
+    if analytics is None:
+        analytics = compute_quiz_analytics(quiz_id)
+        cache.set(analytics_key(quiz_id), analytics, timeout=settings.QUIZ_ANALYTICS_TIMEOUT)
+    return analytics
@@ -0,0 +1,80 @@
+"""
+Writing a student's selected options for a quiz attempt.
+
+Answers are upserted on the (quiz_attempt, question) unique key in one
+batch, so a client can send all of its answers (or any chunk of them) in a
+single request and re-send them safely.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import QuizAttempt, StudentSelectedQuestionOption
+
+
+class AttemptClosed(Exception):
+    pass
+
+
+def marks_for(question, option_code):
+    if question.correct_option_code == option_code:
+        return question.marks
+    return 0
+
+
+def upsert_answers(quiz_attempt, selections, questions, check_open=True):
+    """
+    Save selections for a quiz attempt.
+
+    selections maps question_code -> option_code and questions maps
+    question_code -> Question; both are expected to be validated already.
+    The attempt is checked again under its row lock and AttemptClosed is
+    raised once it is submitted, graded or past the quiz's end time, so an
+    answer racing a submit cannot change a graded score. The buffer flushes,
+    which check the attempt themselves, pass `check_open=False`.
+    Returns the number of answers written.
+    """
+    if not selections:
+        return 0
+
+    # Django 4.0 has no bulk_create(update_conflicts=True), so the upsert is
+    # one SELECT of the existing rows followed by one bulk_update and one
+    # bulk_create. Locking the attempt row serializes concurrent writers of
+    # the same attempt so the bulk_create cannot race on the unique key.
+    with transaction.atomic():
+        attempt = QuizAttempt.objects.select_for_update(of=('self',)).select_related('related_quiz').get(
+            pk=quiz_attempt.pk
+        )
+        if check_open and (
+            attempt.is_completed or attempt.ended_at is not None or attempt.related_quiz.end_time < timezone.now()
+        ):
+            raise AttemptClosed(attempt.pk)
+        existing = {
+            answer.question_id: answer
+            for answer in StudentSelectedQuestionOption.objects.filter(
+                quiz_attempt=quiz_attempt, question_id__in=list(selections)
+            )
+        }
+
+        to_create = []
+        to_update = []
+        for question_code, option_code in selections.items():
+            marks = marks_for(questions[question_code], option_code)
+            answer = existing.get(question_code)
+            if answer is None:
+                to_create.append(StudentSelectedQuestionOption(
+                    quiz_attempt=quiz_attempt,
+                    question_id=question_code,
+                    selected_option_id=option_code,
+                    marks_awarded=marks,
+                ))
+            elif answer.selected_option_id != option_code or answer.marks_awarded != marks:
+                answer.selected_option_id = option_code
+                answer.marks_awarded = marks
+                to_update.append(answer)
+
+        if to_update:
+            StudentSelectedQuestionOption.objects.bulk_update(to_update, ['selected_option', 'marks_awarded'])
+        if to_create:
+            StudentSelectedQuestionOption.objects.bulk_create(to_create)
+
+    return len(selections)
@@ -0,0 +1,142 @@
+"""
+Write-behind buffer for answers of live quiz attempts.
+
+With QUIZ_ANSWER_BUFFER enabled, a click is stored in the cache under
+quiz_answer:<attempt>:<question> and the attempt is flagged dirty. Nothing
+is written to the database on the request path. Buffered answers reach
+StudentSelectedQuestionOption in batched upserts:
+
+- periodically, through `manage.py flush_answer_buffers`
+- on submit_attempt, which flushes inside the transaction that closes the
+  attempt, so whatever is buffered at submit time is what gets graded
+- when the grading worker closes attempts of an ended quiz
+
+The buffer must live in a cache shared by every worker process (redis or
+memcached). The per-process locmem default only suits a single process.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import Question, QuizAttempt
+from .answers import upsert_answers
+
+
+def buffer_cache():
+    return caches[settings.QUIZ_ANSWER_BUFFER_CACHE]
+
+
+def answer_key(quiz_attempt_pk, question_code):
+    return f'quiz_answer:{quiz_attempt_pk}:{question_code}'
+
+
+def dirty_key(quiz_attempt_pk):
+    return f'quiz_answer_dirty:{quiz_attempt_pk}'
+
+
+def record_answer(quiz_attempt_pk, question_code, option_code):
+    """Buffer one answer. Two cache writes, no database access."""
+    cache = buffer_cache()
+    timeout = settings.QUIZ_ANSWER_BUFFER_TIMEOUT
+    cache.set(answer_key(quiz_attempt_pk, question_code), str(option_code), timeout=timeout)
+    cache.set(dirty_key(quiz_attempt_pk), True, timeout=timeout)
+
+
+def record_answers(quiz_attempt_pk, selections):
+    """Buffer many answers (question_code -> option_code) with one set_many."""
+    cache = buffer_cache()
+    timeout = settings.QUIZ_ANSWER_BUFFER_TIMEOUT
+    cache.set_many({
+        answer_key(quiz_attempt_pk, question_code): str(option_code)
+        for question_code, option_code in selections.items()
+    }, timeout=timeout)
+    cache.set(dirty_key(quiz_attempt_pk), True, timeout=timeout)
+
+
+def load_questions(quiz_id):
+    return {question.question_code: question for question in Question.objects.filter(quiz_id=quiz_id)}
+
+
+def flush_attempt(quiz_attempt, questions=None, closing=False):
+    """
+    Write the buffered answers of one attempt to the database.
+
+    The attempt row is locked first and the buffer is only read under the
+    lock. A closed attempt (ended_at or is_completed set) is left alone, so a
+    timer flush that waited on the lock of a submit cannot write an older
+    snapshot over the submit's flush. close_and_flush, which closed the
+    attempt itself, passes `closing`.
+
+    The dirty flag is cleared before the answers are read, so a click that
+    lands while the flush runs flags the attempt again for the next flush.
+    If the database write fails the flag is restored and nothing is lost.
+    Returns the number of answers written.
+    """
+    cache = buffer_cache()
+    if questions is None:
+        questions = load_questions(quiz_attempt.related_quiz_id)
+
+    with transaction.atomic():
+        if not closing:
+            state = QuizAttempt.objects.select_for_update().filter(pk=quiz_attempt.pk).values_list(
+                'ended_at', 'is_completed'
+            ).first()
+            if state is None or state[0] is not None or state[1]:
+                return 0
+        cache.delete(dirty_key(quiz_attempt.pk))
+        keys = {answer_key(quiz_attempt.pk, question_code): question_code for question_code in questions}
+        buffered = cache.get_many(list(keys))
+        selections = {keys[key]: uuid.UUID(option_code) for key, option_code in buffered.items()}
+        try:
+            return upsert_answers(quiz_attempt, selections, questions, check_open=False)
+        except Exception:
+            cache.set(dirty_key(quiz_attempt.pk), True, timeout=settings.QUIZ_ANSWER_BUFFER_TIMEOUT)
+            raise
+
+
+def flush_attempts(quiz_attempts, only_dirty=False):
+    """Flush several attempts, loading each quiz's questions once."""
+    cache = buffer_cache()
+    if only_dirty:
+        dirty = cache.get_many([dirty_key(attempt.pk) for attempt in quiz_attempts])
+        quiz_attempts = [attempt for attempt in quiz_attempts if dirty_key(attempt.pk) in dirty]
+
+    questions_by_quiz = {}
+    written = 0
+    for attempt in quiz_attempts:
+        if attempt.related_quiz_id not in questions_by_quiz:
+            questions_by_quiz[attempt.related_quiz_id] = load_questions(attempt.related_quiz_id)
+        written += flush_attempt(attempt, questions_by_quiz[attempt.related_quiz_id])
+    return written
+
+
+def flush_open_attempts():
+    """Periodic flush: write the dirty buffers of every attempt still in progress."""
+    open_attempts = list(QuizAttempt.objects.filter(is_completed=False, ended_at__isnull=True))
+    return flush_attempts(open_attempts, only_dirty=True)
+
+
+def discard_attempt(quiz_attempt, question_codes):
+    """Drop the buffer of an attempt once its answers are final in the database."""
+    cache = buffer_cache()
+    cache.delete_many([answer_key(quiz_attempt.pk, question_code) for question_code in question_codes])
+    cache.delete(dirty_key(quiz_attempt.pk))
+
+
+def close_and_flush(quiz_attempt):
+    """
+    Authoritative flush for submit_attempt. Setting ended_at stops the
+    attempt from accepting answers, and the flush runs in the same
+    transaction, so the grading worker (which skips locked attempts) can
+    never score the attempt before its buffered answers are in the database.
+    """
+    questions = load_questions(quiz_attempt.related_quiz_id)
+    with transaction.atomic():
+        QuizAttempt.objects.filter(
+            pk=quiz_attempt.pk, ended_at__isnull=True
+        ).update(ended_at=timezone.now())
+        flush_attempt(quiz_attempt, questions, closing=True)
+        transaction.on_commit(lambda: discard_attempt(quiz_attempt, questions))
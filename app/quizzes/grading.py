@@ -0,0 +1,149 @@
+"""
+Quiz grading done in the database.
+
+An answer earns its question's marks when its selected option is the
+question's correct_option_code. Scores are computed with a single
+conditional SUM instead of loading answers into Python.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, When, F, Q, Value, Sum, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.deferred import after_response
+from core.models import Question, QuizAttempt, StudentSelectedQuestionOption
+from .analytics import invalidate_quiz_analytics
+from .buffer import flush_attempts
+from .leaderboard import record_results, rebuild_quiz_leaderboards
+
+
+def correct_marks():
+    """Expression for the marks an answer is worth, joined through its question."""
+    return Case(
+        When(selected_option_id=F('question__correct_option_code'), then=F('question__marks')),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def attempt_score(quiz_attempt_pk):
+    return StudentSelectedQuestionOption.objects.filter(
+        quiz_attempt_id=quiz_attempt_pk
+    ).aggregate(score=Coalesce(Sum(correct_marks()), 0))['score']
+
+
+def attempt_score_subquery():
+    """attempt_score() as a subquery over the outer attempt, for set-based UPDATEs."""
+    return Subquery(
+        StudentSelectedQuestionOption.objects.filter(
+            quiz_attempt=OuterRef('pk')
+        ).values('quiz_attempt').annotate(total=Sum(correct_marks())).values('total'),
+        output_field=IntegerField(),
+    )
+
+
+def grade_attempt(quiz_attempt_pk):
+    """
+    Score and close an attempt. The attempt row is locked for the whole
+    transaction, so a double submit grades it only once.
+    """
+    with transaction.atomic():
+        attempt = QuizAttempt.objects.select_for_update().get(pk=quiz_attempt_pk)
+        if attempt.is_completed:
+            return attempt
+        attempt.marks_obtained = attempt_score(attempt.pk)
+        attempt.ended_at = attempt.ended_at or timezone.now()
+        attempt.is_completed = True
+        attempt.save(update_fields=['marks_obtained', 'ended_at', 'is_completed'])
+        transaction.on_commit(lambda: attempt_graded(attempt))
+    return attempt
+
+
+def attempt_graded(quiz_attempt):
+    """Refresh everything derived from a quiz's graded attempts."""
+    invalidate_quiz_analytics(quiz_attempt.related_quiz_id)
+    # the boards may wait on the quiz lock, the student should not
+    after_response(lambda: record_results(quiz_attempt.related_quiz_id, [quiz_attempt.pk]))
+
+
+def regrade_quiz(quiz_id):
+    """
+    Re-score every answer and every completed attempt of a quiz after its
+    answer key changed. Runs two UPDATE statements whatever the number of
+    attempts. Returns the number of attempts regraded.
+    """
+    question = Question.objects.filter(pk=OuterRef('question_id'))
+    answer_totals = StudentSelectedQuestionOption.objects.filter(
+        quiz_attempt=OuterRef('pk')
+    ).values('quiz_attempt').annotate(total=Sum('marks_awarded')).values('total')
+
+    with transaction.atomic():
+        transaction.on_commit(lambda: invalidate_quiz_analytics(quiz_id))
+        transaction.on_commit(lambda: rebuild_quiz_leaderboards(quiz_id))
+        StudentSelectedQuestionOption.objects.filter(question__quiz_id=quiz_id).update(
+            marks_awarded=Case(
+                When(
+                    selected_option_id=Subquery(question.values('correct_option_code')),
+                    then=Subquery(question.values('marks')),
+                ),
+                default=Value(0),
+            )
+        )
+        return QuizAttempt.objects.filter(related_quiz_id=quiz_id, is_completed=True).update(
+            marks_obtained=Coalesce(Subquery(answer_totals, output_field=IntegerField()), 0)
+        )
+
+
+def pending_attempts(now=None):
+    """
+    Attempts waiting to be graded: submitted ones (ended_at set while not yet
+    completed) and open ones whose quiz has already ended.
+    """
+    now = now or timezone.now()
+    return QuizAttempt.objects.filter(
+        Q(ended_at__isnull=False) | Q(related_quiz__end_time__lte=now),
+        is_completed=False,
+    )
+
+
+def enqueue_attempt(quiz_attempt_pk):
+    """Mark an attempt as submitted so the grading worker picks it up."""
+    QuizAttempt.objects.filter(
+        pk=quiz_attempt_pk, ended_at__isnull=True
+    ).update(ended_at=timezone.now())
+
+
+def grade_pending_batch(batch_size):
+    """
+    Claim up to batch_size pending attempts and grade them in one UPDATE.
+
+    The claim uses SELECT ... FOR UPDATE SKIP LOCKED, so several workers can
+    drain the queue at once without grading the same attempt twice.
+    Returns the primary keys of the graded attempts.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        claimed_attempts = list(
+            pending_attempts(now)
+            .select_for_update(skip_locked=True, of=('self',))
+            .order_by('started_at')
+            .values_list('pk', 'related_quiz_id')[:batch_size]
+        )
+        claimed = [pk for pk, _ in claimed_attempts]
+        if claimed:
+            if settings.QUIZ_ANSWER_BUFFER:
+                # attempts closed by the quiz ending still have answers in the buffer
+                flush_attempts(list(QuizAttempt.objects.filter(pk__in=claimed)))
+            QuizAttempt.objects.filter(pk__in=claimed).update(
+                marks_obtained=Coalesce(attempt_score_subquery(), 0),
+                ended_at=Coalesce(F('ended_at'), Value(now)),
+                is_completed=True,
+            )
+            attempts_by_quiz = {}
+            for pk, quiz_id in claimed_attempts:
+                attempts_by_quiz.setdefault(quiz_id, []).append(pk)
+            for quiz_id, pks in attempts_by_quiz.items():
+                transaction.on_commit(lambda quiz_id=quiz_id: invalidate_quiz_analytics(quiz_id))
+                transaction.on_commit(lambda quiz_id=quiz_id, pks=pks: record_results(quiz_id, pks))
+    return claimed
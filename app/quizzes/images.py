@@ -0,0 +1,116 @@
+"""
+Resized copies of question images, served in quiz papers instead of the
+full-resolution upload.
+
+`manage.py derive_question_images` finds questions whose image has no
+manifest yet (Question.image_variants is reset whenever the image changes,
+see quizzes/signals.py) and derives them on a process pool, outside any
+request. For each width of QUESTION_IMAGE_WIDTHS smaller than the original
+it writes a WebP and a progressive JPEG, plus a tiny blurred JPEG inlined as
+a data URI placeholder.
+
+Outputs are cached on disk under
+MEDIA_ROOT/QUESTION_IMAGE_VARIANTS_DIR/<sha256[:2]>/<sha256>/, keyed by the
+content hash of the original, so the same image used in several quizzes is
+derived once. manifest.json is written last: a directory without it is
+unfinished and derived again.
+"""
+import base64
+import hashlib
+import json
+import os
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from PIL import Image, ImageFilter, ImageOps
+
+PLACEHOLDER_WIDTH = 16
+
+
+def source_sha256(name):
+    digest = hashlib.sha256()
+    with default_storage.open(name, 'rb') as source:
+        for chunk in source.chunks():
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def variants_directory(sha256):
+    return os.path.join(settings.MEDIA_ROOT, settings.QUESTION_IMAGE_VARIANTS_DIR, sha256[:2], sha256)
+
+
+def variant_url(sha256, filename):
+    return f'{settings.MEDIA_URL}{settings.QUESTION_IMAGE_VARIANTS_DIR}/{sha256[:2]}/{sha256}/{filename}'
+
+
+def write_atomically(path, data):
+    descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(descriptor, 'wb') as temporary:
+        temporary.write(data)
+    os.replace(temporary_path, path)
+
+
+def encode(image, image_format, **options):
+    output = BytesIO()
+    image.save(output, image_format, **options)
+    return output.getvalue()
+
+
+def render_variants(image, sha256, directory):
+    """Write the variants of an image and return its manifest."""
+    manifest = {'sha256': sha256, 'width': image.width, 'height': image.height, 'variants': []}
+    widths = [width for width in settings.QUESTION_IMAGE_WIDTHS if width < image.width] or [image.width]
+    # JPEG has no alpha channel
+    opaque = image.convert('RGB')
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        for image_format, extension, source, options in [
+            ('WEBP', 'webp', image, {'quality': 80, 'method': 4}),
+            ('JPEG', 'jpg', opaque, {'quality': 82, 'optimize': True, 'progressive': True}),
+        ]:
+            data = encode(source.resize((width, height), Image.LANCZOS), image_format, **options)
+            filename = f'{width}.{extension}'
+            write_atomically(os.path.join(directory, filename), data)
+            manifest['variants'].append({
+                'width': width, 'height': height, 'format': extension, 'bytes': len(data),
+                'url': variant_url(sha256, filename),
+            })
+
+    placeholder_height = max(1, round(image.height * PLACEHOLDER_WIDTH / image.width))
+    placeholder = opaque.resize((PLACEHOLDER_WIDTH, placeholder_height), Image.BILINEAR)
+    data = encode(placeholder.filter(ImageFilter.GaussianBlur(1)), 'JPEG', quality=40)
+    manifest['placeholder'] = 'data:image/jpeg;base64,' + base64.b64encode(data).decode()
+
+    # the variant a client without its own choice should load
+    jpegs = [variant for variant in manifest['variants'] if variant['format'] == 'jpg']
+    fitting = [variant for variant in jpegs if variant['width'] <= settings.QUESTION_IMAGE_DEFAULT_WIDTH]
+    manifest['default'] = (fitting[-1] if fitting else jpegs[0])['url']
+    return manifest
+
+
+def derive_image_variants(name):
+    """Return the manifest of the stored image `name`, deriving its variants unless they are cached on disk."""
+    try:
+        sha256 = source_sha256(name)
+        directory = variants_directory(sha256)
+        manifest_path = os.path.join(directory, 'manifest.json')
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as manifest_file:
+                return json.load(manifest_file)
+
+        os.makedirs(directory, exist_ok=True)
+        with default_storage.open(name, 'rb') as source:
+            image = Image.open(source)
+            # honour the camera orientation before resizing
+            image = ImageOps.exif_transpose(image)
+            image.load()
+        if image.mode not in ['RGB', 'RGBA']:
+            image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+        manifest = render_variants(image, sha256, directory)
+        write_atomically(manifest_path, json.dumps(manifest).encode())
+        return manifest
+    except (OSError, ValueError, Image.DecompressionBombError) as error:
+        # not an image Pillow can read: recorded, so it is not retried forever
+        return {'error': str(error), 'variants': []}
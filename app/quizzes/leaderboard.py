@@ -0,0 +1,272 @@
+"""
+Ranked leaderboards of completed quiz attempts, one for the whole quiz and
+one per section.
+
+A board is kept in the cache as per-score buckets:
+
+- an index under board_key(): the number of students per score, and the
+  generation of the keys below
+- one sorted list of (student_id, name) per score
+- the marks of each student on the board
+
+A student's rank is one plus the number of students with higher marks,
+summed over the index, whose size is the number of distinct scores and not
+the number of students. A page reads the index and then only the buckets it
+spans. Recording a grade reads and writes the index and the one or two
+buckets the student moves between.
+
+Boards are updated in place as attempts are graded, after the response of
+the submitting request is sent (see core/deferred.py) or in the grading
+worker. A board that is missing, partly evicted, or that could not be
+updated safely, is rebuilt from the database on the next read (or by
+`manage.py rebuild_leaderboards`) under a new generation. Updates and
+rebuilds of a quiz's boards take the same short cache lock, so a rebuild
+never writes an older snapshot over a grade recorded meanwhile.
+"""
+import time
+import uuid
+from bisect import bisect_left, insort
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+
+from core.models import Quiz, QuizAttempt
+
+LOCK_TIMEOUT = 5
+LOCK_WAIT = 1.0
+
+
+def leaderboard_cache():
+    return caches[settings.QUIZ_LEADERBOARD_CACHE]
+
+
+def board_key(quiz_id, section_code=None):
+    if section_code is None:
+        return f'quiz_leaderboard:{quiz_id}'
+    return f'quiz_leaderboard:{quiz_id}:{section_code}'
+
+
+def bucket_key(key, generation, marks):
+    return f'{key}:{generation}:marks:{marks}'
+
+
+def student_key(key, generation, student_id):
+    return f'{key}:{generation}:student:{student_id}'
+
+
+class Board:
+    """
+    One leaderboard: the student count per score, with the buckets and the
+    students' marks read from the cache on demand, or given when the board
+    was just built from the database.
+    """
+
+    def __init__(self, quiz_id, section_code, counts, generation=None, buckets=None, marks=None):
+        self.quiz_id = quiz_id
+        self.section_code = section_code
+        self.key = board_key(quiz_id, section_code)
+        self.counts = counts
+        self.generation = generation
+        self.buckets = buckets
+        self.marks = marks
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def rank_of(self, marks):
+        return 1 + sum(count for score, count in self.counts.items() if score > marks)
+
+    def read_buckets(self, scores):
+        """The buckets of `scores`, None when one of them was evicted."""
+        if self.buckets is not None:
+            return {score: self.buckets[score] for score in scores}
+        keys = {bucket_key(self.key, self.generation, score): score for score in scores}
+        found = leaderboard_cache().get_many(list(keys))
+        if len(found) < len(keys):
+            return None
+        return {keys[key]: bucket for key, bucket in found.items()}
+
+    def page(self, offset, limit):
+        """Entries offset to offset + limit, from a rebuilt board if buckets were evicted."""
+        # the buckets the page spans, with where it starts in each of them
+        spans = []
+        position = 0
+        for score in sorted(self.counts, reverse=True):
+            count = self.counts[score]
+            if position + count > offset and position < offset + limit:
+                spans.append((score, max(0, offset - position)))
+            position += count
+        buckets = self.read_buckets([score for score, _ in spans])
+        if buckets is None:
+            return rebuild_board(self.quiz_id, self.section_code).page(offset, limit)
+        results = []
+        for score, start in spans:
+            rank = self.rank_of(score)
+            for student_id, name in buckets[score][start:start + limit - len(results)]:
+                results.append({'rank': rank, 'student': student_id, 'name': name, 'marks': score})
+        return results
+
+    def standing(self, student_id):
+        if self.marks is not None:
+            marks = self.marks.get(student_id)
+        else:
+            marks = leaderboard_cache().get(student_key(self.key, self.generation, student_id))
+        if marks is None:
+            return None
+        return {'rank': self.rank_of(marks), 'of': self.total, 'marks': marks}
+
+
+def empty_board(quiz_id, section_code=None):
+    return Board(quiz_id, section_code, {}, buckets={}, marks={})
+
+
+def remove_from_bucket(bucket, student_id):
+    position = bisect_left(bucket, (student_id,))
+    if position < len(bucket) and bucket[position][0] == student_id:
+        del bucket[position]
+
+
+@contextmanager
+def quiz_lock(quiz_id):
+    """Cache lock over all the boards of a quiz. Yields whether it could be taken."""
+    cache = leaderboard_cache()
+    lock_key = f'{board_key(quiz_id)}:lock'
+    deadline = time.monotonic() + LOCK_WAIT
+    while not cache.add(lock_key, True, timeout=LOCK_TIMEOUT):
+        if time.monotonic() > deadline:
+            yield False
+            return
+        time.sleep(0.01)
+    try:
+        yield True
+    finally:
+        cache.delete(lock_key)
+
+
+def cache_board(board):
+    """Store a board built in memory under a new generation, the index last."""
+    cache = leaderboard_cache()
+    generation = uuid.uuid4().hex
+    entries = {bucket_key(board.key, generation, score): bucket for score, bucket in board.buckets.items()}
+    entries.update(
+        (student_key(board.key, generation, student_id), marks) for student_id, marks in board.marks.items()
+    )
+    cache.set_many(entries, timeout=settings.QUIZ_LEADERBOARD_TIMEOUT)
+    cache.set(board.key, {'generation': generation, 'counts': board.counts}, timeout=settings.QUIZ_LEADERBOARD_TIMEOUT)
+
+
+def rebuild_quiz_leaderboards(quiz_id):
+    """
+    Rebuild the quiz-wide board and every section board of a quiz from the
+    database. They are read and cached under the quiz lock; without it the
+    boards are only returned.
+    """
+    with quiz_lock(quiz_id) as locked:
+        boards = read_quiz_leaderboards(quiz_id)
+        if locked:
+            for board in boards.values():
+                cache_board(board)
+    return boards
+
+
+def read_quiz_leaderboards(quiz_id):
+    boards = {None: empty_board(quiz_id)}
+    # sections without results yet still get an (empty) cached board
+    for section_code in Quiz.sections.through.objects.filter(quiz_id=quiz_id).values_list('section_id', flat=True):
+        boards[section_code] = empty_board(quiz_id, section_code)
+    results = QuizAttempt.objects.filter(related_quiz_id=quiz_id, is_completed=True).values_list(
+        'related_student_id', 'related_student__first_name', 'related_student__last_name',
+        'related_student__section_id', 'marks_obtained'
+    )
+    for student_id, first_name, last_name, section_code, marks in results:
+        name = f'{first_name} {last_name}'
+        if section_code not in boards:
+            boards[section_code] = empty_board(quiz_id, section_code)
+        for board in [boards[None], boards[section_code]]:
+            board.buckets.setdefault(marks, []).append((student_id, name))
+            board.counts[marks] = board.counts.get(marks, 0) + 1
+            board.marks[student_id] = marks
+    for board in boards.values():
+        for bucket in board.buckets.values():
+            bucket.sort()
+    return boards
+
+
+def get_board(quiz_id, section_code=None):
+    """The board, read from its cached index, rebuilt if it is not cached."""
+    index = leaderboard_cache().get(board_key(quiz_id, section_code))
+    if index is None:
+        return rebuild_board(quiz_id, section_code)
+    return Board(quiz_id, section_code, index['counts'], generation=index['generation'])
+
+
+def rebuild_board(quiz_id, section_code=None):
+    boards = rebuild_quiz_leaderboards(quiz_id)
+    return boards.get(section_code) or empty_board(quiz_id, section_code)
+
+
+def update_board(key, results):
+    """
+    Apply (student_id, name, marks) results to one cached board, under the
+    quiz lock. A board that is not cached is left for the next read to
+    rebuild, one whose buckets were evicted is dropped.
+    """
+    cache = leaderboard_cache()
+    index = cache.get(key)
+    if index is None:
+        return
+    generation, counts = index['generation'], index['counts']
+    student_keys = {student_id: student_key(key, generation, student_id) for student_id, _, _ in results}
+    found = cache.get_many(list(student_keys.values()))
+    previous = {student_id: found.get(marks_key) for student_id, marks_key in student_keys.items()}
+
+    scores = {marks for _, _, marks in results} | {marks for marks in previous.values() if marks is not None}
+    bucket_keys = {score: bucket_key(key, generation, score) for score in scores}
+    found = cache.get_many(list(bucket_keys.values()))
+    buckets = {}
+    for score, score_key in bucket_keys.items():
+        if score_key not in found and counts.get(score):
+            cache.delete(key)
+            return
+        buckets[score] = found.get(score_key, [])
+
+    for student_id, name, marks in results:
+        if previous[student_id] is not None:
+            remove_from_bucket(buckets[previous[student_id]], student_id)
+            counts[previous[student_id]] -= 1
+        insort(buckets[marks], (student_id, name))
+        counts[marks] = counts.get(marks, 0) + 1
+        previous[student_id] = marks
+    index['counts'] = {score: count for score, count in counts.items() if count}
+
+    entries = {bucket_keys[score]: bucket for score, bucket in buckets.items()}
+    entries.update((student_keys[student_id], marks) for student_id, marks in previous.items())
+    cache.set_many(entries, timeout=settings.QUIZ_LEADERBOARD_TIMEOUT)
+    cache.set(key, index, timeout=settings.QUIZ_LEADERBOARD_TIMEOUT)
+
+
+def record_results(quiz_id, quiz_attempt_pks):
+    """
+    Put freshly graded attempts of one quiz on its boards. If the quiz lock
+    cannot be taken, the boards are dropped instead of risking a lost update.
+    """
+    results = QuizAttempt.objects.filter(pk__in=quiz_attempt_pks, is_completed=True).values_list(
+        'related_student_id', 'related_student__first_name', 'related_student__last_name',
+        'related_student__section_id', 'marks_obtained'
+    )
+    updates = {}
+    for student_id, first_name, last_name, section_code, marks in results:
+        result = (student_id, f'{first_name} {last_name}', marks)
+        updates.setdefault(board_key(quiz_id), []).append(result)
+        updates.setdefault(board_key(quiz_id, section_code), []).append(result)
+    if not updates:
+        return
+
+    with quiz_lock(quiz_id) as locked:
+        if not locked:
+            leaderboard_cache().delete_many(list(updates))
+            return
+        for key, board_results in updates.items():
+            update_board(key, board_results)
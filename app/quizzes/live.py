@@ -0,0 +1,182 @@
+"""
+Server-sent events stream of a section's live events, served as a plain
+ASGI application next to Django (see app/asgi.py).
+
+GET /api/live/ streams, as text/event-stream:
+
+- notice_created, notice_updated, notice_deleted and quiz_scheduled,
+  quiz_changed, quiz_removed events published to the section's event log
+  (core/events.py), with their event id
+- quiz_opened and quiz_closed when a quiz of the section starts or ends,
+  timed from the cached quiz schedule (quizzes/schedule.py)
+
+Students get their own section. Teachers pass ?section=, one they teach
+(a TeachingAssignment, or one of their quizzes or notices). The token goes in
+the Authorization header or, for browsers' EventSource, in ?token=.
+Reconnecting clients send Last-Event-ID (or ?last_event_id=) and receive what
+they missed from the log. Streams end after LIVE_STREAM_MAX_SECONDS and the
+client reconnects, which keeps connections from being pinned to one worker.
+
+An idle stream costs a coroutine and one cache read every LIVE_POLL_SECONDS.
+It never touches the database once its schedule is cached.
+"""
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.utils import timezone
+from rest_framework import exceptions
+
+from core.authentication import CachedTokenAuthentication
+from core.events import broker, events_since, last_event_id
+from core.models import Notices, Quiz, TeachingAssignment
+from core.profiles import resolve_profile
+from .schedule import due_transitions, get_section_schedule
+
+# events after which the quiz schedule has to be read again
+SCHEDULE_EVENTS = {'quiz_scheduled', 'quiz_changed', 'quiz_removed'}
+
+
+async def database_call(function, *args):
+    """
+    Run a function that reads the database on asgiref's sync thread. This app
+    does not go through Django's handler, whose request_started and
+    request_finished signals would otherwise close that thread's stale
+    connections, so it closes them itself, like core/asyncviews.py.
+    """
+    def run():
+        close_old_connections()
+        try:
+            return function(*args)
+        finally:
+            close_old_connections()
+    return await sync_to_async(run)()
+
+
+def authenticate(key):
+    """Return (user, profile) for a token key, or None."""
+    try:
+        user, _ = CachedTokenAuthentication().authenticate_credentials(key)
+    except exceptions.AuthenticationFailed:
+        return None
+    return user, resolve_profile(user)
+
+
+def teaches_section(teacher, section_code):
+    return (
+        TeachingAssignment.objects.filter(teacher=teacher, section_id=section_code).exists()
+        or Quiz.objects.filter(teacher=teacher, sections=section_code).exists()
+        or Notices.objects.filter(teacher=teacher, section=section_code).exists()
+    )
+
+
+def format_event(event_type, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event_type}')
+    lines.append(f'data: {data}')
+    return ('\n'.join(lines) + '\n\n').encode()
+
+
+async def send_error(send, status, message):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json')]})
+    await send({'type': 'http.response.body', 'body': json.dumps({'error': message}).encode()})
+
+
+async def live_events(scope, receive, send):
+    headers = dict(scope['headers'])
+    query = {name: values[0] for name, values in parse_qs(scope['query_string'].decode()).items()}
+
+    key = query.get('token')
+    authorization = headers.get(b'authorization', b'').decode().split()
+    if len(authorization) == 2 and authorization[0].lower() == 'token':
+        key = authorization[1]
+    identity = await database_call(authenticate, key) if key else None
+    if identity is None:
+        return await send_error(send, 401, 'Authentication credentials were not provided or are invalid.')
+    user, profile = identity
+    if profile is None:
+        return await send_error(send, 403, 'No student or teacher profile.')
+    section_code = profile.section_id if user.role == 'student' else query.get('section')
+    if not section_code:
+        return await send_error(send, 400, 'Pass the section to follow with ?section=.')
+    if user.role != 'student' and not await database_call(teaches_section, profile, section_code):
+        return await send_error(send, 403, 'You do not teach this section.')
+
+    last_id = headers.get(b'last-event-id', b'').decode() or query.get('last_event_id')
+    if last_id and last_id.isdigit():
+        last_id = int(last_id)
+    else:
+        # a new client only wants what happens from now on
+        last_id = await sync_to_async(last_event_id, thread_sensitive=False)(section_code)
+
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [
+        (b'content-type', b'text/event-stream'),
+        (b'cache-control', b'no-cache'),
+        # tell nginx not to buffer the stream
+        (b'x-accel-buffering', b'no'),
+    ]})
+
+    loop = asyncio.get_running_loop()
+    wake_up = asyncio.Event()
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+        wake_up.set()
+
+    watcher = asyncio.create_task(watch_disconnect())
+    broker.subscribe(section_code, loop, wake_up)
+    try:
+        await send({'type': 'http.response.body', 'body': b'retry: 3000\n\n', 'more_body': True})
+        deadline = loop.time() + settings.LIVE_STREAM_MAX_SECONDS
+        last_sent = loop.time()
+        schedule = None
+        checked_at = timezone.now()
+
+        while not disconnected.is_set() and loop.time() < deadline:
+            wake_up.clear()
+            body = b''
+
+            events = await sync_to_async(events_since, thread_sensitive=False)(section_code, last_id)
+            for event in events:
+                body += format_event(event['type'], event['data'], event['id'])
+                last_id = event['id']
+                if event['type'] in SCHEDULE_EVENTS:
+                    schedule = None
+
+            if schedule is None:
+                schedule = await database_call(get_section_schedule, section_code)
+            now = timezone.now()
+            transitions, next_transition = due_transitions(schedule, checked_at, now)
+            checked_at = now
+            for _, event_type, quiz in transitions:
+                body += format_event(event_type, json.dumps(quiz, cls=DjangoJSONEncoder))
+
+            if not body and loop.time() - last_sent >= settings.LIVE_HEARTBEAT_SECONDS:
+                # an SSE comment keeps proxies from closing an idle connection
+                body = b': keepalive\n\n'
+            if body:
+                await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+                last_sent = loop.time()
+
+            timeout = min(settings.LIVE_POLL_SECONDS, max(0.0, deadline - loop.time()))
+            if next_transition is not None:
+                timeout = min(timeout, max(0.0, (next_transition - now).total_seconds()))
+            try:
+                await asyncio.wait_for(wake_up.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        broker.unsubscribe(section_code, loop, wake_up)
+        watcher.cancel()
+    if not disconnected.is_set():
+        await send({'type': 'http.response.body', 'body': b''})
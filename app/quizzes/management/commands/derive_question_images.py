@@ -0,0 +1,74 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django import db
+from django.core.management.base import BaseCommand
+
+from core.models import Question
+from quizzes.images import derive_image_variants
+from quizzes.paper import invalidate_quiz_paper
+
+
+def close_inherited_connections():
+    # a forked worker must open its own database connection
+    db.connections.close_all()
+
+
+class Command(BaseCommand):
+    """Django command that derives the resized variants of question images."""
+
+    help = (
+        'Derive the WebP/JPEG variants and placeholder of question images that have none yet '
+        '(see quizzes/images.py). Runs until interrupted unless --once is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(),
+                            help='Number of image processes.')
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='Questions picked up per round.')
+        parser.add_argument('--interval', type=float, default=10.0,
+                            help='Seconds to sleep when no image is waiting.')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit as soon as every image has its variants.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        workers = max(1, options['workers'])
+        pool = None
+        if workers > 1:
+            close_inherited_connections()
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('fork'),
+                initializer=close_inherited_connections,
+            )
+        # a single worker derives in this process
+        run = pool.map if pool else map
+        self.stdout.write(f'Deriving question images with {workers} workers')
+        try:
+            while True:
+                pending = list(
+                    Question.objects.filter(image_variants__isnull=True).exclude(image='').exclude(image=None)
+                    .values_list('pk', 'quiz_id', 'image')[:options['batch_size']]
+                )
+                if pending:
+                    started = time.monotonic()
+                    manifests = run(derive_image_variants, [image for _, _, image in pending])
+                    for (question_code, quiz_id, image), manifest in zip(pending, manifests):
+                        # skipped if the image was replaced meanwhile, its new variants come next round
+                        if Question.objects.filter(pk=question_code, image=image).update(image_variants=manifest):
+                            invalidate_quiz_paper(quiz_id)
+                    self.stdout.write(self.style.SUCCESS(
+                        f'Derived {len(pending)} images in {time.monotonic() - started:.2f}s'
+                    ))
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if pool:
+                pool.shutdown()
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from quizzes.buffer import flush_open_attempts
+
+
+class Command(BaseCommand):
+    """Django command that writes buffered quiz answers to the database on a timer."""
+
+    help = 'Flush the answer buffers of quiz attempts in progress (QUIZ_ANSWER_BUFFER).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Seconds between flushes.')
+        parser.add_argument('--once', action='store_true',
+                            help='Flush once and exit.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        try:
+            while True:
+                started = time.monotonic()
+                written = flush_open_attempts()
+                if written:
+                    elapsed = time.monotonic() - started
+                    self.stdout.write(f'Flushed {written} answers in {elapsed:.2f}s')
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,77 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django import db
+from django.core.management.base import BaseCommand
+
+from quizzes.grading import grade_pending_batch
+
+
+def close_inherited_connections():
+    # a forked worker must open its own database connection
+    db.connections.close_all()
+
+
+def grade_batch(batch_size):
+    return len(grade_pending_batch(batch_size))
+
+
+class Command(BaseCommand):
+    """Django command that grades submitted and expired quiz attempts."""
+
+    help = (
+        'Finalize and score quiz attempts that were submitted or whose quiz has ended. '
+        'Runs until interrupted unless --once is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(),
+                            help='Number of grading processes.')
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help='Attempts claimed and graded per transaction.')
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Seconds to sleep when the queue is empty.')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit as soon as the queue is drained.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        workers = max(1, options['workers'])
+        batch_size = options['batch_size']
+        if workers > 1 and not db.connection.features.has_select_for_update_skip_locked:
+            # without SKIP LOCKED parallel workers would claim the same attempts
+            self.stdout.write(self.style.WARNING(
+                f'{db.connection.vendor} does not support SKIP LOCKED, grading with a single worker'
+            ))
+            workers = 1
+
+        close_inherited_connections()
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('fork'),
+            initializer=close_inherited_connections,
+        )
+        self.stdout.write(f'Grading with {workers} workers, {batch_size} attempts per batch')
+        try:
+            while True:
+                started = time.monotonic()
+                graded = 0
+                # keep claiming rounds of batches until a round comes back empty
+                while True:
+                    round_graded = sum(pool.map(grade_batch, [batch_size] * workers))
+                    graded += round_graded
+                    if round_graded == 0:
+                        break
+                if graded:
+                    elapsed = time.monotonic() - started
+                    self.stdout.write(self.style.SUCCESS(
+                        f'Graded {graded} attempts in {elapsed:.2f}s ({graded / elapsed:.0f} attempts/s)'
+                    ))
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            pool.shutdown()
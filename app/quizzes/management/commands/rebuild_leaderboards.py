@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Quiz
+from quizzes.leaderboard import rebuild_quiz_leaderboards
+
+
+class Command(BaseCommand):
+    """Django command to rebuild cached quiz leaderboards from the database."""
+
+    help = 'Rebuild the quiz-wide and per-section leaderboards of the given quizzes (all quizzes by default).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_ids', nargs='*', type=int)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        quiz_ids = options['quiz_ids'] or Quiz.objects.values_list('pk', flat=True)
+        for quiz_id in quiz_ids:
+            boards = rebuild_quiz_leaderboards(quiz_id)
+            self.stdout.write(f'Quiz {quiz_id}: {boards[None].total} results, {len(boards) - 1} sections')
+        self.stdout.write(self.style.SUCCESS('Leaderboards rebuilt'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Quiz
+from quizzes.grading import regrade_quiz
+
+
+class Command(BaseCommand):
+    """Django command to regrade every attempt of a quiz after its answer key changed."""
+
+    help = 'Recompute marks of all answers and completed attempts of a quiz in set-based UPDATEs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_id', type=int)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        quiz_id = options['quiz_id']
+        if not Quiz.objects.filter(pk=quiz_id).exists():
+            raise CommandError(f'Quiz {quiz_id} does not exist')
+
+        regraded = regrade_quiz(quiz_id)
+        self.stdout.write(self.style.SUCCESS(f'Regraded {regraded} attempts of quiz {quiz_id}'))
@@ -0,0 +1,78 @@
+"""
+Compiled quiz "papers": the student-facing payload of a quiz (questions,
+options and their order) serialized once and kept in the Django cache.
+
+Entries are keyed by quiz id and a version number. Editing a quiz, a question
+or an option bumps the version (see quizzes/signals.py), so stale papers are
+never read again and simply expire.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from core.models import Quiz
+
+# fields that must never reach a student
+STUDENT_HIDDEN_QUESTION_FIELDS = ['correct_option_code']
+
+
+def paper_cache():
+    return caches[settings.QUIZ_PAPER_CACHE]
+
+
+def version_key(quiz_id):
+    return f'quiz_paper_version:{quiz_id}'
+
+
+def paper_key(quiz_id, version):
+    return f'quiz_paper:{quiz_id}:{version}'
+
+
+def get_paper_version(quiz_id):
+    cache = paper_cache()
+    version = cache.get(version_key(quiz_id))
+    if version is None:
+        # start from a timestamp rather than 1 so an evicted version key can
+        # never point back at an older paper that is still cached
+        cache.add(version_key(quiz_id), time.time_ns(), timeout=None)
+        version = cache.get(version_key(quiz_id))
+    return version
+
+
+def invalidate_quiz_paper(quiz_id):
+    cache = paper_cache()
+    try:
+        cache.incr(version_key(quiz_id))
+    except ValueError:
+        # no version stored yet, nothing compiled for this quiz can be cached
+        cache.add(version_key(quiz_id), time.time_ns(), timeout=None)
+
+
+def compile_quiz_paper(quiz_id):
+    """Build the student paper for a quiz from the database."""
+    # imported here because the serializers and views import this module
+    from .serializers import QuizSerializer
+    from .views import with_questions_and_options
+
+    quiz = with_questions_and_options(Quiz.objects.filter(pk=quiz_id)).get()
+    paper = QuizSerializer(quiz).data
+    for question in paper['questions']:
+        for field in STUDENT_HIDDEN_QUESTION_FIELDS:
+            question.pop(field, None)
+    return paper
+
+
+def get_quiz_paper(quiz):
+    """
+    Return the student paper for a quiz, compiling and caching it on a miss.
+    is_active depends on the current time so it is filled in on every read.
+    """
+    cache = paper_cache()
+    key = paper_key(quiz.pk, get_paper_version(quiz.pk))
+    paper = cache.get(key)
+    if paper is None:
+        paper = compile_quiz_paper(quiz.pk)
+        cache.set(key, paper, timeout=settings.QUIZ_PAPER_TIMEOUT)
+    paper['is_active'] = quiz.is_active
+    return paper
@@ -0,0 +1,55 @@
+"""
+Upcoming quiz openings and closings per section, for the live event stream.
+
+The schedule of a section lists its quizzes that have not ended yet with
+their start and end times. It is cached, and dropped whenever a quiz of the
+section changes (see quizzes/signals.py), so streams can time their
+quiz_opened and quiz_closed events without querying the database.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from core.models import Quiz
+
+
+def schedule_cache():
+    return caches[settings.QUIZ_SCHEDULE_CACHE]
+
+
+def schedule_key(section_code):
+    return f'quiz_schedule:{section_code}'
+
+
+def invalidate_section_schedules(section_codes):
+    schedule_cache().delete_many([schedule_key(section_code) for section_code in section_codes])
+
+
+def get_section_schedule(section_code):
+    schedule = schedule_cache().get(schedule_key(section_code))
+    if schedule is None:
+        schedule = [
+            {'quiz': quiz_id, 'quiz_name': quiz_name, 'start_time': start_time, 'end_time': end_time}
+            for quiz_id, quiz_name, start_time, end_time in Quiz.objects.filter(
+                sections=section_code, end_time__gt=timezone.now()
+            ).order_by('start_time').values_list('id', 'quiz_name', 'start_time', 'end_time')
+        ]
+        schedule_cache().set(schedule_key(section_code), schedule, timeout=settings.QUIZ_SCHEDULE_TIMEOUT)
+    return schedule
+
+
+def due_transitions(schedule, since, until):
+    """
+    quiz_opened / quiz_closed events whose time falls in (since, until],
+    in time order, plus the time of the next one after `until` (or None).
+    """
+    transitions = []
+    upcoming = []
+    for quiz in schedule:
+        for event_type, moment in [('quiz_opened', quiz['start_time']), ('quiz_closed', quiz['end_time'])]:
+            if since < moment <= until:
+                transitions.append((moment, event_type, quiz))
+            elif moment > until:
+                upcoming.append(moment)
+    transitions.sort(key=lambda transition: transition[0])
+    return transitions, min(upcoming, default=None)
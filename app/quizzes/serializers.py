@@ -1,9 +1,14 @@
 from rest_framework import serializers
 from core.models import Quiz, Question, QuestionOption, QuizAttempt, StudentSelectedQuestionOption,Section,Student,Teacher,Subject
-from django.utils import timezone
+from django.conf import settings
+from .answers import AttemptClosed, upsert_answers
+from .buffer import record_answer, record_answers
+from .paper import get_quiz_paper
 
 class QuestionOptionSerializer(serializers.ModelSerializer):
     question_code = serializers.CharField(write_only=True)
+    # is_correct is not stored on the option, it only marks the question's correct_option_code
+    is_correct = serializers.BooleanField(write_only=True, required=False, default=False)
     
     class Meta:
         model = QuestionOption
@@ -15,6 +20,7 @@ class QuestionOptionSerializer(serializers.ModelSerializer):
         
         # Get question by code
         question_code = validated_data.pop('question_code')
+        is_correct = validated_data.pop('is_correct', False)
         try:
             question = Question.objects.get(question_code=question_code)
         except Question.DoesNotExist:
@@ -28,7 +34,7 @@ class QuestionOptionSerializer(serializers.ModelSerializer):
         )
         
         # If this option is marked correct, update the question's correct_option_code
-        if validated_data.get('is_correct', False):
+        if is_correct:
             question.correct_option_code = option.option_code
             question.save()
             
@@ -42,11 +48,15 @@ class QuestionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Question
         fields = ['question_code', 'quiz_id', 'question_text', 'question_type', 
-                  'marks', 'order', 'options']
+                  'marks', 'order', 'image', 'image_variants', 'options']
+        read_only_fields = ['image_variants']
+        # uploaded by teachers, read through image_variants: the original is not served
+        extra_kwargs = {'image': {'write_only': True}}
     
     def get_options(self, obj):
-        options = QuestionOption.objects.filter(related_question=obj)
-        return QuestionOptionSerializer(options, many=True).data
+        # obj.options.all() is served from the prefetch cache when the queryset
+        # was built with prefetch_related, so this costs no extra query per question
+        return QuestionOptionSerializer(obj.options.all(), many=True).data
     
     def create(self, validated_data):
         import uuid
@@ -127,9 +137,9 @@ class QuizSerializer(serializers.ModelSerializer):
 
 
 class StudentSelectedOptionSerializer(serializers.ModelSerializer):
-    quiz_attempt_code=serializers.CharField(max_length=50,write_only=True)
-    question_code=serializers.CharField(max_length=50,write_only=True)
-    selected_option_code=serializers.CharField(max_length=50,write_only=True)
+    quiz_attempt_code=serializers.UUIDField(write_only=True)
+    question_code=serializers.UUIDField(write_only=True)
+    selected_option_code=serializers.UUIDField(write_only=True)
     class Meta:
         model = StudentSelectedQuestionOption
         fields = [
@@ -142,24 +152,119 @@ class StudentSelectedOptionSerializer(serializers.ModelSerializer):
             'question_code': {'write_only': True},
             'selected_option_code': {'write_only': True}
         }
+
+    def validate(self, data):
+        user = self.context['request'].user
+        quiz_attempt = QuizAttempt.objects.select_related('related_quiz').filter(
+            quiz_attempt_code=data['quiz_attempt_code'],
+            related_student__user=user
+        ).first()
+        if quiz_attempt is None:
+            raise serializers.ValidationError({"quiz_attempt_code": "Quiz attempt not found"})
+        if quiz_attempt.is_completed or quiz_attempt.ended_at is not None:
+            raise serializers.ValidationError({"quiz_attempt_code": "Quiz attempt is already submitted"})
+
+        # validate against the cached quiz paper instead of querying questions and options
+        paper = get_quiz_paper(quiz_attempt.related_quiz)
+        question_code = str(data['question_code'])
+        option_code = str(data['selected_option_code'])
+        question = next((q for q in paper['questions'] if q['question_code'] == question_code), None)
+        if question is None:
+            raise serializers.ValidationError({"question_code": "Question is not part of this quiz"})
+        if option_code not in [option['option_code'] for option in question['options']]:
+            raise serializers.ValidationError({"selected_option_code": "Option does not belong to this question"})
+
+        data['quiz_attempt'] = quiz_attempt
+        return data
         
     def create(self,validated_data):
-       
-        question_code=validated_data.pop('question_code') 
-        quiz_attempt_code=validated_data.pop('quiz_attempt_code')
-        selected_option_code=validated_data.pop('selected_option_code')
-        question=Question.objects.get(question_code=question_code)
-        quiz_attempt=QuizAttempt.objects.get(quiz_attempt_code=quiz_attempt_code)
-        selected_option=QuestionOption.objects.get(selected_option_code=selected_option_code)
-        score=0
-        if(question.correct_option_code==selected_option_code):
-            score=question.marks
-        return StudentSelectedQuestionOption.objects.create(
+        quiz_attempt = validated_data['quiz_attempt']
+        question_code = validated_data['question_code']
+        selected_option_code = validated_data['selected_option_code']
+        answer = StudentSelectedQuestionOption(
             quiz_attempt=quiz_attempt,
-            question=question,
-            selected_option=selected_option,
-            marks_awarded=score
+            question_id=question_code,
+            selected_option_id=selected_option_code
         )
+        if settings.QUIZ_ANSWER_BUFFER:
+            # written to the database by the next flush
+            record_answer(quiz_attempt.pk, question_code, selected_option_code)
+            return answer
+
+        question = Question.objects.get(question_code=question_code)
+        try:
+            upsert_answers(quiz_attempt, {question_code: selected_option_code}, {question_code: question})
+        except AttemptClosed:
+            raise serializers.ValidationError({"quiz_attempt_code": "Quiz attempt is already submitted"})
+        return StudentSelectedQuestionOption.objects.get(quiz_attempt=quiz_attempt, question_id=question_code)
+
+class AnswerSerializer(serializers.Serializer):
+    question_code = serializers.UUIDField()
+    selected_option_code = serializers.UUIDField()
+
+
+class BulkAnswerSerializer(serializers.Serializer):
+    """
+    Saves many answers of one quiz attempt at once. All answers are checked
+    against a single prefetched set of the quiz's questions and options.
+    """
+    quiz_attempt_code = serializers.UUIDField()
+    answers = AnswerSerializer(many=True, allow_empty=False)
+
+    def validate(self, data):
+        user = self.context['request'].user
+        quiz_attempt = QuizAttempt.objects.filter(
+            quiz_attempt_code=data['quiz_attempt_code'],
+            related_student__user=user
+        ).first()
+        if quiz_attempt is None:
+            raise serializers.ValidationError({"quiz_attempt_code": "Quiz attempt not found"})
+        if quiz_attempt.is_completed or quiz_attempt.ended_at is not None:
+            raise serializers.ValidationError({"quiz_attempt_code": "Quiz attempt is already submitted"})
+
+        questions = {
+            question.question_code: question
+            for question in Question.objects.filter(quiz_id=quiz_attempt.related_quiz_id).prefetch_related('options')
+        }
+        selections = {}
+        for answer in data['answers']:
+            question = questions.get(answer['question_code'])
+            if question is None:
+                raise serializers.ValidationError(
+                    {"answers": f"Question {answer['question_code']} is not part of this quiz"}
+                )
+            option_codes = [option.option_code for option in question.options.all()]
+            if answer['selected_option_code'] not in option_codes:
+                raise serializers.ValidationError(
+                    {"answers": f"Option {answer['selected_option_code']} does not belong to question {question.question_code}"}
+                )
+            # a later answer for the same question wins, like a later click would
+            selections[question.question_code] = answer['selected_option_code']
+
+        data['quiz_attempt'] = quiz_attempt
+        data['questions'] = questions
+        data['selections'] = selections
+        return data
+
+    def create(self, validated_data):
+        if settings.QUIZ_ANSWER_BUFFER:
+            # buffered like single answers, so a later flush cannot overwrite them with older clicks
+            record_answers(validated_data['quiz_attempt'].pk, validated_data['selections'])
+            saved = len(validated_data['selections'])
+        else:
+            try:
+                saved = upsert_answers(
+                    validated_data['quiz_attempt'],
+                    validated_data['selections'],
+                    validated_data['questions']
+                )
+            except AttemptClosed:
+                # submitted or graded after validation, the answers would change its score
+                raise serializers.ValidationError({"quiz_attempt_code": "Quiz attempt is already submitted"})
+        return {'quiz_attempt_code': validated_data['quiz_attempt_code'], 'saved': saved}
+
+    def to_representation(self, instance):
+        return {'quiz_attempt_code': str(instance['quiz_attempt_code']), 'saved': instance['saved']}
 
 #only for reading 
 
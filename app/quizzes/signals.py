@@ -0,0 +1,85 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete, m2m_changed
+from django.dispatch import receiver
+
+from core.events import publish_event
+from core.models import Quiz, Question, QuestionOption
+from .analytics import invalidate_quiz_analytics
+from .paper import invalidate_quiz_paper
+from .schedule import invalidate_section_schedules
+
+
+def invalidate_paper_after_commit(quiz_id):
+    # bumped once the change is committed, so a paper compiled meanwhile from
+    # the old rows is not cached under the new version
+    transaction.on_commit(lambda: invalidate_quiz_paper(quiz_id))
+
+
+@receiver([post_save, post_delete], sender=Quiz)
+def invalidate_paper_on_quiz_change(sender, instance, **kwargs):
+    invalidate_paper_after_commit(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Question)
+def invalidate_paper_on_question_change(sender, instance, **kwargs):
+    quiz_id = instance.quiz_id
+    invalidate_paper_after_commit(quiz_id)
+    # the answer key or marks may have changed
+    transaction.on_commit(lambda: invalidate_quiz_analytics(quiz_id))
+
+
+@receiver(pre_save, sender=Question)
+def reset_image_variants_on_image_change(sender, instance, **kwargs):
+    # the variants of a replaced image are stale, derive_question_images makes new ones
+    if instance._state.adding:
+        return
+    previous = Question.objects.filter(pk=instance.pk).values_list('image', flat=True).first()
+    if (previous or '') != (instance.image.name or ''):
+        instance.image_variants = None
+
+
+@receiver([post_save, post_delete], sender=QuestionOption)
+def invalidate_paper_on_option_change(sender, instance, **kwargs):
+    # look the quiz up by id, the question row may already be gone during a cascade delete
+    quiz_id = Question.objects.filter(
+        pk=instance.related_question_id
+    ).values_list('quiz_id', flat=True).first()
+    if quiz_id is not None:
+        invalidate_paper_after_commit(quiz_id)
+
+
+def announce_quiz(quiz, section_codes, event_type):
+    """After commit, refresh the sections' quiz schedules and push the change to their live streams."""
+    section_codes = list(section_codes)
+    if not section_codes:
+        return
+    data = {'quiz': quiz.pk, 'quiz_name': quiz.quiz_name, 'start_time': quiz.start_time, 'end_time': quiz.end_time}
+
+    def announce():
+        invalidate_section_schedules(section_codes)
+        for section_code in section_codes:
+            publish_event(section_code, event_type, data)
+
+    transaction.on_commit(announce)
+
+
+@receiver(post_save, sender=Quiz)
+def announce_quiz_change(sender, instance, created, **kwargs):
+    # a new quiz has no sections yet, it is announced when they are added
+    if not created:
+        announce_quiz(instance, instance.sections.values_list('section_code', flat=True), 'quiz_changed')
+
+
+@receiver(m2m_changed, sender=Quiz.sections.through)
+def announce_quiz_sections_change(sender, instance, action, pk_set, **kwargs):
+    if action == 'post_add':
+        announce_quiz(instance, pk_set, 'quiz_scheduled')
+    elif action == 'post_remove':
+        announce_quiz(instance, pk_set, 'quiz_removed')
+    elif action == 'pre_clear':
+        announce_quiz(instance, instance.sections.values_list('section_code', flat=True), 'quiz_removed')
+
+
+@receiver(pre_delete, sender=Quiz)
+def announce_quiz_delete(sender, instance, **kwargs):
+    announce_quiz(instance, instance.sections.values_list('section_code', flat=True), 'quiz_removed')
@@ -1,8 +1,9 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from core.asyncviews import serve_reads_async
 from .views import (
     QuizViewSet, QuestionView, QuestionOptionView,
-    QuizQuestionAnswerView, QuizSubmissionViewSet
+    QuizQuestionAnswerView, QuizBulkAnswerView, QuizSubmissionViewSet
 )
 
 router = DefaultRouter()
@@ -12,8 +13,9 @@ router.register('quizzes', QuizViewSet, basename='quiz')
 router.register('submitted-quizzes', QuizSubmissionViewSet, basename='submission-answer')
 
 urlpatterns = [
-    path('', include(router.urls)),
+    path('', include(serve_reads_async(router.urls, ['quiz-list', 'quiz-detail', 'submission-answer-list']))),
     path('answers/', QuizQuestionAnswerView.as_view(), name='student-answer'),
+    path('answers/bulk/', QuizBulkAnswerView.as_view(), name='student-answer-bulk'),
     path('questions/', QuestionView.as_view(), name='question'),
     path('options/', QuestionOptionView.as_view(), name='create-option'),
 ]
\ No newline at end of file
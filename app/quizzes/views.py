@@ -2,112 +2,193 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.utils import timezone
-from django.db.models import Sum
-from core.models import Student,Quiz, Question, QuestionOption, QuizAttempt, StudentSelectedQuestionOption,Teacher
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Prefetch
+from core.models import Quiz, Question, QuestionOption, QuizAttempt
 from .serializers import (
-    QuizSerializer, QuestionSerializer, QuizAttemptSerializer, QuestionOptionSerializer,StudentSelectedOptionSerializer
+    QuizSerializer, QuestionSerializer, QuizAttemptSerializer, QuestionOptionSerializer,StudentSelectedOptionSerializer,
+    BulkAnswerSerializer
 )
-from rest_framework import generics,mixins
+from rest_framework import generics
 from core.permissions import IsStudent,IsTeacher
+from core.profiles import get_profile
+from core.pagination import StartedAtCursorPagination
+from core.compiled import CompiledListMixin
+from .paper import get_quiz_paper
+from .grading import grade_attempt, enqueue_attempt
+from .buffer import close_and_flush
+from .analytics import get_quiz_analytics
+from .leaderboard import get_board
+
+
+def with_questions_and_options(queryset):
+    """Load questions and their options in two extra queries, whatever the quiz size."""
+    return queryset.prefetch_related(
+        Prefetch('questions', queryset=Question.objects.prefetch_related('options'))
+    )
+
+
 class QuizViewSet(viewsets.ModelViewSet):
     serializer_class = QuizSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
         user = self.request.user
+        profile = get_profile(self.request)
+        if profile is None:
+            return Quiz.objects.none()
         if user.role == 'teacher':
             # Teachers see all quizzes they created
-            return Quiz.objects.filter(teacher=self.request.user.teacher)
-        elif user.role == 'student':
+            queryset = Quiz.objects.filter(teacher=profile)
+        else:
             # Students see quizzes for their section
-            student = Student.objects.get(user=user)
-            return Quiz.objects.filter(sections=student.section)
-        return Quiz.objects.none()
+            queryset = Quiz.objects.filter(sections=profile.section_id)
+        # only the read paths serialize nested questions, the attempt actions just need the quiz row.
+        # students retrieve the cached paper, so their retrieve only needs the quiz row too
+        if self.action == 'list' or (self.action == 'retrieve' and user.role == 'teacher'):
+            queryset = with_questions_and_options(queryset)
+        return queryset
+
+    def retrieve(self, request, *args, **kwargs):
+        if request.user.role != 'student':
+            return super().retrieve(request, *args, **kwargs)
+        # get_object still enforces that the quiz belongs to the student's section
+        quiz = self.get_object()
+        return Response(get_quiz_paper(quiz))
     
     @action(detail=True, methods=['post'])
     def start_attempt(self, request, pk=None):
-        """Start a new quiz attempt"""
+        """
+        Start a quiz attempt, or return the student's existing one. Safe to
+        retry: double clicks and resends never create a second attempt.
+        An optional Idempotency-Key header replays the first response.
+        """
         quiz = self.get_object()
         user=request.user
-        
+        if user.role != 'student':
+            return Response({"error": "Only students can start quiz attempts"},
+                           status=status.HTTP_403_FORBIDDEN)
+
+        idempotency_key = request.headers.get('Idempotency-Key')
+        if idempotency_key:
+            cache_key = f'idempotency:start_attempt:{user.pk}:{quiz.pk}:{idempotency_key}'
+            replay = caches[settings.IDEMPOTENCY_CACHE].get(cache_key)
+            if replay is not None:
+                return Response(replay['data'], status=replay['status'])
         
         # Check if quiz is active
         if not quiz.is_active:
             return Response({"error": "Quiz is not currently available"}, 
                            status=status.HTTP_400_BAD_REQUEST)
         
-        # Check if student already has an attempt
-        # existing_attempt = QuizAttempt.objects.filter(student=student, quiz=quiz, is_completed=False).first()
-        # if existing_attempt:
-        #     serializer = QuizAttemptSerializer(existing_attempt)
-        #     return Response(serializer.data)
-        
-        # Create new attempt
-        if(user.role=='student'):
-            student = Student.objects.get(user=user)
-            attempt = QuizAttempt.objects.create(related_student=student, related_quiz=quiz)
-            serializer = QuizAttemptSerializer(attempt)
-            return Response(serializer.data)
-        else:
-            return Response({"error": "Only students can start quiz attempts"},status=status.HTTP_403_BAD_REQUEST) 
+        # get_or_create catches the IntegrityError of a concurrent insert on the
+        # (related_student, related_quiz) unique key and returns the winner's row.
+        # The student's primary key is the user's, so no Student lookup is needed
+        attempt, created = QuizAttempt.objects.get_or_create(related_student_id=user.pk, related_quiz=quiz)
+        attempt.related_quiz = quiz
+        serializer = QuizAttemptSerializer(attempt)
+        response_status = status.HTTP_201_CREATED if created else status.HTTP_200_OK
+
+        if idempotency_key:
+            caches[settings.IDEMPOTENCY_CACHE].set(
+                cache_key, {'data': serializer.data, 'status': response_status},
+                timeout=settings.IDEMPOTENCY_KEY_TIMEOUT
+            )
+        return Response(serializer.data, status=response_status)
 
 
     @action(detail=True, methods=['post'])
     def submit_attempt(self, request, pk=None):
         """Submit a completed quiz attempt"""
         quiz = self.get_object()
-        student = Student.objects.get(user=request.user)
-        
-        try:
-            attempt = QuizAttempt.objects.get(related_student=student, related_quiz=quiz, is_completed=False)
-        except QuizAttempt.DoesNotExist:
+        if request.user.role != 'student':
+            return Response({"error": "Only students can submit quiz attempts"},
+                           status=status.HTTP_403_FORBIDDEN)
+
+        attempt = QuizAttempt.objects.filter(
+            related_student__user=request.user, related_quiz=quiz, is_completed=False
+        ).first()
+        if attempt is None:
             return Response({"error": "No active quiz attempt found"}, 
                            status=status.HTTP_404_NOT_FOUND)
         
-        # Calculate score
-        total_score = StudentAnswer.objects.filter(quiz_attempt=attempt).aggregate(Sum('marks_awarded'))
-        attempt.marks_obtained = attempt.get_score()
-        attempt.end_time = timezone.now()
-        attempt.is_completed = True
-        attempt.save()
+        if settings.QUIZ_ANSWER_BUFFER:
+            # close the attempt and write its buffered answers before it is graded
+            close_and_flush(attempt)
+
+        if settings.QUIZ_ASYNC_GRADING:
+            # the grade_attempts worker scores it, the request only queues it
+            enqueue_attempt(attempt.pk)
+            attempt.refresh_from_db()
+            serializer = QuizAttemptSerializer(attempt)
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+        # Calculate score in the database and close the attempt
+        attempt = grade_attempt(attempt.pk)
         
         serializer = QuizAttemptSerializer(attempt)
         return Response(serializer.data)
 
 
+    @action(detail=True, methods=['get'], permission_classes=[IsTeacher])
+    def analytics(self, request, pk=None):
+        """Per-question difficulty, discrimination and option distribution, plus the score histogram"""
+        quiz = self.get_object()
+        return Response(get_quiz_analytics(quiz.pk))
+
+
+    @action(detail=True, methods=['get'])
+    def leaderboard(self, request, pk=None):
+        """Ranked results of the quiz, or of one section with ?section=. Paginated with ?offset= and ?limit="""
+        quiz = self.get_object()
+        section_code = request.query_params.get('section') or None
+        try:
+            offset = max(0, int(request.query_params.get('offset', 0)))
+            limit = min(100, max(1, int(request.query_params.get('limit', 10))))
+        except ValueError:
+            return Response({"error": "offset and limit must be integers"},
+                           status=status.HTTP_400_BAD_REQUEST)
+
+        # only the quiz's sections have boards, anything else would rebuild them on every request
+        if section_code is not None and not quiz.sections.filter(pk=section_code).exists():
+            return Response({"error": "The quiz is not given to this section"}, status=status.HTTP_404_NOT_FOUND)
+        board = get_board(quiz.pk, section_code)
+        data = {
+            'quiz': quiz.pk,
+            'section': section_code,
+            'total': board.total,
+            'results': board.page(offset, limit),
+        }
+        if request.user.role == 'student':
+            data['me'] = board.standing(request.user.identification_number)
+        return Response(data)
+
+
 class QuestionView(generics.ListCreateAPIView):
     serializer_class = QuestionSerializer
     permission_classes = [IsTeacher]
+    # questions have no timestamp to page on, the list is bounded by the teacher's quizzes
+    pagination_class = None
     
     def get_queryset(self):
-        user = self.request.user
-        if user.role == 'teacher':
-            teacher = Teacher.objects.get(user=user)
-            # Get quizzes created by this teacher
-            quizzes = Quiz.objects.filter(teacher=teacher)
-            # Get questions from those quizzes
-            return Question.objects.filter(quiz__in=quizzes)
-        return Question.objects.none()
+        # IsTeacher has already resolved the teacher
+        teacher = get_profile(self.request)
+        # Get questions from the quizzes created by this teacher
+        return Question.objects.filter(quiz__teacher=teacher).prefetch_related('options')
 
 class QuestionOptionView(generics.ListCreateAPIView):
     serializer_class = QuestionOptionSerializer
     permission_classes = [IsTeacher]
+    pagination_class = None
     
     def get_queryset(self):
-        user = self.request.user
-        if user.role == 'teacher':
-            teacher = Teacher.objects.get(user=user)
-            # Get quizzes created by this teacher
-            quizzes = Quiz.objects.filter(teacher=teacher)
-            # Get questions from those quizzes
-            questions = Question.objects.filter(quiz__in=quizzes)
-            # Get options for those questions
-            return QuestionOption.objects.filter(related_question__in=questions)
-        return QuestionOption.objects.none()
+        teacher = get_profile(self.request)
+        # Get options of the questions of the quizzes created by this teacher
+        return QuestionOption.objects.filter(related_question__quiz__teacher=teacher)
         
 #this is viewset for getting final quiz submissions that are officially recorded
-class QuizSubmissionViewSet(viewsets.ReadOnlyModelViewSet):
+class QuizSubmissionViewSet(CompiledListMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for listing and retrieving quiz attempts by students.
     Students can only see their own quiz attempts.
@@ -115,17 +196,15 @@ class QuizSubmissionViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = QuizAttemptSerializer
     permission_classes = [IsAuthenticated]
     lookup_field = 'quiz_attempt_code'
+    pagination_class = StartedAtCursorPagination
     
     def get_queryset(self):
         user = self.request.user
+        student = get_profile(self.request)
         
-        if user.role == 'student':
+        if user.role == 'student' and student is not None:
             # Students see only their own submissions
-            try:
-                student = Student.objects.get(user=user)
-                return QuizAttempt.objects.filter(related_student=student)
-            except Student.DoesNotExist:
-                return QuizAttempt.objects.none()
+            return QuizAttempt.objects.filter(related_student=student)
         else:
             # Empty queryset for non-students (will be handled in permission check)
             return QuizAttempt.objects.none()
@@ -153,6 +232,18 @@ class QuizSubmissionViewSet(viewsets.ReadOnlyModelViewSet):
 class QuizQuestionAnswerView(generics.CreateAPIView):
     serializer_class = StudentSelectedOptionSerializer
     permission_classes = [IsStudent]
+
+
+#use this to save all (or a chunk of) the answers of an attempt in one request
+class QuizBulkAnswerView(generics.GenericAPIView):
+    serializer_class = BulkAnswerSerializer
+    permission_classes = [IsStudent]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_200_OK)
     
  
 
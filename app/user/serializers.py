@@ -97,7 +97,7 @@ class TeacherProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = Teacher
         fields = ['identification_number', 'role', 'first_name', 'last_name', 
-                  'phone_number', 'department', 'specialization_branch', 'specialization_name']
+                  'department', 'specialization_branch', 'specialization_name']
         read_only_fields = ['identification_number', 'role', 'specialization_name']
 
 class PasswordChangeSerializer(serializers.Serializer):
@@ -1,6 +1,8 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
+from core.asyncviews import serve_reads_async
+
 from .views import (
     LoginView,
     LogoutView,
@@ -33,4 +35,6 @@ urlpatterns = [
     
     # ViewSet routes
     #path('', include(router.urls)),
-]
\ No newline at end of file
+]
+
+urlpatterns = serve_reads_async(urlpatterns, ['user_profile'])
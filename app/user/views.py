@@ -6,6 +6,7 @@ from rest_framework.authtoken.views import ObtainAuthToken
 from django.contrib.auth import authenticate
 
 from core.models import User, Teacher, Student
+from core.profiles import get_profile
 from .serializers import (
     UserSerializer, 
     StudentRegistrationSerializer, 
@@ -129,13 +130,12 @@ class UserProfileAPIView(APIView):
     
     def get(self, request):
         user = request.user
+        profile = get_profile(request)
         
-        if user.role == 'student':
-            student = Student.objects.get(user=user)
-            serializer = StudentProfileSerializer(student)
-        elif user.role == 'teacher':
-            teacher = Teacher.objects.get(user=user)
-            serializer = TeacherProfileSerializer(teacher)
+        if user.role == 'student' and profile is not None:
+            serializer = StudentProfileSerializer(profile)
+        elif user.role == 'teacher' and profile is not None:
+            serializer = TeacherProfileSerializer(profile)
         else:
             # Handle other user types or return basic user info
             serializer = UserSerializer(user)
@@ -144,13 +144,12 @@ class UserProfileAPIView(APIView):
     
     def put(self, request):
         user = request.user
+        profile = get_profile(request)
         
-        if user.role == 'student':
-            student = Student.objects.get(user=user)
-            serializer = StudentProfileSerializer(student, data=request.data, partial=True)
-        elif user.role == 'teacher':
-            teacher = Teacher.objects.get(user=user)
-            serializer = TeacherProfileSerializer(teacher, data=request.data, partial=True)
+        if user.role == 'student' and profile is not None:
+            serializer = StudentProfileSerializer(profile, data=request.data, partial=True)
+        elif user.role == 'teacher' and profile is not None:
+            serializer = TeacherProfileSerializer(profile, data=request.data, partial=True)
         else:
             # Handle other user types
             serializer = UserSerializer(user, data=request.data, partial=True)
@@ -6,4 +6,13 @@ python manage.py wait_for_db
 python manage.py collectstatic --noinput
 python manage.py migrate
 
-uwsgi --socket :9000 --workers 4 --master --enable-threads --module app.wsgi
\ No newline at end of file
+# APP_SERVER=asgi serves app.asgi with uvicorn: async read views and the
+# /api/live/ event stream. uvicorn speaks HTTP on :9000, so the proxy has to
+# proxy_pass to it instead of uwsgi_pass. Streamed downloads (submission
+# ZIPs) are still built by the sync WSGI handler, on threads of their own (see
+# core/streams.py).
+if [ "$APP_SERVER" = "asgi" ]; then
+    uvicorn app.asgi:application --host 0.0.0.0 --port 9000 --workers 4
+else
+    uwsgi --socket :9000 --workers 4 --master --enable-threads --module app.wsgi
+fi